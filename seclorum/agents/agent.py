@@ -1,25 +1,45 @@
 # seclorum/agents/agent.py
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Tuple, Set, Callable
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Set, Callable
 from collections import defaultdict
 from seclorum.models import Task, TestResult, CodeOutput, Plan
 from seclorum.agents.base import AbstractAgent
 from seclorum.utils.logger import LoggerMixin
 from seclorum.models import ModelManager, create_model_manager
 from seclorum.core.filesystem import FileSystemManager
-from seclorum.agents.memory.manager import MemoryManager
+from seclorum.agents.memory.manager import acquire_memory_manager, release_memory_manager
+from seclorum.agents.memory.context import ContextBuilder, estimate_tokens
+from seclorum.agents.memory.cache import CacheKeyPolicy
 from seclorum.agents.remote import Remote
+from seclorum.agents.http_client import EndpointUnavailableError, HttpClient
+from seclorum.agents.single_flight import SingleFlight
 from seclorum.agents.settings import Settings
+import asyncio
 import logging
 import requests
 import os
 import time
 import timeout_decorator
 import json
-import hashlib
 import random
 
+# Upper bound on one remote_infer call, health probe and 429 retries included
+REMOTE_INFER_TIMEOUT = 15
+
+
+def socketio_chunk_emitter(socketio, task_id: str, event: str = "inference_chunk") -> Callable[[str], None]:
+    """`on_chunk` callback for Agent.infer that emits each chunk to web clients over SocketIO."""
+    def emit(chunk: str) -> None:
+        if socketio.server:
+            socketio.emit(event, {"task_id": task_id, "chunk": chunk}, namespace='/')
+    return emit
+
 class Agent(AbstractAgent, Remote):
+    # Prompt cache sharing scope; None uses Settings.Agent.Infer.CACHE_SCOPE
+    cache_scope: Optional[str] = None
+    # Inferences in progress across all agents in this process, keyed by prompt cache key
+    _inflight = SingleFlight()
+
     def __init__(self, name: str, session_id: str, model_manager: Optional[ModelManager] = None, model_name: str = "gemini-1.5-flash", memory_kwargs: Optional[Dict] = None):
         super().__init__(name, session_id)
         self.logger = logging.getLogger(f"Agent_{name}")
@@ -27,7 +47,8 @@ class Agent(AbstractAgent, Remote):
         self.available_models = {"default": self.model}
         self.current_model_key = "default"
         memory_kwargs = memory_kwargs or {}
-        self.memory_manager = MemoryManager(**memory_kwargs)
+        # Agents with the same memory configuration share one lazily initialized manager
+        self.memory_manager = acquire_memory_manager(**memory_kwargs)
         self.log_update(f"Agent {name} initialized with model {self.model.model_name}, provider {self.model.provider}, session_id={session_id}")
 
     def stop(self):
@@ -39,8 +60,8 @@ class Agent(AbstractAgent, Remote):
                 except Exception as e:
                     self.log_update(f"Error closing model {model_key}: {str(e)}")
         try:
-            self.memory_manager.stop()
-            self.log_update(f"Stopped MemoryManager for session_id={self.session_id}")
+            release_memory_manager(self.memory_manager)
+            self.log_update(f"Released MemoryManager for session_id={self.session_id}")
         except Exception as e:
             self.log_update(f"Error stopping MemoryManager: {str(e)}")
         super().stop()
@@ -57,8 +78,8 @@ class Agent(AbstractAgent, Remote):
     def get_prompt(self, task: Task) -> str:
         pass
 
-    @timeout_decorator.timeout(15, timeout_exception=TimeoutError)
-    def remote_infer(self, prompt: str, endpoint: str = "google_ai_studio", **kwargs) -> str:
+    def _remote_request(self, prompt: str, endpoint: str, stream: bool = False, **kwargs) -> Tuple[str, str, Dict, Tuple[int, int]]:
+        """Validate the API key and build (url, probe_url, payload, timeout) for a remote generation."""
         self.log_update(f"Starting remote inference to {endpoint}")
         if endpoint != "google_ai_studio":
             raise ValueError(f"Only google_ai_studio supported, got {endpoint}")
@@ -70,7 +91,11 @@ class Agent(AbstractAgent, Remote):
             self.log_update("Invalid GOOGLE_AI_STUDIO_API_KEY length")
             raise ValueError("GOOGLE_AI_STUDIO_API_KEY appears invalid")
         self.log_update(f"API key set (length: {len(api_key)})")
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={api_key}"
+        endpoint_config = Settings.get_endpoint_config(endpoint)
+        if stream:
+            url = f"{endpoint_config['stream_url']}?alt=sse&key={api_key}"
+        else:
+            url = f"{endpoint_config['url']}?key={api_key}"
         max_tokens = kwargs.get("max_tokens", Settings.Agent.RemoteInfer.MAX_TOKENS_DEFAULT)
         if "task" in kwargs and hasattr(kwargs["task"], "parameters") and "max_tokens" in kwargs["task"].parameters:
             max_tokens = kwargs["task"].parameters["max_tokens"]
@@ -84,40 +109,47 @@ class Agent(AbstractAgent, Remote):
                 "temperature": kwargs.get("temperature", Settings.Agent.RemoteInfer.TEMPERATURE_DEFAULT)
             }
         }
+        self.log_update(f"Prepared request to {endpoint_config['url']} with max_tokens={max_tokens}, timeout={timeout}")
+        return url, f"{endpoint_config['models_url']}?key={api_key}", payload, timeout
+
+    def _remote_text(self, result: Dict, label: str) -> str:
+        if not result.get("candidates"):
+            self.log_update(f"{label} returned no candidates")
+            return ""
+        text = result["candidates"][0]["content"]["parts"][0]["text"]
+        if not text.strip():
+            self.log_update(f"{label} returned empty text")
+            return ""
+        self.log_update(f"{label} successful: {text[:50]}...")
+        return text.strip()
+
+    @timeout_decorator.timeout(REMOTE_INFER_TIMEOUT, timeout_exception=TimeoutError)
+    def remote_infer(self, prompt: str, endpoint: str = "google_ai_studio", **kwargs) -> str:
+        deadline = time.monotonic() + REMOTE_INFER_TIMEOUT
+        url, probe_url, payload, timeout = self._remote_request(prompt, endpoint, **kwargs)
+        client = HttpClient.get(endpoint)
         try:
-            with requests.Session() as session:
-                self.log_update("Sending preflight request to verify API connectivity")
-                preflight_url = "https://generativelanguage.googleapis.com/v1beta/models?key=" + api_key
-                preflight_response = session.get(preflight_url, timeout=(3, 5))
-                preflight_response.raise_for_status()
-                self.log_update("Preflight request successful")
-        except requests.RequestException as e:
-            self.log_update(f"Preflight request failed: {str(e)}")
+            # Probes only when the endpoint has not been seen healthy within its TTL
+            client.ensure_healthy(probe_url)
+        except EndpointUnavailableError as e:
+            self.log_update(f"Health probe failed: {str(e)}")
             raise ValueError(f"Cannot connect to Google AI Studio API: {str(e)}")
+
+        def send(label: str) -> str:
+            # Queueing for quota past the deadline would reserve it for a call the timeout then kills
+            response = client.post(
+                url, json=payload, timeout=timeout, tokens=estimate_tokens(prompt),
+                max_wait=max(0.0, deadline - time.monotonic()),
+            )
+            self.log_update(f"{label} received response: status_code={response.status_code}")
+            response.raise_for_status()
+            return self._remote_text(response.json(), label)
+
         try:
-            with requests.Session() as session:
-                self.log_update(f"Sending main request to {url} with max_tokens={max_tokens}, timeout={timeout}")
-                response = session.post(
-                    url,
-                    json=payload,
-                    timeout=timeout,
-                    stream=False
-                )
-                self.log_update(f"Received response: status_code={response.status_code}")
-                response.raise_for_status()
-                result = response.json()
-                if not result.get("candidates"):
-                    self.log_update("Remote inference returned no candidates")
-                    return ""
-                text = result["candidates"][0]["content"]["parts"][0]["text"]
-                if not text.strip():
-                    self.log_update("Remote inference returned empty text")
-                    return ""
-                self.log_update(f"Remote inference successful: {text[:50]}...")
-                return text.strip()
+            return send("Remote inference")
         except requests.HTTPError as e:
             self.log_update(f"HTTP error: {str(e)}")
-            if e.response and e.response.status_code == 429:
+            if e.response is not None and e.response.status_code == 429:
                 max_attempts = 3
                 total_backoff_time = 0
                 max_backoff_time = 15
@@ -130,28 +162,10 @@ class Agent(AbstractAgent, Remote):
                     time.sleep(wait_time)
                     total_backoff_time += wait_time
                     try:
-                        with requests.Session() as session:
-                            response = session.post(
-                                url,
-                                json=payload,
-                                timeout=timeout,
-                                stream=False
-                            )
-                            self.log_update(f"Retry received response: status_code={response.status_code}")
-                            response.raise_for_status()
-                            result = response.json()
-                            if not result.get("candidates"):
-                                self.log_update("Retry returned no candidates")
-                                return ""
-                            text = result["candidates"][0]["content"]["parts"][0]["text"]
-                            if not text.strip():
-                                self.log_update("Retry returned empty text")
-                                return ""
-                            self.log_update(f"Retry successful: {text[:50]}...")
-                            return text.strip()
+                        return send("Retry")
                     except requests.HTTPError as retry_e:
                         self.log_update(f"Retry attempt {attempt + 1} failed: {str(retry_e)}")
-                        if retry_e.response.status_code != 429:
+                        if retry_e.response is None or retry_e.response.status_code != 429:
                             raise
                 self.log_update(f"All {max_attempts} retry attempts failed for rate limit")
                 raise requests.HTTPError("429 Client Error: Too Many Requests after retries")
@@ -166,6 +180,64 @@ class Agent(AbstractAgent, Remote):
             self.log_update(f"Request error: {str(e)}")
             raise
 
+    async def aremote_infer(self, prompt: str, endpoint: str = "google_ai_studio", **kwargs) -> str:
+        """Async remote_infer over the endpoint's pooled httpx client; cancellation aborts the request."""
+        return await asyncio.wait_for(self._aremote_infer(prompt, endpoint, **kwargs), REMOTE_INFER_TIMEOUT)
+
+    async def _aremote_infer(self, prompt: str, endpoint: str, **kwargs) -> str:
+        deadline = time.monotonic() + REMOTE_INFER_TIMEOUT
+        url, probe_url, payload, timeout = self._remote_request(prompt, endpoint, **kwargs)
+        client = HttpClient.get(endpoint)
+        try:
+            await client.aensure_healthy(probe_url)
+        except EndpointUnavailableError as e:
+            self.log_update(f"Health probe failed: {str(e)}")
+            raise ValueError(f"Cannot connect to Google AI Studio API: {str(e)}")
+        max_attempts = 3
+        total_backoff_time = 0
+        max_backoff_time = 15
+        for attempt in range(max_attempts + 1):
+            label = "Remote inference" if attempt == 0 else "Retry"
+            response = await client.apost(
+                url, json=payload, timeout=timeout, tokens=estimate_tokens(prompt),
+                max_wait=max(0.0, deadline - time.monotonic()),
+            )
+            self.log_update(f"{label} received response: status_code={response.status_code}")
+            if response.status_code != 429:
+                response.raise_for_status()
+                return self._remote_text(response.json(), label)
+            if attempt == max_attempts:
+                break
+            wait_time = min((2 ** attempt) + (random.random() / 100), max_backoff_time - total_backoff_time)
+            self.log_update(f"Rate limit hit (429), retrying in {wait_time:.2f}s (attempt {attempt + 1}/{max_attempts})")
+            await asyncio.sleep(wait_time)
+            total_backoff_time += wait_time
+        self.log_update(f"All {max_attempts} retry attempts failed for rate limit")
+        raise requests.HTTPError("429 Client Error: Too Many Requests after retries")
+
+    def remote_infer_stream(self, prompt: str, endpoint: str = "google_ai_studio", **kwargs) -> Iterator[str]:
+        """Stream remote_infer through streamGenerateContent; HTTP errors (429 included) raise before the first chunk."""
+        url, probe_url, payload, timeout = self._remote_request(prompt, endpoint, stream=True, **kwargs)
+        client = HttpClient.get(endpoint)
+        try:
+            client.ensure_healthy(probe_url)
+        except EndpointUnavailableError as e:
+            self.log_update(f"Health probe failed: {str(e)}")
+            raise ValueError(f"Cannot connect to Google AI Studio API: {str(e)}")
+        for event in client.stream_events(url, json=payload, timeout=timeout, tokens=estimate_tokens(prompt)):
+            parts = (event.get("candidates") or [{}])[0].get("content", {}).get("parts", [])
+            text = "".join(part.get("text", "") for part in parts)
+            if text:
+                yield text
+
+    def _forward_chunks(self, chunks: Iterable[str], on_chunk: Callable[[str], None]) -> str:
+        """Pass each chunk to `on_chunk` as it arrives and return the joined text."""
+        received = []
+        for chunk in chunks:
+            received.append(chunk)
+            on_chunk(chunk)
+        return "".join(received)
+
     def add_model(self, model_key: str, model_manager: ModelManager) -> None:
         self.available_models[model_key] = model_manager
         self.log_update(f"Added model '{model_key}' to {self.name}: {model_manager.model_name}")
@@ -191,51 +263,218 @@ class Agent(AbstractAgent, Remote):
         else:
             self.log_update(f"Model '{model_key}' not found, sticking with '{self.current_model_key}'")
 
+    def get_context_builder(self) -> ContextBuilder:
+        """Context builder sized to the current model's token budget."""
+        settings = Settings.Agent.Infer
+        budget = settings.CONTEXT_TOKEN_BUDGETS.get(self.model.provider, settings.CONTEXT_TOKEN_BUDGET)
+        return ContextBuilder(
+            self.memory_manager,
+            token_budget=budget,
+            recent_turns=settings.CONTEXT_RECENT_TURNS,
+            similar_turns=settings.CONTEXT_SIMILAR_TURNS,
+            history_turns=settings.CONTEXT_HISTORY_TURNS,
+        )
+
+    def get_cache_key_policy(self, use_context: bool = False) -> CacheKeyPolicy:
+        """Cache key policy for this agent; answers that depend on conversation context stay agent-scoped."""
+        scope = "agent" if use_context else (self.cache_scope or Settings.Agent.Infer.CACHE_SCOPE)
+        return CacheKeyPolicy(scope=scope)
+
+    def get_cache_key(self, prompt: str, task: Task, use_remote: bool, use_context: bool = False, **kwargs) -> Tuple[str, bool]:
+        """Return the prompt cache key and whether it lives in the cross-session cache.
+
+        The model, temperature and output schema are part of the key, so requests only share a
+        cached answer when they would have asked the same model the same question.
+        """
+        policy = self.get_cache_key_policy(use_context)
+        if use_remote:
+            model = f"google_ai_studio:{Settings.get_endpoint_config('google_ai_studio').get('model')}"
+        else:
+            model = f"{self.model.provider}:{self.model.model_name}"
+        try:
+            schema = self.get_schema()
+        except Exception:
+            schema = None
+        key = policy.key(
+            prompt, task.task_id, self.name, session_id=self.session_id,
+            model=model, temperature=kwargs.get("temperature"), schema=schema,
+        )
+        return key, policy.shared
+
     def infer(self, prompt: str, task: Task, use_remote: Optional[bool] = None, use_context: bool = False,
-              validate_fn: Optional[Callable[[str], bool]] = None, max_retries: int = Settings.Agent.Infer.MAX_RETRIES, **kwargs) -> str:
+              validate_fn: Optional[Callable[[str], bool]] = None, max_retries: int = Settings.Agent.Infer.MAX_RETRIES,
+              on_chunk: Optional[Callable[[str], None]] = None, **kwargs) -> str:
+        """Generate a response for `prompt`, served from the prompt cache when possible.
+
+        With `on_chunk`, generation streams: each chunk is passed to the callback as the model
+        produces it (see `socketio_chunk_emitter` for the web UI), and a cached answer arrives as
+        one chunk. Every retry streams again from the start. The complete result is validated,
+        saved and cached exactly as without streaming, and returned.
+
+        Concurrent calls that share a cache key, validate_fn and max_retries are coalesced: the
+        first one generates and the others wait for its result (or exception) instead of
+        generating the same answer again, for at most Settings.Agent.Infer.COALESCE_TIMEOUT
+        seconds before SingleFlightTimeout. Called on an event-loop thread it never waits, since
+        that would block the loop; use `ainfer` there to coalesce.
+        """
         self.log_update(f"Inferring with model '{self.current_model_key}' (provider: {self.model.provider}) on prompt: {prompt[:50]}...")
+        use_remote = task.parameters.get("use_remote", False) if use_remote is None else use_remote
+        prompt_hash, shared = self.get_cache_key(prompt, task, use_remote, use_context, **kwargs)
+        result, joined = self._inflight.do(
+            self._inflight_key(prompt_hash, shared, validate_fn, max_retries),
+            lambda: self._infer(prompt, task, use_remote, use_context, validate_fn, max_retries, on_chunk,
+                                prompt_hash, shared, **kwargs),
+            timeout=Settings.Agent.Infer.COALESCE_TIMEOUT,
+        )
+        if joined:
+            self.log_update(f"Joined in-flight inference for prompt_hash={prompt_hash}, length={len(result)}")
+            if on_chunk:
+                on_chunk(result)
+        return result
+
+    def _inflight_key(self, prompt_hash: str, shared: bool,
+                      validate_fn: Optional[Callable[[str], bool]], max_retries: int) -> str:
+        # Unshared cache entries live in per-session stores, so only identical sessions coalesce
+        key = prompt_hash if shared else f"{self.session_id}:{prompt_hash}"
+        # A waiter adopts the leader's result, so it must have asked for the same validation and
+        # retries. The leader's closure keeps validate_fn (and a bound method's owner) alive, so
+        # their ids cannot be reused while the flight runs.
+        if validate_fn is not None:
+            owner = getattr(validate_fn, "__self__", None)
+            validator = f"{id(owner)}.{id(getattr(validate_fn, '__func__', validate_fn))}"
+        else:
+            validator = "none"
+        return f"{key}:{validator}:{max_retries}"
+
+    def _infer(self, prompt: str, task: Task, use_remote: bool, use_context: bool,
+               validate_fn: Optional[Callable[[str], bool]], max_retries: int,
+               on_chunk: Optional[Callable[[str], None]], prompt_hash: str, shared: bool, **kwargs) -> str:
+        """Cache lookup, generation and retries behind `infer`; runs once per in-flight cache key."""
         start_time = time.time()
         attempt = 0
         best_result = ""
-        prompt_hash = hashlib.sha256(f"{prompt}:{task.task_id}:{self.name}".encode()).hexdigest()
-        self.log_update(f"Checking cache for prompt_hash={prompt_hash}")
-        cached_result = self.memory_manager.load_cached_response(prompt_hash, self.session_id)
+        self.log_update(f"Checking cache for prompt_hash={prompt_hash}, shared={shared}")
+        cached_result = self.memory_manager.load_cached_response(prompt_hash, self.session_id, shared=shared)
         if cached_result:
             self.log_update(f"Returning cached response for prompt_hash={prompt_hash}, length={len(cached_result)}")
+            if on_chunk:
+                on_chunk(cached_result)
             return cached_result
         context = ""
         if use_context:
-            self.log_update(f"Loading conversation history for task_id={task.task_id}, agent_name={self.name}")
-            history = self.memory_manager.load_history(task_id=task.task_id, agent_name=self.name, session_id=self.session_id)
-            self.log_update(f"Loaded history for task_id={task.task_id}, agent_name={self.name}, count={len(history)}")
-            if history:
-                context = "\n".join([f"Prompt: {h[0]}\nResponse: {h[1]}" for h in history])
-                prompt = f"Previous conversation:\n{context}\n\nCurrent task:\n{prompt}"
+            self.log_update(f"Building context for task_id={task.task_id}, agent_name={self.name}")
+            context = self.get_context_builder().build(prompt, task.task_id, self.name, self.session_id)
+            self.log_update(f"Built context for task_id={task.task_id}, length={len(context)}")
         while attempt < max_retries:
             try:
-                use_remote = task.parameters.get("use_remote", False) if use_remote is None else use_remote
+                # The context is prepended per attempt so retries and saved turns never nest it
+                full_prompt = f"{context}\n\nCurrent task:\n{prompt}" if context else prompt
+                if use_remote and on_chunk:
+                    result = self._forward_chunks(
+                        self.remote_infer_stream(full_prompt, endpoint="google_ai_studio", task=task, **kwargs), on_chunk
+                    )
+                elif use_remote:
+                    result = self.remote_infer(full_prompt, endpoint="google_ai_studio", task=task, **kwargs)
+                else:
+                    infer_kwargs = {k: v for k, v in kwargs.items() if k != "max_tokens"}
+                    max_tokens = self._local_max_tokens(task, kwargs)
+                    if on_chunk:
+                        # Post-processed like generate's output, so both paths save and cache the same string
+                        result = self.model.finish_stream(self._forward_chunks(
+                            self.model.generate_stream(full_prompt, max_tokens=max_tokens, **infer_kwargs), on_chunk
+                        ), max_tokens=max_tokens, **infer_kwargs)
+                    else:
+                        result = self.model.generate(full_prompt, max_tokens=max_tokens, **infer_kwargs)
+                    self.log_update(f"Raw model output (attempt {attempt + 1}): {result[:200]}...")
+                # Stripped before it is saved and cached, matching the value returned
+                result = result.strip() if result else result
+                if not result:
+                    self.log_update(f"Inference attempt {attempt + 1} returned empty result for task {task.task_id}")
+                    attempt += 1
+                    prompt = self.get_retry_prompt(prompt, "", None, False)
+                    continue
+                if not self._record_attempt(prompt, result, task, prompt_hash, shared, attempt, validate_fn):
+                    prompt = self.get_retry_prompt(prompt, result, None, False)
+                    attempt += 1
+                    best_result = result
+                    continue
+                self.log_update(f"Inference completed in {time.time() - start_time:.2f}s, result_length={len(result)}")
+                return result.strip()
+            except Exception as e:
+                self.log_update(f"Inference attempt {attempt + 1} failed for task {task.task_id}: {str(e)}")
+                prompt = self.get_retry_prompt(prompt, best_result, e, False)
+                attempt += 1
+                if not best_result:
+                    best_result = f"Error: {str(e)}"
+        self.log_update(f"All {max_retries} inference attempts failed for task {task.task_id}")
+        return best_result
+
+    async def ainfer(self, prompt: str, task: Task, use_remote: Optional[bool] = None, use_context: bool = False,
+                     validate_fn: Optional[Callable[[str], bool]] = None, max_retries: int = Settings.Agent.Infer.MAX_RETRIES,
+                     timeout: Optional[float] = None, **kwargs) -> str:
+        """Async counterpart of `infer` with the same caching, context, retry and validation behaviour.
+
+        Remote and provider HTTP calls are awaited natively, and memory access runs in worker
+        threads, so many agents can infer concurrently on one event loop (e.g. with
+        asyncio.gather). `timeout` is a deadline in seconds for the whole call, retries included;
+        when it passes, the call raises asyncio.TimeoutError. Cancelling the awaiting task
+        cancels the generation in flight. Identical concurrent calls, sync or async, are
+        coalesced as in `infer`; if the generating call is cancelled, a waiting one takes over.
+        """
+        if timeout is not None:
+            return await asyncio.wait_for(
+                self.ainfer(prompt, task, use_remote, use_context, validate_fn, max_retries, **kwargs), timeout
+            )
+        self.log_update(f"Inferring (async) with model '{self.current_model_key}' (provider: {self.model.provider}) on prompt: {prompt[:50]}...")
+        use_remote = task.parameters.get("use_remote", False) if use_remote is None else use_remote
+        prompt_hash, shared = self.get_cache_key(prompt, task, use_remote, use_context, **kwargs)
+        result, joined = await self._inflight.ado(
+            self._inflight_key(prompt_hash, shared, validate_fn, max_retries),
+            lambda: self._ainfer(prompt, task, use_remote, use_context, validate_fn, max_retries,
+                                 prompt_hash, shared, **kwargs),
+            timeout=Settings.Agent.Infer.COALESCE_TIMEOUT,
+        )
+        if joined:
+            self.log_update(f"Joined in-flight inference for prompt_hash={prompt_hash}, length={len(result)}")
+        return result
+
+    async def _ainfer(self, prompt: str, task: Task, use_remote: bool, use_context: bool,
+                      validate_fn: Optional[Callable[[str], bool]], max_retries: int,
+                      prompt_hash: str, shared: bool, **kwargs) -> str:
+        start_time = time.time()
+        attempt = 0
+        best_result = ""
+        cached_result = await asyncio.to_thread(
+            self.memory_manager.load_cached_response, prompt_hash, self.session_id, shared=shared
+        )
+        if cached_result:
+            self.log_update(f"Returning cached response for prompt_hash={prompt_hash}, length={len(cached_result)}")
+            return cached_result
+        context = ""
+        if use_context:
+            context = await asyncio.to_thread(
+                self.get_context_builder().build, prompt, task.task_id, self.name, self.session_id
+            )
+        while attempt < max_retries:
+            try:
+                full_prompt = f"{context}\n\nCurrent task:\n{prompt}" if context else prompt
                 if use_remote:
-                    result = self.remote_infer(prompt, endpoint="google_ai_studio", task=task, **kwargs)
+                    result = await self.aremote_infer(full_prompt, endpoint="google_ai_studio", task=task, **kwargs)
                 else:
-                    max_tokens = kwargs.get("max_tokens", Settings.Agent.Infer.MAX_TOKENS_DEFAULT)
-                    if "max_tokens" in task.parameters:
-                        max_tokens = task.parameters["max_tokens"]
-                    elif os.getenv("MAX_TOKENS"):
-                        max_tokens = int(os.getenv("MAX_TOKENS"))
                     infer_kwargs = {k: v for k, v in kwargs.items() if k != "max_tokens"}
-                    result = self.model.generate(prompt, max_tokens=max_tokens, **infer_kwargs)
+                    result = await self.model.agenerate(
+                        full_prompt, max_tokens=self._local_max_tokens(task, kwargs), **infer_kwargs
+                    )
                     self.log_update(f"Raw model output (attempt {attempt + 1}): {result[:200]}...")
                 if not result:
                     self.log_update(f"Inference attempt {attempt + 1} returned empty result for task {task.task_id}")
                     attempt += 1
                     prompt = self.get_retry_prompt(prompt, "", None, False)
                     continue
-                self.log_update(f"Saving inference result to memory and cache for task {task.task_id}")
-                self.memory_manager.save(prompt, result, task.task_id, self.name, self.session_id)
-                self.memory_manager.cache_response(prompt_hash, result, self.session_id)
-                self.log_update(f"Saved inference attempt {attempt + 1} to memory and cache for task {task.task_id}")
-                if validate_fn and not validate_fn(result):
-                    self.log_update(f"Inference attempt {attempt + 1} failed validation for task {task.task_id}")
+                passed = await asyncio.to_thread(
+                    self._record_attempt, prompt, result, task, prompt_hash, shared, attempt, validate_fn
+                )
+                if not passed:
                     prompt = self.get_retry_prompt(prompt, result, None, False)
                     attempt += 1
                     best_result = result
@@ -243,6 +482,7 @@ class Agent(AbstractAgent, Remote):
                 self.log_update(f"Inference completed in {time.time() - start_time:.2f}s, result_length={len(result)}")
                 return result.strip()
             except Exception as e:
+                # CancelledError is not an Exception, so cancellation and deadlines are never retried
                 self.log_update(f"Inference attempt {attempt + 1} failed for task {task.task_id}: {str(e)}")
                 prompt = self.get_retry_prompt(prompt, best_result, e, False)
                 attempt += 1
@@ -251,6 +491,25 @@ class Agent(AbstractAgent, Remote):
         self.log_update(f"All {max_retries} inference attempts failed for task {task.task_id}")
         return best_result
 
+    def _local_max_tokens(self, task: Task, kwargs: Dict) -> int:
+        if "max_tokens" in task.parameters:
+            return task.parameters["max_tokens"]
+        if os.getenv("MAX_TOKENS"):
+            return int(os.getenv("MAX_TOKENS"))
+        return kwargs.get("max_tokens", Settings.Agent.Infer.MAX_TOKENS_DEFAULT)
+
+    def _record_attempt(self, prompt: str, result: str, task: Task, prompt_hash: str, shared: bool,
+                        attempt: int, validate_fn: Optional[Callable[[str], bool]]) -> bool:
+        """Save a non-empty attempt to memory and the prompt cache; return whether it passed validation."""
+        self.log_update(f"Saving inference result to memory and cache for task {task.task_id}")
+        self.memory_manager.save(prompt, result, task.task_id, self.name, self.session_id)
+        self.memory_manager.cache_response(prompt_hash, result, self.session_id, shared=shared)
+        self.log_update(f"Saved inference attempt {attempt + 1} to memory and cache for task {task.task_id}")
+        if validate_fn and not validate_fn(result):
+            self.log_update(f"Inference attempt {attempt + 1} failed validation for task {task.task_id}")
+            return False
+        return True
+
     def process_task(self, task: Task) -> Tuple[str, Any]:
         raise NotImplementedError("Subclasses must implement process_task")
 
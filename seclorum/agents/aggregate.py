@@ -28,6 +28,16 @@ class Aggregate(Agent):
         self.graph[agent.name] = dependencies if dependencies is not None else []
         self.log_update(f"Added agent {agent.name} with dependencies {dependencies}")
 
+    def _save_subtasks(self, subtasks: List[Task]) -> None:
+        """Persist a Plan's subtasks in one batch; a storage failure does not stop orchestration."""
+        if not subtasks:
+            return
+        try:
+            self.memory_manager.save_tasks_many(subtasks, self.session_id)
+            self.log_update(f"Saved {len(subtasks)} subtasks to Memory")
+        except Exception as e:
+            self.log_update(f"Failed to save subtasks to Memory: {str(e)}")
+
     def _check_condition(self, status: str, result: Any, condition: Optional[Dict[str, Any]]) -> bool:
         self.log_update(f"Checking condition: status={status}, result_type={type(result).__name__}, condition={condition}")
         if not condition:
@@ -57,6 +67,10 @@ class Aggregate(Agent):
             self.log_update(f"Handling Plan from {current_agent} with {len(result.subtasks)} subtasks")
             self.tasks[task_id]["outputs"][current_agent] = {"status": status, "result": result}
             task.parameters[current_agent] = {"status": status, "result": result}
+            self._save_subtasks([
+                subtask for subtask in result.subtasks[:self.max_subtasks]
+                if subtask.description and subtask.parameters.get("language") and subtask.parameters.get("output_files")
+            ])
             subtask_count = 0
             for subtask in result.subtasks:
                 if subtask_count >= self.max_subtasks:
@@ -15,6 +15,8 @@ import time
 import timeout_decorator
 import tempfile
 from seclorum.agents.memory.vector import VectorBackend
+from seclorum.agents.memory.file import FileBackend
+from seclorum.agents.memory.sqlite import SharedSQLiteBackend
 
 class AbstractAgent(ABC, LoggerMixin):
     _memory_cache = {}
@@ -32,19 +34,25 @@ class AbstractAgent(ABC, LoggerMixin):
     @classmethod
     def get_or_create_memory(cls, session_id: str) -> Memory:
         if session_id not in cls._memory_cache:
-            sqlite_db_path = os.path.join(tempfile.gettempdir(), f"memory_{session_id}.db")
-            log_path = os.path.join("agents/logs/conversations", f"conversation_{session_id}.json")
+            # Every session shares one SQLite store instead of opening a temp DB per session
+            sqlite_db_path = os.path.join(tempfile.gettempdir(), "seclorum_memory.db")
+            log_path = os.path.join("agents/logs/conversations", f"conversation_{session_id}.jsonl")
             os.makedirs(os.path.dirname(log_path), exist_ok=True)
             vector_db_path = os.path.join(tempfile.gettempdir(), "chroma_db")
-            vector_backend = VectorBackend(vector_db_path)
             cls._memory_cache[session_id] = Memory(
                 session_id=session_id,
-                sqlite_db_path=sqlite_db_path,
-                log_path=log_path,
-                vector_backend=vector_backend,
-                embedding_model="nomic-embed-text:latest:ollama",
-                preserve_db=False,
-                disable_embedding=False
+                backends=[
+                    {"backend": SharedSQLiteBackend, "config": {"db_path": sqlite_db_path}},
+                    {"backend": FileBackend, "config": {"log_path": log_path}},
+                    {
+                        "backend": VectorBackend,
+                        "config": {
+                            "db_path": vector_db_path,
+                            "embedding_model": "nomic-embed-text:latest",
+                            "embedding_cache_path": os.path.join(tempfile.gettempdir(), "seclorum_embeddings.db"),
+                        }
+                    },
+                ],
             )
         return cls._memory_cache[session_id]
 
@@ -230,6 +230,7 @@ class Developer(Aggregate):
             task.parameters[architect_key] = {"status": "failed", "result": None}
             return "failed", CodeOutput(code="", tests=None)
 
+        self._save_subtasks(plan.subtasks)
         pipeline_configs = self.infer_pipelines(task, plan)
         self.pipelines[task.task_id] = []
         final_status, final_result = "failed", None
@@ -0,0 +1,287 @@
+# seclorum/agents/http_client.py
+import asyncio
+import json
+import logging
+import threading
+import time
+import weakref
+from typing import Dict, Iterator, Optional, Sequence, Set
+import requests
+from requests.adapters import HTTPAdapter
+from seclorum.agents.rate_limit import RateLimiter
+from seclorum.agents.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class EndpointUnavailableError(RuntimeError):
+    pass
+
+
+class HttpClient:
+    """Process-wide, keep-alive HTTP client for one remote endpoint.
+
+    Use `HttpClient.get(endpoint)`; every caller of the same endpoint shares one connection pool,
+    so repeated generations reuse warm TLS connections. Each thread gets its own
+    `requests.Session` mounted on the shared adapter, since sessions themselves are not
+    thread-safe but urllib3 pools are. Coroutines use an `httpx.AsyncClient` per event loop,
+    sized like the sync pool and sharing the same health state; it is closed by `aclose`/`close`
+    or when its loop shuts down its async generators, as `asyncio.run` does on exit.
+    """
+
+    _instances: Dict[str, "HttpClient"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        endpoint: str,
+        pool_connections: int = Settings.Agent.RemoteInfer.HTTP_POOL_CONNECTIONS,
+        pool_maxsize: int = Settings.Agent.RemoteInfer.HTTP_POOL_MAXSIZE,
+        health_ttl: float = Settings.Agent.RemoteInfer.HEALTH_CHECK_TTL,
+        limiter: Optional[RateLimiter] = None,
+        usage_path: Optional[Sequence[str]] = None,
+    ):
+        """
+        Args:
+            endpoint: Endpoint name, used for logging and as the registry key.
+            pool_connections: Number of per-host connection pools kept.
+            pool_maxsize: Connections kept alive per host; concurrent requests beyond it open extra ones.
+            health_ttl: Seconds a successful health probe (or request) is trusted before probing again.
+            limiter: Rate limiter every POST waits on; None sends immediately.
+            usage_path: Keys leading to the tokens used in a JSON response, to settle the limiter's estimate.
+        """
+        self.endpoint = endpoint
+        self.health_ttl = health_ttl
+        self.pool_maxsize = pool_maxsize
+        self.limiter = limiter
+        self.usage_path = list(usage_path or [])
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self._local = threading.local()
+        self._healthy_until = 0.0
+        self._health_lock = threading.Lock()
+        # httpx clients are bound to the loop that first used them; each is kept with its shutdown hook
+        self._async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._async_lock = threading.Lock()
+        # Close tasks scheduled by close() on the calling loop; the loop only holds tasks weakly
+        self._closing: Set[asyncio.Task] = set()
+
+    @classmethod
+    def get(cls, endpoint: str) -> "HttpClient":
+        """Return the shared client for an endpoint, sized from its settings on first use."""
+        with cls._instances_lock:
+            client = cls._instances.get(endpoint)
+            if client is None:
+                config = Settings.get_endpoint_config(endpoint)
+                client = cls._instances[endpoint] = cls(
+                    endpoint,
+                    pool_connections=config.get("pool_connections", Settings.Agent.RemoteInfer.HTTP_POOL_CONNECTIONS),
+                    pool_maxsize=config.get("pool_maxsize", Settings.Agent.RemoteInfer.HTTP_POOL_MAXSIZE),
+                    health_ttl=config.get("health_ttl", Settings.Agent.RemoteInfer.HEALTH_CHECK_TTL),
+                    limiter=RateLimiter.get(endpoint),
+                    usage_path=config.get("usage_path"),
+                )
+                logger.debug(f"Registered HTTP client for {endpoint}")
+            return client
+
+    @classmethod
+    def reset(cls) -> None:
+        """Close and drop all shared clients."""
+        with cls._instances_lock:
+            clients, cls._instances = list(cls._instances.values()), {}
+        for client in clients:
+            client.close()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            self._local.session = session
+        return session
+
+    def request(
+        self, method: str, url: str, tokens: Optional[int] = None, max_wait: Optional[float] = None, **kwargs
+    ) -> requests.Response:
+        """Send a request; with `tokens` set it first waits its turn on the endpoint's rate limiter.
+
+        `max_wait` caps that wait, e.g. to the caller's remaining deadline; past it the call raises
+        RateLimitTimeout without using quota.
+        """
+        if tokens is not None and self.limiter:
+            self.limiter.acquire(tokens, max_wait=max_wait)
+        try:
+            response = self._session().request(method, url, **kwargs)
+        except requests.ConnectionError:
+            # Probe again before the next request instead of trusting a stale result
+            self.mark_unhealthy()
+            raise
+        if 200 <= response.status_code < 300:
+            # 4xx says nothing about whether a real call would succeed (401/403/404 must re-probe)
+            self.mark_healthy()
+        if not kwargs.get("stream"):
+            # Reading a streamed body here would consume it before the caller sees it
+            self._settle(response, tokens)
+        return response
+
+    def post(self, url: str, tokens: int = 0, **kwargs) -> requests.Response:
+        """POST counted against the rate limit as one request plus `tokens` (estimated prompt tokens)."""
+        return self.request("POST", url, tokens=tokens, **kwargs)
+
+    def stream_events(self, url: str, tokens: int = 0, **kwargs) -> Iterator[Dict]:
+        """POST and yield the JSON payload of each server-sent event as it arrives.
+
+        Raises requests.HTTPError before the first event if the endpoint rejects the request.
+        """
+        with self.post(url, tokens=tokens, stream=True, **kwargs) as response:
+            if not response.ok:
+                # Read the (short) error body so the connection goes back to the pool
+                _ = response.content
+                response.raise_for_status()
+            for line in response.iter_lines():
+                if line.startswith(b"data:"):
+                    yield json.loads(line[len(b"data:"):])
+
+    def _settle(self, response, tokens: Optional[int]) -> None:
+        if tokens is None or not self.limiter or not self.usage_path or response.status_code != 200:
+            return
+        try:
+            used = response.json()
+            for key in self.usage_path:
+                used = used[key]
+        except (ValueError, KeyError, TypeError, IndexError):
+            return
+        self.limiter.settle(tokens, used)
+
+    def mark_healthy(self) -> None:
+        with self._health_lock:
+            self._healthy_until = time.monotonic() + self.health_ttl
+
+    def mark_unhealthy(self) -> None:
+        with self._health_lock:
+            self._healthy_until = 0.0
+
+    def ensure_healthy(self, probe_url: str, timeout=(3, 5)) -> None:
+        """Probe `probe_url` unless the endpoint was seen healthy within `health_ttl`.
+
+        Raises EndpointUnavailableError when the probe fails.
+        """
+        with self._health_lock:
+            if time.monotonic() < self._healthy_until:
+                return
+        try:
+            response = self._session().get(probe_url, timeout=timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            self.mark_unhealthy()
+            raise EndpointUnavailableError(f"Endpoint {self.endpoint} failed its health probe: {str(e)}") from e
+        self.mark_healthy()
+        logger.debug(f"Health probe for {self.endpoint} succeeded; trusted for {self.health_ttl}s")
+
+    def async_client(self):
+        """Return the httpx.AsyncClient for the running event loop, creating it on first use."""
+        import httpx
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                limits = httpx.Limits(max_connections=self.pool_maxsize, max_keepalive_connections=self.pool_maxsize)
+                client = httpx.AsyncClient(limits=limits)
+                closer = self._close_at_shutdown(client)
+                # Step the hook to its yield so the loop tracks it; the body does not await, so this never blocks
+                try:
+                    closer.asend(None).send(None)
+                except StopIteration:
+                    pass
+                entry = self._async_clients[loop] = (client, closer)
+        return entry[0]
+
+    async def _close_at_shutdown(self, client):
+        """Parked for the life of the loop; the loop's shutdown_asyncgens() resumes it to close `client`."""
+        try:
+            yield
+        finally:
+            loop = asyncio.get_running_loop()
+            with self._async_lock:
+                if self._async_clients.get(loop, (None,))[0] is client:
+                    del self._async_clients[loop]
+            await client.aclose()
+            logger.debug(f"Closed async HTTP client for {self.endpoint}")
+
+    async def arequest(
+        self, method: str, url: str, timeout=None, tokens: Optional[int] = None, max_wait: Optional[float] = None,
+        **kwargs
+    ):
+        """Async `request`; `timeout` takes the same (connect, read) tuple or seconds as requests."""
+        import httpx
+        if tokens is not None and self.limiter:
+            await self.limiter.aacquire(tokens, max_wait=max_wait)
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            response = await self.async_client().request(method, url, timeout=timeout, **kwargs)
+        except httpx.TransportError:
+            self.mark_unhealthy()
+            raise
+        if 200 <= response.status_code < 300:
+            self.mark_healthy()
+        self._settle(response, tokens)
+        return response
+
+    async def apost(self, url: str, tokens: int = 0, **kwargs):
+        return await self.arequest("POST", url, tokens=tokens, **kwargs)
+
+    async def aensure_healthy(self, probe_url: str, timeout=(3, 5)) -> None:
+        """Async `ensure_healthy`, sharing its cached result."""
+        import httpx
+        with self._health_lock:
+            if time.monotonic() < self._healthy_until:
+                return
+        try:
+            response = await self.arequest("GET", probe_url, timeout=timeout)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            self.mark_unhealthy()
+            raise EndpointUnavailableError(f"Endpoint {self.endpoint} failed its health probe: {str(e)}") from e
+        self.mark_healthy()
+        logger.debug(f"Health probe for {self.endpoint} succeeded; trusted for {self.health_ttl}s")
+
+    async def aclose(self) -> None:
+        """Close the running loop's async client."""
+        with self._async_lock:
+            entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[1].aclose()
+
+    def close(self) -> None:
+        """Close the sync pool and every loop's async client, each on its own loop."""
+        self._adapter.close()
+        with self._async_lock:
+            entries, self._async_clients = list(self._async_clients.items()), weakref.WeakKeyDictionary()
+        for loop, (_, closer) in entries:
+            self._close_on_loop(loop, closer)
+        logger.debug(f"Closed HTTP client for {self.endpoint}")
+
+    def _close_on_loop(self, loop: asyncio.AbstractEventLoop, closer) -> None:
+        async def finish():
+            await closer.aclose()
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        try:
+            if loop.is_closed():
+                # Its transports went with the loop; nothing is left to await them on
+                logger.debug(f"Dropped async HTTP client for {self.endpoint}: its loop is closed")
+            elif loop is running:
+                # close() was called from a coroutine on this loop, which cannot block on itself
+                task = loop.create_task(finish())
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+            elif loop.is_running():
+                asyncio.run_coroutine_threadsafe(finish(), loop).result(timeout=5)
+            else:
+                loop.run_until_complete(finish())
+        except Exception as e:
+            logger.warning(f"Failed to close async HTTP client for {self.endpoint}: {str(e)}")
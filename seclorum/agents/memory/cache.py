@@ -0,0 +1,200 @@
+# seclorum/agents/memory/cache.py
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from seclorum.agents.memory.protocol import MemoryBackend
+
+logger = logging.getLogger(__name__)
+
+# Narrowest first: agent keys include the task and agent name, global keys neither and live in
+# a store shared by every session
+CACHE_SCOPES = ("agent", "task", "session", "global")
+
+# Values that differ between otherwise identical prompts, replaced by a placeholder
+VOLATILE_PATTERNS: List[Tuple[str, str]] = [
+    (r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b", "<uuid>"),
+    (r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.[0-9%f]+)?(?:Z|[+-]\d{2}:?\d{2})?", "<timestamp>"),
+    (r"\b[0-9a-fA-F]{32,}\b", "<hash>"),
+]
+MIN_MASKED_ID_LENGTH = 4
+
+
+class CacheKeyPolicy:
+    """Derive prompt cache keys that identical requests share within a configurable scope.
+
+    Prompts are normalized (whitespace collapsed, volatile values such as UUIDs, timestamps and
+    digests masked, and the task and session ids masked when the scope spans them) and hashed
+    together with the inputs that decide the response: model, temperature and output schema.
+    """
+
+    def __init__(
+        self,
+        scope: str = "agent",
+        normalize_whitespace: bool = True,
+        volatile_patterns: Optional[List[Tuple[str, str]]] = None,
+    ):
+        """
+        Args:
+            scope: "agent", "task", "session" or "global"; see CACHE_SCOPES.
+            normalize_whitespace: Treat prompts differing only in whitespace as equal.
+            volatile_patterns: (regex, placeholder) pairs masked before hashing; defaults to VOLATILE_PATTERNS.
+        """
+        if scope not in CACHE_SCOPES:
+            raise ValueError(f"Unknown cache scope: {scope}")
+        self.scope = scope
+        self.normalize_whitespace = normalize_whitespace
+        self.volatile_patterns = [
+            (re.compile(pattern), placeholder)
+            for pattern, placeholder in (VOLATILE_PATTERNS if volatile_patterns is None else volatile_patterns)
+        ]
+
+    @property
+    def shared(self) -> bool:
+        """Whether keys are stored in the cross-session store rather than the session's own."""
+        return self.scope == "global"
+
+    def normalize(self, prompt: str, task_id: Optional[str] = None, session_id: Optional[str] = None) -> str:
+        """Canonical form of `prompt` under this policy."""
+        # Ids are masked only when the scope spans several of them, and only as whole tokens so
+        # short ids do not eat into other words; longest first so one id containing another is masked whole
+        ids = []
+        if self.scope in ("session", "global") and task_id:
+            ids.append((task_id, "<task>"))
+        if self.scope == "global" and session_id:
+            ids.append((session_id, "<session>"))
+        for value, placeholder in sorted(ids, key=lambda item: len(item[0]), reverse=True):
+            if len(value) >= MIN_MASKED_ID_LENGTH:
+                prompt = re.sub(rf"(?<![A-Za-z0-9]){re.escape(value)}(?![A-Za-z0-9])", placeholder, prompt)
+        for pattern, placeholder in self.volatile_patterns:
+            prompt = pattern.sub(placeholder, prompt)
+        if self.normalize_whitespace:
+            prompt = " ".join(prompt.split())
+        return prompt
+
+    def key(
+        self,
+        prompt: str,
+        task_id: str,
+        agent_name: str,
+        session_id: Optional[str] = None,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        schema: Optional[Any] = None,
+    ) -> str:
+        """Return the hex cache key for a request."""
+        fields = {
+            "scope": self.scope,
+            "prompt": self.normalize(prompt, task_id=task_id, session_id=session_id),
+            "model": model,
+            "temperature": temperature,
+            "schema": schema,
+        }
+        if self.scope in ("agent", "task"):
+            fields["task_id"] = task_id
+        if self.scope == "agent":
+            fields["agent_name"] = agent_name
+        payload = json.dumps(fields, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PromptCache:
+    """Two-tier prompt-response cache: an in-process LRU (L1) in front of cache-capable backends (L2)."""
+
+    def __init__(
+        self,
+        session_id: str,
+        backends: List[MemoryBackend],
+        max_entries: int = 1024,
+        ttl: Optional[float] = 3600,
+    ):
+        """
+        Args:
+            session_id: Session whose cache entries are read and written in L2.
+            backends: Memory backends; only those with supports_cache form the L2 tier.
+            max_entries: Capacity of the L1 tier; 0 disables it.
+            ttl: Seconds an L1 entry stays valid; None keeps entries until evicted.
+        """
+        self.session_id = session_id
+        self.backends = [b for b in backends if getattr(b, "supports_cache", True)]
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+        logger.debug(
+            f"PromptCache for session_id={session_id}: max_entries={max_entries}, "
+            f"l2_backends={[b.__class__.__name__ for b in self.backends]}"
+        )
+
+    def get(self, prompt_hash: str) -> Optional[str]:
+        """Return the cached response from L1, falling back to L2 and promoting hits into L1."""
+        with self._lock:
+            entry = self._entries.get(prompt_hash)
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(prompt_hash)
+                    self._stats["l1_hits"] += 1
+                    return response
+                del self._entries[prompt_hash]
+        for backend in self.backends:
+            try:
+                response = backend.load_cached_response(session_id=self.session_id, prompt_hash=prompt_hash)
+            except Exception as e:
+                logger.warning(f"Failed to load cached response from {backend.__class__.__name__}: {str(e)}")
+                continue
+            if response:
+                logger.debug(
+                    f"Promoted cached response from {backend.__class__.__name__}: "
+                    f"session_id={self.session_id}, prompt_hash={prompt_hash}"
+                )
+                self._remember(prompt_hash, response)
+                with self._lock:
+                    self._stats["l2_hits"] += 1
+                return response
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, prompt_hash: str, response: str, write_through: bool = True) -> None:
+        """Store a response in L1 and, unless the caller writes L2 itself, in every L2 backend."""
+        self._remember(prompt_hash, response)
+        if not write_through:
+            return
+        for backend in self.backends:
+            try:
+                backend.cache_response(session_id=self.session_id, prompt_hash=prompt_hash, response=response)
+                logger.debug(
+                    f"Cached response in {backend.__class__.__name__}: "
+                    f"session_id={self.session_id}, prompt_hash={prompt_hash}"
+                )
+            except Exception as e:
+                logger.warning(f"Failed to cache response in {backend.__class__.__name__}: {str(e)}")
+
+    def _remember(self, prompt_hash: str, response: str) -> None:
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._entries[prompt_hash] = (response, expires_at)
+            self._entries.move_to_end(prompt_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, prompt_hash: Optional[str] = None) -> None:
+        """Drop one entry, or the whole L1 tier, without touching L2."""
+        with self._lock:
+            if prompt_hash is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(prompt_hash, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Return L1/L2 hit and miss counters and the current L1 size."""
+        with self._lock:
+            return {**self._stats, "l1_size": len(self._entries)}
@@ -0,0 +1,179 @@
+# seclorum/agents/memory/context.py
+import logging
+from typing import Callable, List, Optional, Tuple
+from seclorum.models import Task
+
+logger = logging.getLogger(__name__)
+
+Turn = Tuple[str, str, str]  # (prompt, response, timestamp)
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) that needs no tokenizer."""
+    return (len(text) + 3) // 4 if text else 0
+
+def summarize_turns(previous: str, turns: List[Turn]) -> str:
+    """Default extractive summarizer: one clipped line per turn appended to the previous summary."""
+    lines = [previous] if previous else []
+    for prompt, response, _ in turns:
+        lines.append(f"- {_clip(prompt, 120)} -> {_clip(response, 160)}")
+    return "\n".join(lines)
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+class ContextBuilder:
+    """Assemble a token-bounded conversation context for a prompt.
+
+    The context holds, in order, a rolling summary of turns older than the recent window, the
+    older turns most similar to the prompt, and as many of the most recent turns as fit. The
+    summary is stored as a task record of the session, which the response cache's TTL and LRU
+    eviction never touch, together with the timestamp of the last turn it covers. Each build reads only the turns after that timestamp, at most
+    `history_turns` of them, and folds those older than the recent window into the summary, so
+    its cost stays proportional to new turns rather than to the whole history.
+    """
+
+    SUMMARY_KEY = "context-summary:{task_id}:{agent_name}"
+
+    def __init__(
+        self,
+        memory_manager,
+        token_budget: int,
+        recent_turns: int = 6,
+        similar_turns: int = 3,
+        history_turns: int = 20,
+        summary_share: float = 0.25,
+        similar_share: float = 0.25,
+        summarizer: Callable[[str, List[Turn]], str] = summarize_turns,
+        token_counter: Callable[[str], int] = estimate_tokens,
+    ):
+        """
+        Args:
+            memory_manager: MemoryManager supplying history, similarity search and task storage.
+            token_budget: Maximum tokens the assembled context may use.
+            recent_turns: Most recent turns considered verbatim.
+            similar_turns: Older turns retrieved by similarity to the prompt.
+            history_turns: Most turns read per build; unsummarized turns beyond it are left out of the summary.
+            summary_share: Fraction of the budget the rolling summary may use.
+            similar_share: Fraction of the budget similar turns may use.
+            summarizer: Folds new turns into the previous summary; may call a model.
+            token_counter: Counts tokens in a string.
+        """
+        self.memory_manager = memory_manager
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.similar_turns = similar_turns
+        self.history_turns = max(history_turns, recent_turns)
+        self.summary_share = summary_share
+        self.similar_share = similar_share
+        self.summarizer = summarizer
+        self.count_tokens = token_counter
+
+    def build(self, prompt: str, task_id: str, agent_name: str, session_id: str) -> str:
+        """Return the context block to prepend to `prompt`, or "" when there is no history."""
+        key = self.SUMMARY_KEY.format(task_id=task_id, agent_name=agent_name)
+        summary, covered, until = self._load_summary(key, session_id)
+        # Turns the summary does not cover yet; the recent window is always among them
+        history = self.memory_manager.load_history(
+            task_id=task_id, agent_name=agent_name, session_id=session_id, limit=self.history_turns, since=until
+        )
+        if not history and not summary:
+            return ""
+        recent = history[-self.recent_turns:] if self.recent_turns > 0 else []
+        unsummarized = history[:len(history) - len(recent)]
+        if unsummarized:
+            # Stored already trimmed so the summary itself stays bounded as the session grows
+            summary = self._fit(
+                self.summarizer(summary, unsummarized), int(self.token_budget * self.summary_share), keep_end=True
+            )
+            covered += len(unsummarized)
+            self.memory_manager.save_task(Task(
+                task_id=key, description=f"Rolling context summary for {agent_name} on {task_id}",
+                parameters={"summary": summary, "turns": covered, "until": unsummarized[-1][2]},
+            ), session_id)
+        sections = []
+        remaining = self.token_budget
+        if summary:
+            sections.append(f"Summary of earlier conversation:\n{summary}")
+            remaining -= self.count_tokens(sections[-1])
+            similar_budget = min(remaining, int(self.token_budget * self.similar_share))
+            similar = self._similar(prompt, recent, task_id, agent_name, session_id, similar_budget)
+            if similar:
+                sections.append(f"Relevant earlier exchanges:\n{similar}")
+                remaining -= self.count_tokens(sections[-1])
+        recent_block = self._recent(recent, remaining)
+        if recent_block:
+            sections.append(f"Previous conversation:\n{recent_block}")
+        context = "\n\n".join(sections)
+        logger.debug(
+            f"Built context for task_id={task_id}, agent_name={agent_name}: read={len(history)}, summarized={covered}, "
+            f"tokens={self.count_tokens(context)}/{self.token_budget}"
+        )
+        return context
+
+    def _load_summary(self, key: str, session_id: str) -> Tuple[str, int, Optional[str]]:
+        """Return (summary, turns covered, timestamp of the last covered turn) from the session's tasks."""
+        record = self.memory_manager.load_task(key, session_id)
+        if record:
+            try:
+                return record.parameters["summary"], record.parameters["turns"], record.parameters["until"]
+            except (KeyError, TypeError):
+                logger.warning(f"Discarding malformed context summary for {key}")
+        return "", 0, None
+
+    def _similar(self, prompt: str, recent: List[Turn], task_id: str, agent_name: str, session_id: str, budget: int) -> str:
+        if self.similar_turns <= 0 or budget <= 0:
+            return ""
+        # Recent turns are shown verbatim already
+        recent_keys = {(p, r) for p, r, _ in recent}
+        try:
+            matches = self.memory_manager.get_memory(session_id).find_similar(
+                prompt, task_id=task_id, n_results=self.similar_turns
+            )
+        except Exception as e:
+            logger.warning(f"Similarity lookup for context failed: {str(e)}")
+            return ""
+        lines, used = [], 0
+        for match in matches:
+            if (match.get("prompt"), match.get("response")) in recent_keys or not match.get("prompt"):
+                continue
+            if match.get("agent_name", agent_name) != agent_name:
+                continue
+            line = self._format(match["prompt"], match["response"])
+            cost = self.count_tokens(line)
+            if used + cost > budget:
+                break
+            lines.append(line)
+            used += cost
+        return "\n".join(lines)
+
+    def _recent(self, recent: List[Turn], budget: int) -> str:
+        """Newest turns first until the budget runs out, returned in chronological order."""
+        lines, used = [], 0
+        for prompt, response, _ in reversed(recent):
+            line = self._format(prompt, response)
+            cost = self.count_tokens(line)
+            if used + cost > budget:
+                if not lines:
+                    lines.append(self._fit(line, budget, keep_end=True))
+                break
+            lines.append(line)
+            used += cost
+        return "\n".join(reversed([line for line in lines if line]))
+
+    def _fit(self, text: str, budget: int, keep_end: bool = False) -> str:
+        """Trim text to roughly `budget` tokens, keeping its end (newest part) when keep_end is set."""
+        if budget <= 0:
+            return ""
+        if self.count_tokens(text) <= budget:
+            return text
+        ratio = budget / self.count_tokens(text)
+        keep = int(len(text) * ratio) - 3
+        if keep <= 0:
+            return ""
+        return "..." + text[-keep:] if keep_end else text[:keep] + "..."
+
+    @staticmethod
+    def _format(prompt: str, response: str) -> str:
+        return f"Prompt: {prompt}\nResponse: {response}"
@@ -0,0 +1,207 @@
+# seclorum/agents/memory/embedding.py
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+def is_ollama_model(model_name: str) -> bool:
+    """Models served by ollama rather than loaded through sentence-transformers."""
+    return model_name.startswith("nomic-embed-text")
+
+class EmbeddingCache:
+    """Persistent embedding cache keyed by model name and a hash of the text.
+
+    Vectors are stored as raw float32 or float16 blobs in SQLite, so a repeated text costs
+    a hash and an indexed lookup instead of a model forward pass.
+    """
+
+    # SQLite's default limit on bound parameters is 999
+    LOOKUP_CHUNK = 500
+
+    def __init__(self, db_path: str, dtype: str = "float32"):
+        """
+        Args:
+            db_path: SQLite file holding the cache; created if missing.
+            dtype: Storage precision, "float32" or "float16". Vectors are returned as float32.
+        """
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+        self.db_path = db_path
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, content_hash TEXT NOT NULL, dtype TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, content_hash)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+        logger.debug(f"Opened embedding cache: db_path={db_path}, dtype={dtype}")
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model_name: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors for whichever of `hashes` are present."""
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(unique), self.LOOKUP_CHUNK):
+                chunk = unique[start:start + self.LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT content_hash, dtype, vector FROM embeddings "
+                    f"WHERE model = ? AND content_hash IN ({','.join('?' * len(chunk))})",
+                    (model_name, *chunk),
+                ).fetchall()
+                for content_hash, dtype, vector in rows:
+                    found[content_hash] = np.frombuffer(vector, dtype=dtype).astype(np.float32)
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(unique) - len(found)
+        return found
+
+    def put_many(self, model_name: str, vectors: Dict[str, np.ndarray]) -> None:
+        """Store vectors keyed by content hash, replacing existing entries."""
+        rows = [
+            (model_name, content_hash, self.dtype.name, np.asarray(vector, dtype=self.dtype).tobytes())
+            for content_hash, vector in vectors.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, content_hash, dtype, vector) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit and miss counts and the number of cached vectors."""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {**self._stats, "size": size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+        logger.debug(f"Closed embedding cache: db_path={self.db_path}")
+
+
+class EmbeddingService:
+    """Process-wide, warm embedding model with batched encoding.
+
+    Use `EmbeddingService.get(model_name)`; every caller asking for the same model shares one
+    instance, so model weights are loaded once per process instead of once per call.
+    """
+
+    _instances: Dict[str, "EmbeddingService"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 32,
+        num_threads: Optional[int] = None,
+        keep_alive: str = "30m",
+    ):
+        """
+        Args:
+            model_name: sentence-transformers model name, or an ollama embedding model.
+            batch_size: Texts encoded per forward pass (or per ollama request).
+            num_threads: Torch intra-op threads for sentence-transformers; None keeps the default.
+            keep_alive: How long ollama keeps the model loaded between requests.
+        """
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.num_threads = num_threads
+        self.keep_alive = keep_alive
+        self.provider = "ollama" if is_ollama_model(model_name) else "sentence_transformers"
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+
+    @classmethod
+    def get(
+        cls,
+        model_name: Optional[str] = None,
+        batch_size: int = 32,
+        num_threads: Optional[int] = None,
+    ) -> "EmbeddingService":
+        """Return the shared service for a model, creating it on first use."""
+        model_name = model_name or DEFAULT_EMBEDDING_MODEL
+        with cls._instances_lock:
+            service = cls._instances.get(model_name)
+            if service is None:
+                service = cls._instances[model_name] = cls(model_name, batch_size, num_threads)
+                logger.debug(f"Registered embedding service for {model_name} ({service.provider})")
+            return service
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drop all shared services, releasing their models."""
+        with cls._instances_lock:
+            cls._instances.clear()
+
+    def _load(self):
+        if self._model is not None:
+            return self._model
+        with self._load_lock:
+            if self._model is None:
+                if self.provider == "ollama":
+                    import ollama
+                    self._model = ollama.Client()
+                else:
+                    from sentence_transformers import SentenceTransformer
+                    if self.num_threads:
+                        import torch
+                        torch.set_num_threads(self.num_threads)
+                    self._model = SentenceTransformer(self.model_name)
+                logger.info(f"Loaded embedding model {self.model_name} ({self.provider})")
+        return self._model
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a single text."""
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: Sequence[str], cache: Optional[EmbeddingCache] = None) -> np.ndarray:
+        """Embed texts in batches, returning a float32 array of shape (len(texts), dim).
+
+        With a cache, only texts whose content hash is not cached for this model are encoded.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        texts = list(texts)
+        if cache is None:
+            return self._encode(texts)
+        hashes = [EmbeddingCache.content_hash(text) for text in texts]
+        vectors = cache.get_many(self.model_name, hashes)
+        missing = {h: text for h, text in zip(hashes, texts) if h not in vectors}
+        if missing:
+            encoded = dict(zip(missing, self._encode(list(missing.values()))))
+            cache.put_many(self.model_name, encoded)
+            vectors.update(encoded)
+        logger.debug(f"Embedding cache for {self.model_name}: {len(texts) - len(missing)} of {len(texts)} texts hit")
+        return np.vstack([vectors[h] for h in hashes]).astype(np.float32, copy=False)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        model = self._load()
+        logger.debug(f"Embedding {len(texts)} texts with {self.model_name}, batch_size={self.batch_size}")
+        if self.provider == "ollama":
+            batches = []
+            for start in range(0, len(texts), self.batch_size):
+                response = model.embed(
+                    model=self.model_name, input=texts[start:start + self.batch_size], keep_alive=self.keep_alive
+                )
+                batches.append(np.asarray(response["embeddings"], dtype=np.float32))
+            return np.vstack(batches)
+        with self._encode_lock:
+            embeddings = model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+        return np.asarray(embeddings, dtype=np.float32)
@@ -2,34 +2,98 @@
 import logging
 import os
 import json
-import time
 import threading
-from typing import List, Optional, Tuple, Dict
+from typing import Any, Iterator, List, Optional, Tuple, Dict
 from seclorum.models import Task
-from seclorum.agents.memory.protocol import MemoryBackend
+from seclorum.agents.memory.protocol import MemoryBackend, utc_timestamp
 from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
+def _is_legacy_log(path: str) -> bool:
+    """Detect the old single-document format ({"conversations": [...], "tasks": [...]}, indent=2)."""
+    try:
+        with open(path, 'r') as f:
+            if f.readline().strip() != "{":
+                return False
+            f.seek(0)
+            data = json.load(f)
+        return isinstance(data, dict) and "type" not in data and ("conversations" in data or "tasks" in data)
+    except (json.JSONDecodeError, OSError, UnicodeDecodeError):
+        return False
+
+def migrate_legacy_log(legacy_path: str, log_path: str) -> int:
+    """Convert an old JSON log into the JSONL format at log_path and keep the original as *.migrated.
+
+    Returns the number of records written. legacy_path and log_path may be the same file.
+    """
+    with open(legacy_path, 'r') as f:
+        data = json.load(f)
+    tmp_path = f"{log_path}.migrating"
+    count = 0
+    with open(tmp_path, 'w') as out:
+        for entry in data.get("conversations", []):
+            out.write(json.dumps({"type": "conversation", **entry}) + "\n")
+            count += 1
+        for entry in data.get("tasks", []):
+            out.write(json.dumps({"type": "task", **entry}) + "\n")
+            count += 1
+        # Records already in a separate JSONL log are newer than the legacy ones
+        if os.path.exists(log_path) and os.path.abspath(log_path) != os.path.abspath(legacy_path):
+            with open(log_path, 'r') as existing:
+                for line in existing:
+                    out.write(line)
+    os.replace(legacy_path, f"{legacy_path}.migrated")
+    os.replace(tmp_path, log_path)
+    logger.info(f"Migrated {count} records from legacy log {legacy_path} to {log_path}")
+    return count
+
 class FileBackend(MemoryBackend):
+    """Append-only JSONL log with a sidecar offset index.
+
+    Every record is one JSON line in `log_path`. The index (`log_path` + ".idx") appends one
+    line per record with its byte offset, keyed by (session_id, task_id, agent_name) for
+    conversations and (session_id, task_id) for tasks, so writes are O(1) appends and loads
+    seek straight to the matching records.
+    """
+    supports_cache = False
+    supports_similarity = False
+
     def __init__(self, log_path: str):
         self.log_path = log_path
+        self.index_path = f"{log_path}.idx"
         self._lock = threading.Lock()
+        self._log_file = None
+        self._index_file = None
+        self._conversation_offsets: Dict[Tuple[str, str, str], List[int]] = {}
+        self._task_offsets: Dict[Tuple[str, str], int] = {}
 
     def initialize(self, **kwargs) -> None:
-        """Initialize the file backend by ensuring the log file directory exists."""
+        """Open the log, migrating an old-format log first, and load or rebuild the offset index."""
         try:
-            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
-            # Ensure the log file exists with the correct structure
-            if not os.path.exists(self.log_path):
-                with self._acquire_lock():
-                    with open(self.log_path, 'w') as f:
-                        json.dump({"conversations": [], "tasks": []}, f, indent=2)
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with self._acquire_lock():
+                legacy_path = self._legacy_path()
+                if legacy_path:
+                    migrate_legacy_log(legacy_path, self.log_path)
+                    if os.path.exists(self.index_path):
+                        os.remove(self.index_path)
+                self._log_file = open(self.log_path, 'ab+')
+                self._load_index()
+                self._index_file = open(self.index_path, 'a')
             logger.info(f"Initialized FileBackend: log_path={self.log_path}")
         except Exception as e:
             logger.error(f"Failed to initialize FileBackend: {str(e)}")
             raise
 
+    def _legacy_path(self) -> Optional[str]:
+        if os.path.exists(self.log_path) and _is_legacy_log(self.log_path):
+            return self.log_path
+        base, ext = os.path.splitext(self.log_path)
+        if ext == ".jsonl" and os.path.exists(f"{base}.json") and _is_legacy_log(f"{base}.json"):
+            return f"{base}.json"
+        return None
+
     @contextmanager
     def _acquire_lock(self):
         """Acquire the file lock for thread-safe operations."""
@@ -42,32 +106,110 @@ class FileBackend(MemoryBackend):
             self._lock.release()
             logger.debug("Released file lock")
 
-    def _read_log(self) -> Dict:
-        """Read the entire log file, returning an empty structure if it doesn't exist."""
-        try:
-            if os.path.exists(self.log_path):
-                with open(self.log_path, 'r') as f:
-                    return json.load(f)
-            return {"conversations": [], "tasks": []}
-        except (json.JSONDecodeError, OSError) as e:
-            logger.error(f"Failed to read log file {self.log_path}: {str(e)}")
-            return {"conversations": [], "tasks": []}
-
-    def _write_log(self, log_data: Dict) -> None:
-        """Write the log data to the file."""
-        try:
-            with open(self.log_path, 'w') as f:
-                json.dump(log_data, f, indent=2)
-        except OSError as e:
-            logger.error(f"Failed to write to log file {self.log_path}: {str(e)}")
-            raise
+    def _index_record(self, record: Dict, offset: int) -> None:
+        if record.get("type") == "task":
+            self._task_offsets[(record["session_id"], record["task_id"])] = offset
+        else:
+            key = (record["session_id"], record["task_id"], record["agent_name"])
+            self._conversation_offsets.setdefault(key, []).append(offset)
+
+    def _load_index(self) -> None:
+        """Load the sidecar index, then index any log records written after it (e.g. after a crash)."""
+        self._conversation_offsets.clear()
+        self._task_offsets.clear()
+        covered = 0
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        kind, key, offset, end = json.loads(line)
+                        if kind == "t":
+                            self._task_offsets[tuple(key)] = offset
+                        else:
+                            self._conversation_offsets.setdefault(tuple(key), []).append(offset)
+                        covered = max(covered, end)
+            except (json.JSONDecodeError, ValueError, OSError) as e:
+                logger.warning(f"Rebuilding corrupt index {self.index_path}: {str(e)}")
+                self._conversation_offsets.clear()
+                self._task_offsets.clear()
+                covered = 0
+                open(self.index_path, 'w').close()
+        log_size = os.path.getsize(self.log_path)
+        if covered > log_size:
+            logger.warning(f"Index {self.index_path} is ahead of its log, rebuilding")
+            self._conversation_offsets.clear()
+            self._task_offsets.clear()
+            covered = 0
+            open(self.index_path, 'w').close()
+        if covered < log_size:
+            self._scan_log(covered)
+
+    def _scan_log(self, start: int) -> None:
+        """Index log records from byte offset `start` and persist their index entries."""
+        entries = []
+        with open(self.log_path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                end = offset + len(line)
+                if line.endswith(b"\n"):
+                    try:
+                        record = json.loads(line)
+                        self._index_record(record, offset)
+                        entries.append(self._index_entry(record, offset, end))
+                    except (json.JSONDecodeError, KeyError) as e:
+                        logger.warning(f"Skipping unreadable record at offset {offset} in {self.log_path}: {str(e)}")
+                else:
+                    # A torn final write; drop it so the next append starts on a clean line
+                    logger.warning(f"Truncating partial record at offset {offset} in {self.log_path}")
+                    self._log_file.truncate(offset)
+                    break
+                offset = end
+        with open(self.index_path, 'a') as idx:
+            idx.writelines(entries)
+        logger.debug(f"Indexed {len(entries)} records from offset {start} in {self.log_path}")
+
+    @staticmethod
+    def _index_entry(record: Dict, offset: int, end: int) -> str:
+        if record.get("type") == "task":
+            return json.dumps(["t", [record["session_id"], record["task_id"]], offset, end]) + "\n"
+        key = [record["session_id"], record["task_id"], record["agent_name"]]
+        return json.dumps(["c", key, offset, end]) + "\n"
+
+    def _append(self, record: Dict) -> None:
+        """Append one record to the log and its entry to the index. Caller holds the lock."""
+        self._append_many([record])
+
+    def _append_many(self, records: List[Dict]) -> None:
+        """Append records with a single write to the log and to the index. Caller holds the lock."""
+        self._log_file.seek(0, os.SEEK_END)
+        offset = self._log_file.tell()
+        lines, entries = [], []
+        for record in records:
+            line = (json.dumps(record) + "\n").encode()
+            lines.append(line)
+            entries.append(self._index_entry(record, offset, offset + len(line)))
+            self._index_record(record, offset)
+            offset += len(line)
+        self._log_file.write(b"".join(lines))
+        self._log_file.flush()
+        self._index_file.writelines(entries)
+        self._index_file.flush()
+
+    def _read_at(self, offset: int) -> Dict:
+        """Read the record starting at `offset`. Caller holds the lock."""
+        self._log_file.seek(offset)
+        return json.loads(self._log_file.readline())
 
     def save_conversation(
         self, session_id: str, task_id: str, agent_name: str, prompt: str, response: str
     ) -> None:
-        """Save a conversation to the conversations list in the log file."""
-        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S.%fZ", time.gmtime())
+        """Append a conversation record to the log file."""
+        timestamp = utc_timestamp()
         entry = {
+            "type": "conversation",
             "session_id": session_id,
             "task_id": task_id,
             "agent_name": agent_name,
@@ -77,9 +219,7 @@ class FileBackend(MemoryBackend):
         }
         with self._acquire_lock():
             try:
-                log_data = self._read_log()
-                log_data["conversations"].append(entry)
-                self._write_log(log_data)
+                self._append(entry)
                 logger.debug(
                     f"Saved conversation to log file: session_id={session_id}, "
                     f"task_id={task_id}, agent_name={agent_name}, log_path={self.log_path}"
@@ -92,21 +232,35 @@ class FileBackend(MemoryBackend):
         self, session_id: str, task_id: str, agent_name: str
     ) -> List[Tuple[str, str, str]]:
         """Load conversation history for the given session, task, and agent."""
+        return self.load_conversation_window(session_id, task_id, agent_name)
+
+    def load_conversation_window(
+        self,
+        session_id: str,
+        task_id: str,
+        agent_name: str,
+        limit: Optional[int] = None,
+        since: Optional[str] = None,
+    ) -> List[Tuple[str, str, str]]:
+        """Read only the indexed records for the session, task, and agent, oldest first."""
         with self._acquire_lock():
             try:
-                log_data = self._read_log()
-                history = [
-                    (entry["prompt"], entry["response"], entry["timestamp"])
-                    for entry in log_data["conversations"]
-                    if entry["session_id"] == session_id
-                    and entry["task_id"] == task_id
-                    and entry["agent_name"] == agent_name
-                ]
+                offsets = self._conversation_offsets.get((session_id, task_id, agent_name), [])
+                if limit is not None and since is None:
+                    offsets = offsets[-limit:] if limit > 0 else []
+                history = []
+                for offset in offsets:
+                    entry = self._read_at(offset)
+                    history.append((entry["prompt"], entry["response"], entry["timestamp"]))
+                if since is not None:
+                    history = [h for h in history if h[2] > since]
+                    if limit is not None:
+                        history = history[-limit:] if limit > 0 else []
                 logger.debug(
                     f"Loaded {len(history)} conversation records: session_id={session_id}, "
                     f"task_id={task_id}, agent_name={agent_name}, log_path={self.log_path}"
                 )
-                return sorted(history, key=lambda x: x[2])  # Sort by timestamp
+                return history
             except Exception as e:
                 logger.error(f"Failed to load conversation history from {self.log_path}: {str(e)}")
                 return []
@@ -121,9 +275,10 @@ class FileBackend(MemoryBackend):
         return None
 
     def save_task(self, session_id: str, task_id: str, task_data: Dict) -> None:
-        """Save task data to the tasks list in the log file."""
-        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S.%fZ", time.gmtime())
+        """Append a task record; the latest record for a task supersedes earlier ones."""
+        timestamp = utc_timestamp()
         entry = {
+            "type": "task",
             "session_id": session_id,
             "task_id": task_id,
             "task_data": task_data,
@@ -131,14 +286,7 @@ class FileBackend(MemoryBackend):
         }
         with self._acquire_lock():
             try:
-                log_data = self._read_log()
-                # Remove any existing task with the same session_id and task_id
-                log_data["tasks"] = [
-                    t for t in log_data["tasks"]
-                    if not (t["session_id"] == session_id and t["task_id"] == task_id)
-                ]
-                log_data["tasks"].append(entry)
-                self._write_log(log_data)
+                self._append(entry)
                 logger.debug(
                     f"Saved task to log file: session_id={session_id}, task_id={task_id}, log_path={self.log_path}"
                 )
@@ -150,23 +298,182 @@ class FileBackend(MemoryBackend):
         """Load the latest task data for the given session and task ID."""
         with self._acquire_lock():
             try:
-                log_data = self._read_log()
-                tasks = [
-                    t for t in log_data["tasks"]
-                    if t["session_id"] == session_id and t["task_id"] == task_id
-                ]
-                if tasks:
-                    # Return the most recent task (latest timestamp)
-                    latest_task = max(tasks, key=lambda x: x["timestamp"])
-                    logger.debug(
-                        f"Loaded task: session_id={session_id}, task_id={task_id}, log_path={self.log_path}"
-                    )
-                    return latest_task["task_data"]
-                return None
+                offset = self._task_offsets.get((session_id, task_id))
+                if offset is None:
+                    return None
+                logger.debug(
+                    f"Loaded task: session_id={session_id}, task_id={task_id}, log_path={self.log_path}"
+                )
+                return self._read_at(offset)["task_data"]
             except Exception as e:
                 logger.error(f"Failed to load task from {self.log_path}: {str(e)}")
                 return None
 
+    def save_conversations_many(self, session_id: str, conversations: List[Tuple[str, str, str, str]]) -> None:
+        """Append (task_id, agent_name, prompt, response) records in a single write."""
+        timestamp = utc_timestamp()
+        entries = [
+            {
+                "type": "conversation",
+                "session_id": session_id,
+                "task_id": task_id,
+                "agent_name": agent_name,
+                "prompt": prompt,
+                "response": response,
+                "timestamp": timestamp
+            }
+            for task_id, agent_name, prompt, response in conversations
+        ]
+        with self._acquire_lock():
+            try:
+                self._append_many(entries)
+                logger.debug(f"Saved {len(entries)} conversations to log file: session_id={session_id}")
+            except Exception as e:
+                logger.error(f"Failed to save conversations to log file {self.log_path}: {str(e)}")
+                raise
+
+    def save_tasks_many(self, session_id: str, tasks: List[Tuple[str, Dict]]) -> None:
+        """Append (task_id, task_data) records in a single write."""
+        timestamp = utc_timestamp()
+        entries = [
+            {"type": "task", "session_id": session_id, "task_id": task_id, "task_data": task_data, "timestamp": timestamp}
+            for task_id, task_data in tasks
+        ]
+        with self._acquire_lock():
+            try:
+                self._append_many(entries)
+                logger.debug(f"Saved {len(entries)} tasks to log file: session_id={session_id}")
+            except Exception as e:
+                logger.error(f"Failed to save tasks to log file {self.log_path}: {str(e)}")
+                raise
+
+    def load_tasks_many(self, session_id: str, task_ids: List[str]) -> Dict[str, Dict]:
+        """Load the latest data of each stored task under one lock acquisition."""
+        with self._acquire_lock():
+            try:
+                offsets = {task_id: self._task_offsets.get((session_id, task_id)) for task_id in task_ids}
+                return {
+                    task_id: self._read_at(offset)["task_data"]
+                    for task_id, offset in offsets.items() if offset is not None
+                }
+            except Exception as e:
+                logger.error(f"Failed to load tasks from {self.log_path}: {str(e)}")
+                return {}
+
+    def cache_responses_many(self, session_id: str, responses: List[Tuple[str, str]]) -> None:
+        """Cache responses (not natively supported, log warning)."""
+        logger.warning("FileBackend does not support caching responses")
+
+    def compact(self) -> None:
+        """Rewrite the log without superseded task records and rebuild the index."""
+        with self._acquire_lock():
+            live_tasks = set(self._task_offsets.values())
+            tmp_path = f"{self.log_path}.compacting"
+            kept = dropped = 0
+            self._log_file.seek(0)
+            with open(tmp_path, 'wb') as out:
+                offset = 0
+                for line in self._log_file:
+                    record = json.loads(line)
+                    if record.get("type") == "task" and offset not in live_tasks:
+                        dropped += 1
+                    else:
+                        out.write(line)
+                        kept += 1
+                    offset += len(line)
+            self._log_file.close()
+            self._index_file.close()
+            os.replace(tmp_path, self.log_path)
+            open(self.index_path, 'w').close()
+            self._log_file = open(self.log_path, 'ab+')
+            self._load_index()
+            self._index_file = open(self.index_path, 'a')
+            logger.info(f"Compacted {self.log_path}: kept={kept}, dropped={dropped}")
+
+    def export_records(
+        self, session_id: Optional[str] = None, cursor: Optional[Any] = None, batch_size: int = 500
+    ) -> Iterator[Tuple[Any, Dict]]:
+        """Stream log records in append order; cursors are the byte offset after each record.
+
+        Superseded task records are skipped. Reads use their own handle and stop at the log size
+        seen when the export started, so concurrent appends are left for the next run.
+        """
+        with self._acquire_lock():
+            end = os.path.getsize(self.log_path)
+            live_tasks = set(self._task_offsets.values())
+        offset = cursor or 0
+        with open(self.log_path, 'rb') as f:
+            f.seek(offset)
+            while offset < end:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                record_offset, offset = offset, offset + len(line)
+                record = json.loads(line)
+                if session_id is not None and record.get("session_id") != session_id:
+                    continue
+                if record.get("type") == "task" and record_offset not in live_tasks:
+                    continue
+                yield offset, record
+
+    def import_records(self, records: List[Dict]) -> None:
+        """Append records in one write, keeping their original timestamps.
+
+        Idempotent: records already in the log, such as a batch re-imported by a resumed
+        migration, are skipped.
+        """
+        with self._acquire_lock():
+            try:
+                new_records = self._unseen_records(records)
+                if new_records:
+                    self._append_many(new_records)
+                logger.debug(
+                    f"Imported {len(new_records)} records to {self.log_path}, "
+                    f"skipped {len(records) - len(new_records)} already present"
+                )
+            except Exception as e:
+                logger.error(f"Failed to import records to {self.log_path}: {str(e)}")
+                raise
+
+    def _unseen_records(self, records: List[Dict]) -> List[Dict]:
+        """Drop records already in the log or repeated in `records`. Caller holds the lock.
+
+        Conversations match on (session_id, task_id, agent_name, timestamp, prompt). Only the
+        stored records for the same key back to the earliest incoming timestamp are read, so a
+        re-imported tail costs one batch of reads rather than the whole history.
+        """
+        earliest: Dict[Tuple[str, str, str], str] = {}
+        for record in records:
+            if record.get("type") != "task":
+                key = (record["session_id"], record["task_id"], record["agent_name"])
+                timestamp = record.get("timestamp") or ""
+                earliest[key] = min(earliest.get(key, timestamp), timestamp)
+        seen = set()
+        for key, since in earliest.items():
+            for offset in reversed(self._conversation_offsets.get(key, [])):
+                entry = self._read_at(offset)
+                if entry["timestamp"] < since:
+                    break
+                seen.add((*key, entry["timestamp"], entry["prompt"]))
+        unseen = []
+        for record in records:
+            if record.get("type") == "task":
+                offset = self._task_offsets.get((record["session_id"], record["task_id"]))
+                if offset is not None:
+                    current = self._read_at(offset)
+                    if (current["timestamp"], current["task_data"]) == (record.get("timestamp"), record["task_data"]):
+                        continue
+            else:
+                natural_key = (
+                    record["session_id"], record["task_id"], record["agent_name"],
+                    record.get("timestamp"), record["prompt"],
+                )
+                if natural_key in seen:
+                    continue
+                seen.add(natural_key)
+            unseen.append(record)
+        return unseen
+
     def find_similar(
         self, text: str, session_id: str, task_id: str, n_results: int
     ) -> List[Dict]:
@@ -179,5 +486,11 @@ class FileBackend(MemoryBackend):
         logger.info(f"Signaled shutdown for FileBackend: log_path={self.log_path}")
 
     def close(self) -> None:
-        """Close the FileBackend (no-op, as no resources need closing)."""
+        """Close the log and index file handles."""
+        with self._acquire_lock():
+            for handle in (self._log_file, self._index_file):
+                if handle:
+                    handle.close()
+            self._log_file = None
+            self._index_file = None
         logger.info(f"Closed FileBackend: log_path={self.log_path}")
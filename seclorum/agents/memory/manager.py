@@ -5,22 +5,39 @@ import subprocess
 import atexit
 import time
 import socket
+import threading
 from typing import List, Dict, Optional, Tuple
 from seclorum.models import Task
 from seclorum.agents.memory.memory import Memory
-from seclorum.agents.memory.sqlite import SQLiteBackend
+from seclorum.agents.memory.cache import PromptCache
+from seclorum.agents.memory.sqlite import SQLiteBackend, SharedSQLiteBackend
 from seclorum.agents.memory.file import FileBackend
 from seclorum.agents.memory.vector import VectorBackend
+from seclorum.agents.memory.mmap_vector import MmapVectorBackend
+from seclorum.agents.memory.embedding import is_ollama_model
 import ollama
 
 logger = logging.getLogger(__name__)
 
+# Session id under which cross-session prompt cache entries are stored
+SHARED_CACHE_SESSION = "__shared__"
+
 class MemoryManager:
     def __init__(
         self,
         base_dir: str = "agents/logs/conversations",
         backends: Optional[List[Dict[str, any]]] = None,
         embedding_model: str = "nomic-embed-text:latest",
+        prompt_cache_size: int = 1024,
+        shared_store: bool = False,
+        shards: int = 1,
+        fan_out: bool = False,
+        vector_index: str = "chroma",
+        vector_retention: str = "persistent",
+        vector_ttl: Optional[float] = None,
+        reconcile_on_start: bool = True,
+        shared_cache_path: Optional[str] = None,
+        shared_cache_ttl: Optional[float] = 86400,
     ):
         """
         Initialize MemoryManager with configurable backends and embedding model.
@@ -29,34 +46,108 @@ class MemoryManager:
             base_dir: Base directory for backend storage (e.g., SQLite DBs, JSON logs).
             backends: List of backend configurations, each with 'backend' (class) and 'config' (dict).
             embedding_model: Name of the embedding model for VectorBackend.
+            prompt_cache_size: Entries held in each session's in-process prompt cache.
+            shared_store: Keep every session in one process-wide SQLite store instead of a DB per session.
+            shards: Number of database files the shared store spreads sessions across.
+            fan_out: Write non-primary backends on background executors instead of inline.
+            vector_index: "chroma" for VectorBackend, or "mmap" for the NumPy memory-mapped index.
+            vector_retention: VectorBackend retention mode: "persistent", "ephemeral" or "ttl".
+            vector_ttl: Document lifetime in seconds when vector_retention is "ttl".
+            reconcile_on_start: When a session's Memory is created, embed records the primary
+                backend has but the vector index lacks, starting where the last reconcile stopped.
+            shared_cache_path: SQLite file of the cross-session prompt cache; defaults to
+                base_dir/prompt_cache.db.
+            shared_cache_ttl: Seconds an entry in the cross-session prompt cache stays valid.
         """
         self.base_dir = base_dir
         self.embedding_model = embedding_model
+        self.prompt_cache_size = prompt_cache_size
+        self.shared_store = shared_store
+        self.shards = shards
+        self.fan_out = fan_out
+        if vector_index not in ("chroma", "mmap"):
+            raise ValueError(f"Unknown vector_index: {vector_index}")
+        self.vector_index = vector_index
+        self.vector_retention = vector_retention
+        self.vector_ttl = vector_ttl
+        self.reconcile_on_start = reconcile_on_start
+        self.shared_cache_path = shared_cache_path or os.path.join(base_dir, "prompt_cache.db")
+        self.shared_cache_ttl = shared_cache_ttl
+        self._shared_cache: Optional[PromptCache] = None
         self.ollama_process = None
         self.sessions: Dict[str, Memory] = {}
         self.backends = backends or self._default_backends()
-        self._initialize()
+        # The embedding runtime is started on first use so constructing a manager stays cheap
+        self._initialized = False
+        self._lock = threading.RLock()
 
     def _default_backends(self) -> List[Dict[str, any]]:
         """Define default backend configurations."""
-        return [
-            {
+        if self.shared_store:
+            sqlite_backend = {
+                "backend": SharedSQLiteBackend,
+                "config": {
+                    "db_path": os.path.join(self.base_dir, "memory_{shard}.db" if self.shards > 1 else "memory.db"),
+                    "shards": self.shards,
+                    "cache_sweep_interval": 300,
+                }
+            }
+        else:
+            sqlite_backend = {
                 "backend": SQLiteBackend,
-                "config": {"db_path": os.path.join(self.base_dir, "{session_id}.db"), "preserve_db": True}
-            },
-            {
-                "backend": FileBackend,
-                "config": {"log_path": os.path.join(self.base_dir, "conversation_{session_id}.json")}
-            },
-            {
+                "config": {
+                    "db_path": os.path.join(self.base_dir, "{session_id}.db"),
+                    "preserve_db": True,
+                    "cache_sweep_interval": 300,
+                }
+            }
+        if self.vector_index == "mmap":
+            vector_backend = {
+                "backend": MmapVectorBackend,
+                "config": {
+                    # Partitioned by session inside one directory
+                    "db_path": os.path.join(self.base_dir, "vector_index"),
+                    "embedding_model": self.embedding_model,
+                    "embedding_cache_path": os.path.join(self.base_dir, "embeddings.db"),
+                }
+            }
+        else:
+            vector_backend = {
                 "backend": VectorBackend,
                 "config": {
                     "db_path": os.path.join(self.base_dir, "vector_db_{session_id}"),
-                    "embedding_model": self.embedding_model
+                    "embedding_model": self.embedding_model,
+                    "embedding_cache_path": os.path.join(self.base_dir, "embeddings.db"),
+                    "retention": self.vector_retention,
+                    "ttl_seconds": self.vector_ttl,
                 }
             }
+        return [
+            sqlite_backend,
+            {
+                "backend": FileBackend,
+                "config": {"log_path": os.path.join(self.base_dir, "conversation_{session_id}.jsonl")}
+            },
+            vector_backend,
         ]
 
+    def _needs_ollama(self) -> bool:
+        return any(
+            issubclass(b["backend"], (VectorBackend, MmapVectorBackend))
+            and is_ollama_model(b.get("config", {}).get("embedding_model") or "")
+            for b in self.backends
+        )
+
+    def _ensure_initialized(self):
+        """Run the one-time runtime initialization if it has not happened yet."""
+        if self._initialized:
+            return
+        with self._lock:
+            if not self._initialized:
+                if self._needs_ollama():
+                    self._initialize()
+                self._initialized = True
+
     def _initialize(self):
         """Initialize ollama resources for embedding model."""
         try:
@@ -72,7 +163,7 @@ class MemoryManager:
                     stderr=subprocess.DEVNULL
                 )
                 atexit.register(self._stop_ollama)
-                time.sleep(5)  # Wait for server to start
+                self._wait_for_ollama()
                 try:
                     ollama.pull(self.embedding_model)
                     logger.info(f"Pulled embedding model {self.embedding_model}")
@@ -84,6 +175,18 @@ class MemoryManager:
             logger.error(f"Failed to initialize MemoryManager: {str(e)}")
             raise
 
+    def _wait_for_ollama(self, timeout: float = 10.0, interval: float = 0.25):
+        """Poll the ollama server until it answers instead of sleeping a fixed time."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                ollama.list()
+                return
+            except Exception:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"ollama server did not start within {timeout}s")
+                time.sleep(interval)
+
     def _stop_ollama(self):
         """Clean up ollama resources without shutting down the shared server."""
         if self.ollama_process:
@@ -109,20 +212,36 @@ class MemoryManager:
 
     def get_memory(self, session_id: str) -> Memory:
         """Get or create a Memory instance for the session."""
-        if session_id not in self.sessions:
-            # Substitute session_id in backend configurations
-            session_backends = []
-            for backend_config in self.backends:
-                backend_class = backend_config["backend"]
-                config = backend_config.get("config", {}).copy()
-                # Replace {session_id} placeholders in config values
-                for key, value in config.items():
-                    if isinstance(value, str):
-                        config[key] = value.format(session_id=session_id)
-                session_backends.append({"backend": backend_class, "config": config})
-            self.sessions[session_id] = Memory(session_id=session_id, backends=session_backends)
-            logger.debug(f"Created Memory instance for session_id={session_id}")
-        return self.sessions[session_id]
+        memory = self.sessions.get(session_id)
+        if memory is not None:
+            return memory
+        self._ensure_initialized()
+        with self._lock:
+            if session_id not in self.sessions:
+                # Substitute session_id in backend configurations
+                session_backends = []
+                for backend_config in self.backends:
+                    config = backend_config.get("config", {}).copy()
+                    # Replace {session_id} placeholders in config values; other placeholders such as
+                    # {shard} are left for the backend to resolve
+                    for key, value in config.items():
+                        if isinstance(value, str):
+                            config[key] = value.replace("{session_id}", session_id)
+                    session_backends.append({**backend_config, "config": config})
+                memory = Memory(
+                    session_id=session_id,
+                    backends=session_backends,
+                    prompt_cache_size=self.prompt_cache_size,
+                    fan_out=self.fan_out,
+                )
+                self.sessions[session_id] = memory
+                logger.debug(f"Created Memory instance for session_id={session_id}")
+            else:
+                return self.sessions[session_id]
+        if self.reconcile_on_start:
+            # Outside the lock: embedding a backlog must not hold up other sessions' first access
+            memory.reconcile_indexes()
+        return memory
 
     def save(self, prompt: str, response: str, task_id: str, agent_name: str, session_id: str) -> None:
         """Save a conversation to the Memory instance for the session."""
@@ -133,14 +252,55 @@ class MemoryManager:
             f"task_id={task_id}, agent_name={agent_name}"
         )
 
+    def save_many(self, conversations: List[Tuple[str, str, str, str]], session_id: str) -> None:
+        """Save (prompt, response, task_id, agent_name) tuples to the session's Memory in bulk."""
+        self.get_memory(session_id).save_many(conversations)
+        logger.debug(f"Saved {len(conversations)} conversations via MemoryManager: session_id={session_id}")
+
+    def save_tasks_many(self, tasks: List[Task], session_id: str) -> None:
+        """Save tasks to the session's Memory in bulk."""
+        self.get_memory(session_id).save_tasks_many(tasks)
+        logger.debug(f"Saved {len(tasks)} tasks via MemoryManager: session_id={session_id}")
+
+    def load_tasks_many(self, task_ids: List[str], session_id: str) -> Dict[str, Task]:
+        """Load several tasks from the session's Memory, keyed by task id."""
+        return self.get_memory(session_id).load_tasks_many(task_ids)
+
+    def cache_responses_many(self, responses: List[Tuple[str, str]], session_id: str) -> None:
+        """Cache (prompt_hash, response) pairs in the session's Memory in bulk."""
+        self.get_memory(session_id).cache_responses_many(responses)
+        logger.debug(f"Cached {len(responses)} responses via MemoryManager: session_id={session_id}")
+
     def save_task(self, task: Task, session_id: str) -> None:
         """Save a task to the Memory instance for the session."""
         memory = self.get_memory(session_id)
         memory.save_task(task)
         logger.debug(f"Saved task via MemoryManager: session_id={session_id}, task_id={task.task_id}")
 
-    def load_cached_response(self, prompt_hash: str, session_id: str) -> Optional[str]:
-        """Load a cached response for the prompt hash from the session's Memory."""
+    def shared_cache(self) -> PromptCache:
+        """The prompt cache shared by all sessions, opened on first use."""
+        if self._shared_cache is not None:
+            return self._shared_cache
+        with self._lock:
+            if self._shared_cache is None:
+                os.makedirs(os.path.dirname(self.shared_cache_path) or ".", exist_ok=True)
+                backend = SharedSQLiteBackend(
+                    self.shared_cache_path, cache_ttl=self.shared_cache_ttl, cache_sweep_interval=300
+                )
+                backend.initialize()
+                self._shared_cache = PromptCache(
+                    SHARED_CACHE_SESSION, [backend], max_entries=self.prompt_cache_size, ttl=self.shared_cache_ttl
+                )
+                logger.debug(f"Opened shared prompt cache: {self.shared_cache_path}")
+            return self._shared_cache
+
+    def load_cached_response(self, prompt_hash: str, session_id: str, shared: bool = False) -> Optional[str]:
+        """Load a cached response from the session's Memory, or from the cross-session cache when `shared`."""
+        if shared:
+            response = self.shared_cache().get(prompt_hash)
+            if response:
+                logger.debug(f"Loaded shared cached response via MemoryManager: prompt_hash={prompt_hash}")
+            return response
         memory = self.get_memory(session_id)
         response = memory.load_cached_response(prompt_hash)
         if response:
@@ -149,6 +309,16 @@ class MemoryManager:
             )
         return response
 
+    def cache_response(self, prompt_hash: str, response: str, session_id: str, shared: bool = False) -> None:
+        """Cache a response in the session's Memory, or in the cross-session cache when `shared`."""
+        if shared:
+            self.shared_cache().put(prompt_hash, response)
+            logger.debug(f"Cached shared response via MemoryManager: prompt_hash={prompt_hash}")
+            return
+        memory = self.get_memory(session_id)
+        memory.cache_response(prompt_hash, response)
+        logger.debug(f"Cached response via MemoryManager: session_id={session_id}, prompt_hash={prompt_hash}")
+
     def load_task(self, task_id: str, session_id: str) -> Optional[Task]:
         """Load a task from the session's Memory."""
         memory = self.get_memory(session_id)
@@ -157,16 +327,27 @@ class MemoryManager:
             logger.debug(f"Loaded task via MemoryManager: session_id={session_id}, task_id={task_id}")
         return task
 
-    def load_history(self, task_id: str, agent_name: str, session_id: str) -> List[Tuple[str, str, str]]:
+    def load_history(
+        self, task_id: str, agent_name: str, session_id: str, limit: Optional[int] = None, since: Optional[str] = None
+    ) -> List[Tuple[str, str, str]]:
         """Load conversation history for the task and agent from the session's Memory."""
         memory = self.get_memory(session_id)
-        history = memory.load_history(task_id, agent_name)
+        history = memory.load_history(task_id, agent_name, limit=limit, since=since)
         logger.debug(
             f"Loaded conversation history via MemoryManager: session_id={session_id}, "
             f"task_id={task_id}, agent_name={agent_name}, count={len(history)}"
         )
         return history
 
+    def flush(self, session_id: Optional[str] = None, timeout: Optional[float] = None) -> None:
+        """Wait for buffered writes of one session, or of every open session, to become durable."""
+        if session_id is not None:
+            memories = [self.sessions[session_id]] if session_id in self.sessions else []
+        else:
+            memories = list(self.sessions.values())
+        for memory in memories:
+            memory.flush(timeout=timeout)
+
     def stop(self):
         """Signal shutdown of MemoryManager."""
         logger.info("Stopping MemoryManager")
@@ -176,6 +357,9 @@ class MemoryManager:
                 memory.stop()
             except Exception as e:
                 logger.warning(f"Failed to stop session {session_id}: {str(e)}")
+        if self._shared_cache is not None:
+            for backend in self._shared_cache.backends:
+                backend.stop()
 
     def close(self):
         """Free all resources associated with MemoryManager."""
@@ -188,3 +372,50 @@ class MemoryManager:
             except Exception as e:
                 logger.warning(f"Failed to close session {session_id}: {str(e)}")
         self.sessions.clear()
+        if self._shared_cache is not None:
+            for backend in self._shared_cache.backends:
+                backend.close()
+            self._shared_cache = None
+        self._initialized = False
+
+
+_managers: Dict[str, List] = {}  # config key -> [MemoryManager, refcount]
+_managers_lock = threading.Lock()
+
+def _manager_key(kwargs: Dict) -> str:
+    return repr(sorted(kwargs.items()))
+
+def acquire_memory_manager(**kwargs) -> MemoryManager:
+    """Return the process-wide MemoryManager for this configuration, creating it on first use.
+
+    Every caller must pair this with release_memory_manager().
+    """
+    key = _manager_key(kwargs)
+    with _managers_lock:
+        entry = _managers.get(key)
+        if entry is None:
+            entry = _managers[key] = [MemoryManager(**kwargs), 0]
+            logger.debug(f"Registered shared MemoryManager: {key}")
+        entry[1] += 1
+        return entry[0]
+
+def release_memory_manager(manager: MemoryManager) -> None:
+    """Drop one reference to a shared MemoryManager, closing it when the last one goes.
+
+    Earlier releases only flush, so sessions other agents still use stay open.
+    """
+    with _managers_lock:
+        for key, entry in _managers.items():
+            if entry[0] is manager:
+                entry[1] -= 1
+                last = entry[1] <= 0
+                if last:
+                    del _managers[key]
+                break
+        else:
+            last = True
+    if last:
+        manager.stop()
+        manager.close()
+    else:
+        manager.flush()
@@ -1,16 +1,40 @@
 # seclorum/agents/memory/memory.py
 import logging
-from typing import List, Optional, Tuple, Dict
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from typing import List, Optional, Set, Tuple, Dict
 from seclorum.models import Task
 from seclorum.agents.memory.protocol import MemoryBackend
+from seclorum.agents.memory.cache import PromptCache
 
 logger = logging.getLogger(__name__)
 
+# Weight of the newest sample in each backend's read latency average
+READ_LATENCY_ALPHA = 0.2
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict]], n_results: int, k: int = 60) -> List[Dict]:
+    """Merge ranked result lists (e.g. BM25 and vector) by reciprocal rank fusion.
+
+    Results are matched on agent, prompt and response, since backends format timestamps differently.
+    """
+    fused: Dict[Tuple, Dict] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results):
+            key = (result.get("agent_name"), result.get("prompt"), result.get("response"))
+            entry = fused.setdefault(key, {**result, "score": 0.0})
+            entry["score"] += 1.0 / (k + rank + 1)
+    return sorted(fused.values(), key=lambda r: r["score"], reverse=True)[:n_results]
+
 class Memory:
     def __init__(
         self,
         session_id: str,
         backends: List[Dict[str, any]],
+        prompt_cache_size: int = 1024,
+        prompt_cache_ttl: Optional[float] = 3600,
+        fan_out: bool = False,
+        wait_for_all: bool = False,
     ):
         """
         Initialize Memory with a list of backend configurations.
@@ -18,11 +42,35 @@ class Memory:
         Args:
             session_id: Unique identifier for the session.
             backends: List of dictionaries, each containing 'backend' (MemoryBackend class)
-                      and 'config' (dict of initialization parameters).
+                      and 'config' (dict of initialization parameters). One entry may set
+                      'primary': True; otherwise the first backend is primary.
+            prompt_cache_size: Entries held in the in-process prompt cache tier.
+            prompt_cache_ttl: Seconds an in-process prompt cache entry stays valid.
+            fan_out: Write the primary backend on the caller's thread and every other backend
+                     on its own ordered single-thread executor.
+            wait_for_all: In fan-out mode, block writes until every backend has applied them.
         """
         self.session_id = session_id
         self.backends: List[MemoryBackend] = []
+        self.primary: Optional[MemoryBackend] = None
+        self.fan_out = fan_out
+        self.wait_for_all = wait_for_all
         self._initialize_backends(backends)
+        self._executors: Dict[int, ThreadPoolExecutor] = {}
+        self._pending_writes: Dict[int, int] = {}
+        self._read_latency: Dict[int, float] = {}
+        # Backend id -> writes it missed, as (method, task_id); task_id is None for writes a later one cannot repair
+        self._stale: Dict[int, Set[Tuple[str, Optional[str]]]] = {}
+        self._stats_lock = threading.Lock()
+        if fan_out:
+            for backend in self.backends:
+                if backend is not self.primary:
+                    self._executors[id(backend)] = ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix=f"Memory-{backend.__class__.__name__}"
+                    )
+        self.prompt_cache = PromptCache(
+            session_id, self.backends, max_entries=prompt_cache_size, ttl=prompt_cache_ttl
+        )
 
     def _initialize_backends(self, backends: List[Dict[str, any]]) -> None:
         """Initialize all configured backends."""
@@ -36,38 +84,167 @@ class Memory:
                 backend_instance = backend_class(**config)
                 backend_instance.initialize(**config)
                 self.backends.append(backend_instance)
+                if backend_config.get("primary"):
+                    self.primary = backend_instance
                 logger.info(f"Initialized backend: {backend_class.__name__}")
             except Exception as e:
                 logger.error(f"Failed to initialize backend {backend_class.__name__}: {str(e)}")
                 raise
+        if self.primary is None and self.backends:
+            self.primary = self.backends[0]
+
+    def _write(self, backend: MemoryBackend, method: str, **kwargs) -> None:
+        try:
+            getattr(backend, method)(session_id=self.session_id, **kwargs)
+            logger.debug(
+                f"{method} to {backend.__class__.__name__} succeeded: session_id={self.session_id}, "
+                f"task_id={kwargs.get('task_id')}"
+            )
+        except Exception as e:
+            logger.warning(f"Failed to {method} in {backend.__class__.__name__}: {str(e)}")
+            if backend is not self.primary:
+                with self._stats_lock:
+                    self._stale.setdefault(id(backend), set()).update(self._write_keys(method, kwargs))
+            return
+        if method == "save_task":
+            # Rewriting a task replaces the version the failed write missed
+            with self._stats_lock:
+                missed = self._stale.get(id(backend))
+                if missed:
+                    missed.discard((method, kwargs["task_id"]))
+                    if not missed:
+                        del self._stale[id(backend)]
 
-    def save(self, prompt: str, response: str, task_id: str, agent_name: str) -> None:
+    @staticmethod
+    def _write_keys(method: str, kwargs: Dict) -> List[Tuple[str, Optional[str]]]:
+        if method == "save_task":
+            return [(method, kwargs["task_id"])]
+        if method == "save_tasks_many":
+            return [("save_task", task_id) for task_id, _ in kwargs["tasks"]]
+        return [(method, None)]
+
+    def _dispatch(
+        self, method: str, backends: List[MemoryBackend], wait: Optional[bool] = None, **kwargs
+    ) -> List[Future]:
+        """Apply a write to each backend, synchronously or through its executor in fan-out mode.
+
+        Returns the futures of the queued writes; they are awaited when `wait`
+        (or `wait_for_all` if `wait` is None) is set.
+        """
+        futures = []
+        # Queue the background writes first so they overlap with the synchronous ones
+        for backend in backends:
+            key = id(backend)
+            executor = self._executors.get(key)
+            if executor is None:
+                continue
+            with self._stats_lock:
+                self._pending_writes[key] = self._pending_writes.get(key, 0) + 1
+            future = executor.submit(self._write, backend, method, **kwargs)
+            future.add_done_callback(lambda _, key=key: self._write_done(key))
+            futures.append(future)
+        for backend in backends:
+            if id(backend) not in self._executors:
+                self._write(backend, method, **kwargs)
+        if futures and (self.wait_for_all if wait is None else wait):
+            wait_futures(futures)
+        return futures
+
+    def _write_done(self, key: int) -> None:
+        with self._stats_lock:
+            self._pending_writes[key] -= 1
+
+    def _readers(self, capability: Optional[str] = None, primary_first: bool = False) -> List[MemoryBackend]:
+        """Backends able to serve a read, in the order to try them.
+
+        Without fan-out, or with `primary_first`, the primary comes first and the others follow
+        in declaration order. In fan-out mode the rest are ordered fastest first. Backends with
+        writes still queued, or that missed a write (until `reconcile_indexes` repairs them or the
+        same task is written again), are skipped so reads never observe state older than the
+        primary's. Callers still treat an empty answer from any backend but the primary as a miss.
+        """
+        with self._stats_lock:
+            candidates = [
+                b for b in self.backends
+                if (capability is None or getattr(b, capability, True))
+                and (b is self.primary or not (self._pending_writes.get(id(b)) or self._stale.get(id(b))))
+            ]
+            latency = dict(self._read_latency)
+        if not self.fan_out or primary_first:
+            return sorted(candidates, key=lambda b: b is not self.primary)
+        # Unmeasured backends sort first so each gets probed once; ties keep declaration order
+        return sorted(candidates, key=lambda b: latency.get(id(b), 0.0))
+
+    def _record_read(self, backend: MemoryBackend, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            previous = self._read_latency.get(id(backend))
+            self._read_latency[id(backend)] = (
+                elapsed if previous is None else previous + READ_LATENCY_ALPHA * (elapsed - previous)
+            )
+
+    def read_latencies(self) -> Dict[str, float]:
+        """Return the moving average read latency, in seconds, of each measured backend."""
+        with self._stats_lock:
+            return {
+                b.__class__.__name__: self._read_latency[id(b)] for b in self.backends if id(b) in self._read_latency
+            }
+
+    def save(
+        self, prompt: str, response: str, task_id: str, agent_name: str, wait: Optional[bool] = None
+    ) -> None:
         """Save a conversation to all backends."""
-        for backend in self.backends:
-            try:
-                backend.save_conversation(
-                    session_id=self.session_id,
-                    task_id=task_id,
-                    agent_name=agent_name,
-                    prompt=prompt,
-                    response=response,
-                )
-                logger.debug(
-                    f"Saved conversation to {backend.__class__.__name__}: "
-                    f"session_id={self.session_id}, task_id={task_id}, agent_name={agent_name}"
-                )
-            except Exception as e:
-                logger.warning(f"Failed to save to {backend.__class__.__name__}: {str(e)}")
+        self._dispatch(
+            "save_conversation",
+            self.backends,
+            wait=wait,
+            task_id=task_id,
+            agent_name=agent_name,
+            prompt=prompt,
+            response=response,
+        )
 
-    def load_history(self, task_id: str, agent_name: str) -> List[Tuple[str, str, str]]:
-        """Load conversation history from the first backend that succeeds."""
-        for backend in self.backends:
+    def save_many(self, conversations: List[Tuple[str, str, str, str]], wait: Optional[bool] = None) -> None:
+        """Save (prompt, response, task_id, agent_name) tuples with one bulk write per backend."""
+        if not conversations:
+            return
+        self._dispatch(
+            "save_conversations_many",
+            self.backends,
+            wait=wait,
+            conversations=[
+                (task_id, agent_name, prompt, response) for prompt, response, task_id, agent_name in conversations
+            ],
+        )
+
+    def load_history(
+        self, task_id: str, agent_name: str, limit: Optional[int] = None, since: Optional[str] = None
+    ) -> List[Tuple[str, str, str]]:
+        """Load conversation history from the primary, or the next history-capable backend if it fails.
+
+        When `limit` or `since` is given only that window of turns is read.
+        """
+        windowed = limit is not None or since is not None
+        for backend in self._readers("supports_history", primary_first=True):
+            started = time.perf_counter()
             try:
-                history = backend.load_conversation_history(
-                    session_id=self.session_id,
-                    task_id=task_id,
-                    agent_name=agent_name,
-                )
+                if windowed:
+                    history = backend.load_conversation_window(
+                        session_id=self.session_id,
+                        task_id=task_id,
+                        agent_name=agent_name,
+                        limit=limit,
+                        since=since,
+                    )
+                else:
+                    history = backend.load_conversation_history(
+                        session_id=self.session_id,
+                        task_id=task_id,
+                        agent_name=agent_name,
+                    )
+                self._record_read(backend, started)
+                if not history and backend is not self.primary:
+                    continue
                 logger.debug(
                     f"Loaded conversation history from {backend.__class__.__name__}: "
                     f"session_id={self.session_id}, task_id={task_id}, agent_name={agent_name}, count={len(history)}"
@@ -78,79 +255,99 @@ class Memory:
         return []
 
     def load_cached_response(self, prompt_hash: str) -> Optional[str]:
-        """Load a cached response from the first backend that succeeds."""
-        for backend in self.backends:
-            try:
-                response = backend.load_cached_response(
-                    session_id=self.session_id,
-                    prompt_hash=prompt_hash,
-                )
-                if response:
-                    logger.debug(
-                        f"Loaded cached response from {backend.__class__.__name__}: "
-                        f"session_id={self.session_id}, prompt_hash={prompt_hash}"
-                    )
-                    return response
-            except Exception as e:
-                logger.warning(f"Failed to load cached response from {backend.__class__.__name__}: {str(e)}")
-        return None
+        """Load a cached response from the prompt cache, consulting only cache-capable backends."""
+        response = self.prompt_cache.get(prompt_hash)
+        if response:
+            logger.debug(f"Loaded cached response: session_id={self.session_id}, prompt_hash={prompt_hash}")
+        return response
 
-    def cache_response(self, prompt_hash: str, response: str) -> None:
-        """Cache a response in all backends."""
-        for backend in self.backends:
-            try:
-                backend.cache_response(
-                    session_id=self.session_id,
-                    prompt_hash=prompt_hash,
-                    response=response,
-                )
-                logger.debug(
-                    f"Cached response in {backend.__class__.__name__}: "
-                    f"session_id={self.session_id}, prompt_hash={prompt_hash}"
-                )
-            except Exception as e:
-                logger.warning(f"Failed to cache response in {backend.__class__.__name__}: {str(e)}")
+    def cache_response(self, prompt_hash: str, response: str, wait: Optional[bool] = None) -> None:
+        """Cache a response in the prompt cache and every cache-capable backend."""
+        self.prompt_cache.put(prompt_hash, response, write_through=False)
+        self._dispatch(
+            "cache_response", self.prompt_cache.backends, wait=wait, prompt_hash=prompt_hash, response=response
+        )
+
+    def cache_responses_many(self, responses: List[Tuple[str, str]], wait: Optional[bool] = None) -> None:
+        """Cache (prompt_hash, response) pairs with one bulk write per cache-capable backend."""
+        if not responses:
+            return
+        for prompt_hash, response in responses:
+            self.prompt_cache.put(prompt_hash, response, write_through=False)
+        self._dispatch("cache_responses_many", self.prompt_cache.backends, wait=wait, responses=responses)
 
-    def save_task(self, task: Task) -> None:
+    def save_task(self, task: Task, wait: Optional[bool] = None) -> None:
         """Save a task to all backends."""
-        task_data = task.dict()
-        for backend in self.backends:
+        self._dispatch("save_task", self.backends, wait=wait, task_id=task.task_id, task_data=task.dict())
+
+    def save_tasks_many(self, tasks: List[Task], wait: Optional[bool] = None) -> None:
+        """Save tasks with one bulk write per backend, e.g. all subtasks of a Plan in one transaction."""
+        if not tasks:
+            return
+        self._dispatch(
+            "save_tasks_many", self.backends, wait=wait, tasks=[(task.task_id, task.dict()) for task in tasks]
+        )
+
+    def load_tasks_many(self, task_ids: List[str]) -> Dict[str, Task]:
+        """Load several tasks, keyed by task id; tasks a secondary backend lacks are read from the next one."""
+        found: Dict[str, Dict] = {}
+        remaining = list(task_ids)
+        for backend in self._readers():
+            started = time.perf_counter()
             try:
-                backend.save_task(
-                    session_id=self.session_id,
-                    task_id=task.task_id,
-                    task_data=task_data,
-                )
+                tasks = backend.load_tasks_many(session_id=self.session_id, task_ids=remaining)
+                self._record_read(backend, started)
                 logger.debug(
-                    f"Saved task to {backend.__class__.__name__}: "
-                    f"session_id={self.session_id}, task_id={task.task_id}"
+                    f"Loaded {len(tasks)}/{len(remaining)} tasks from {backend.__class__.__name__}: "
+                    f"session_id={self.session_id}"
                 )
             except Exception as e:
-                logger.warning(f"Failed to save task to {backend.__class__.__name__}: {str(e)}")
+                logger.warning(f"Failed to load tasks from {backend.__class__.__name__}: {str(e)}")
+                continue
+            found.update(tasks)
+            remaining = [task_id for task_id in remaining if task_id not in found]
+            if not remaining or backend is self.primary:
+                break
+        return {task_id: Task(**task_data) for task_id, task_data in found.items()}
 
     def load_task(self, task_id: str) -> Optional[Task]:
-        """Load a task from the first backend that succeeds."""
-        for backend in self.backends:
+        """Load a task; a miss on a secondary backend falls through to the next one, a miss on the primary is final."""
+        for backend in self._readers():
+            started = time.perf_counter()
             try:
                 task_data = backend.load_task(
                     session_id=self.session_id,
                     task_id=task_id,
                 )
+                self._record_read(backend, started)
                 if task_data:
                     logger.debug(
                         f"Loaded task from {backend.__class__.__name__}: "
                         f"session_id={self.session_id}, task_id={task_id}"
                     )
                     return Task(**task_data)
-                return None
+                if backend is self.primary:
+                    return None
             except Exception as e:
                 logger.warning(f"Failed to load task from {backend.__class__.__name__}: {str(e)}")
         return None
 
-    def find_similar(self, text: str, task_id: str, n_results: int = 5, session_id: Optional[str] = None) -> List[Dict]:
-        """Find similar conversations from backends that support similarity search."""
+    def find_similar(
+        self, text: str, task_id: str, n_results: int = 5, session_id: Optional[str] = None, fuse: bool = False
+    ) -> List[Dict]:
+        """Find similar conversations from backends that support similarity search.
+
+        By default the first backend with results answers, trying semantic (vector) backends
+        before lexical ones such as SQLite FTS; with `fuse` every capable backend is queried and
+        their rankings are merged with reciprocal rank fusion.
+        """
         session_id = session_id or self.session_id
-        for backend in self.backends:
+        result_lists = []
+        readers = self._readers("supports_similarity")
+        if not fuse:
+            readers.sort(key=lambda b: not getattr(b, "semantic_similarity", False))
+        for backend in readers:
+            started = time.perf_counter()
             try:
                 results = backend.find_similar(
                     text=text,
@@ -158,19 +355,65 @@ class Memory:
                     task_id=task_id,
                     n_results=n_results,
                 )
+                self._record_read(backend, started)
                 if results:
                     logger.debug(
                         f"Found {len(results)} similar conversations from {backend.__class__.__name__}: "
                         f"task_id={task_id}"
                     )
-                    return results
+                    if not fuse:
+                        return results
+                    result_lists.append(results)
             except Exception as e:
                 logger.warning(f"Failed to find similar in {backend.__class__.__name__}: {str(e)}")
+        if result_lists:
+            return reciprocal_rank_fusion(result_lists, n_results)
         logger.warning("No backend returned similar conversations")
         return []
 
+    def reconcile_indexes(self) -> int:
+        """Backfill derived indexes (such as a persistent vector store) with session records only the
+        primary backend has, e.g. after a crash or after enabling the index. Returns records added."""
+        self.flush()
+        added = 0
+        for backend in self.backends:
+            if backend is self.primary:
+                continue
+            with self._stats_lock:
+                missed = set(self._stale.get(id(backend), ()))
+            try:
+                added += backend.reconcile(self.primary, session_id=self.session_id)
+                if missed and type(backend).reconcile is not MemoryBackend.reconcile:
+                    # Only a backend that really backfills from the primary catches up; writes
+                    # that failed while it ran stay marked
+                    with self._stats_lock:
+                        remaining = self._stale.get(id(backend), set()) - missed
+                        if remaining:
+                            self._stale[id(backend)] = remaining
+                        else:
+                            self._stale.pop(id(backend), None)
+            except NotImplementedError as e:
+                logger.debug(f"Skipping index reconciliation: {str(e)}")
+                break
+            except Exception as e:
+                logger.warning(f"Failed to reconcile {backend.__class__.__name__}: {str(e)}")
+        return added
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait for queued fan-out writes and buffered backend writes to become durable."""
+        # Each executor runs one task at a time in order, so a no-op marks everything queued before it
+        barriers = [executor.submit(lambda: None) for executor in self._executors.values()]
+        if barriers:
+            wait_futures(barriers, timeout=timeout)
+        for backend in self.backends:
+            try:
+                backend.flush(timeout=timeout)
+            except Exception as e:
+                logger.warning(f"Failed to flush {backend.__class__.__name__}: {str(e)}")
+
     def stop(self):
         """Signal shutdown of all backends."""
+        self.flush()
         for backend in self.backends:
             try:
                 backend.stop()
@@ -180,6 +423,9 @@ class Memory:
 
     def close(self):
         """Close all backend resources."""
+        for executor in self._executors.values():
+            executor.shutdown(wait=True)
+        self._executors.clear()
         for backend in self.backends:
             try:
                 backend.close()
@@ -0,0 +1,140 @@
+# seclorum/agents/memory/migrate.py
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+from seclorum.agents.memory.protocol import MemoryBackend
+
+logger = logging.getLogger(__name__)
+
+def load_checkpoint(checkpoint_path: Optional[str]) -> Dict:
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return {"cursor": None, "migrated": 0}
+    with open(checkpoint_path, 'r') as f:
+        return json.load(f)
+
+def save_checkpoint(checkpoint_path: str, checkpoint: Dict) -> None:
+    """Write the checkpoint atomically so an interrupted run never leaves a torn file."""
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
+def migrate(
+    source: MemoryBackend,
+    target: MemoryBackend,
+    session_id: Optional[str] = None,
+    batch_size: int = 500,
+    checkpoint_path: Optional[str] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Stream conversations and tasks from `source` into `target` in batches.
+
+    Memory use is bounded by `batch_size` whatever the history size. After each batch is
+    flushed to the target, the source cursor is written to `checkpoint_path`, and a later run
+    with the same checkpoint resumes from there; a batch interrupted before its checkpoint is
+    imported again. Returns the total number of records migrated, including earlier runs.
+
+    Args:
+        source: Backend to export from; must implement export_records.
+        target: Backend to import into.
+        session_id: Only migrate this session; None migrates everything.
+        batch_size: Records read, written and checkpointed together.
+        checkpoint_path: JSON file recording progress; None disables resuming.
+        progress: Called with the running total after each batch.
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint.get("cursor") is not None and checkpoint.get("session_id") != session_id:
+        raise ValueError(
+            f"Checkpoint {checkpoint_path} is for session_id={checkpoint.get('session_id')}, not {session_id}"
+        )
+    migrated = checkpoint.get("migrated", 0)
+    batch: List[Dict] = []
+    cursor: Any = checkpoint.get("cursor")
+    started = time.monotonic()
+
+    def commit():
+        nonlocal migrated
+        target.import_records(batch)
+        target.flush()
+        migrated += len(batch)
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, {"cursor": cursor, "migrated": migrated, "session_id": session_id})
+        batch.clear()
+        if progress:
+            progress(migrated)
+
+    if cursor is not None:
+        logger.info(f"Resuming migration after {migrated} records from cursor {cursor}")
+    for cursor, record in source.export_records(session_id=session_id, cursor=cursor, batch_size=batch_size):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            commit()
+    if batch:
+        commit()
+    logger.info(
+        f"Migrated {migrated} records from {source.__class__.__name__} to {target.__class__.__name__} "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+    return migrated
+
+def open_backend(spec: str, embedding_model: Optional[str] = None) -> MemoryBackend:
+    """Open a backend from a "kind:path" spec, where kind is sqlite, file, chroma or mmap."""
+    kind, sep, path = spec.partition(":")
+    if not sep or not path:
+        raise ValueError(f"Expected <kind>:<path>, got {spec!r}")
+    if kind == "sqlite":
+        from seclorum.agents.memory.sqlite import SQLiteBackend
+        # Both ends of a migration are the user's data; closing them must not delete the file
+        backend = SQLiteBackend(path, preserve_db=True)
+    elif kind == "file":
+        from seclorum.agents.memory.file import FileBackend
+        backend = FileBackend(path)
+    elif kind == "chroma":
+        from seclorum.agents.memory.vector import VectorBackend
+        backend = VectorBackend(path, embedding_model=embedding_model)
+    elif kind == "mmap":
+        from seclorum.agents.memory.mmap_vector import MmapVectorBackend
+        backend = MmapVectorBackend(path, embedding_model=embedding_model)
+    else:
+        raise ValueError(f"Unknown backend kind {kind!r}; expected sqlite, file, chroma or mmap")
+    backend.initialize()
+    return backend
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Copy conversations and tasks between memory backends")
+    parser.add_argument("source", help="Source backend, e.g. sqlite:memory.db or file:log.jsonl")
+    parser.add_argument("target", help="Target backend, e.g. chroma:chroma_db or mmap:vector_index")
+    parser.add_argument("--session", default=None, help="Only migrate this session")
+    parser.add_argument("--batch-size", type=int, default=500, help="Records per batch and checkpoint")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file for resuming an interrupted run")
+    parser.add_argument("--embedding-model", default=None, help="Embedding model for vector targets")
+    args = parser.parse_args(argv)
+
+    source = open_backend(args.source, args.embedding_model)
+    target = open_backend(args.target, args.embedding_model)
+    started = time.monotonic()
+
+    def report(count: int) -> None:
+        elapsed = time.monotonic() - started
+        print(f"migrated {count} records ({count / elapsed if elapsed else 0:.0f}/s)", file=sys.stderr)
+
+    try:
+        total = migrate(
+            source, target, session_id=args.session, batch_size=args.batch_size,
+            checkpoint_path=args.checkpoint, progress=report,
+        )
+    finally:
+        for backend in (source, target):
+            backend.stop()
+            backend.close()
+    print(f"done: {total} records", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,440 @@
+# seclorum/agents/memory/mmap_vector.py
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from seclorum.agents.memory.protocol import MemoryBackend, utc_timestamp
+from seclorum.agents.memory.embedding import DEFAULT_EMBEDDING_MODEL, EmbeddingCache, EmbeddingService
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATIONS = ("float32", "int8")
+
+class _Partition:
+    """One session's vectors: an append-only row-major matrix file plus a JSONL metadata sidecar.
+
+    Rows are L2-normalized. With int8 quantization each row is stored as int8 codes with a
+    float32 scale in `scales.bin`. Rows only count once both the vector and its metadata line
+    are on disk, so a torn append is dropped on the next open. `header.json` records the
+    embedding model and dimension; opening it with another model raises ValueError.
+    """
+
+    def __init__(self, path: str, session_id: str, quantization: str, embedding_model: str):
+        self.path = path
+        self.session_id = session_id
+        self.quantization = quantization
+        self.embedding_model = embedding_model
+        self.dtype = np.dtype(np.int8 if quantization == "int8" else np.float32)
+        self.header_path = os.path.join(path, "header.json")
+        self.vectors_path = os.path.join(path, "vectors.bin")
+        self.scales_path = os.path.join(path, "scales.bin")
+        self.meta_path = os.path.join(path, "meta.jsonl")
+        self.tasks_path = os.path.join(path, "tasks.jsonl")
+        self.lock = threading.RLock()
+        self.dim: Optional[int] = None
+        self.count = 0
+        self.meta: List[Dict] = []
+        self.tasks: Dict[str, Dict] = {}
+        self.task_timestamps: Dict[str, str] = {}
+        self._task_ids: Optional[np.ndarray] = None
+        self._matrix: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+        self.refcount = 0
+        os.makedirs(path, exist_ok=True)
+        self._load()
+        self._vectors_file = open(self.vectors_path, "ab")
+        self._scales_file = open(self.scales_path, "ab") if quantization == "int8" else None
+        self._meta_file = open(self.meta_path, "a")
+        self._tasks_file = open(self.tasks_path, "a")
+
+    @staticmethod
+    def _read_jsonl(path: str) -> Tuple[List[Dict], int]:
+        """Return the complete records of a JSONL file and the byte length they span."""
+        records, end = [], 0
+        if not os.path.exists(path):
+            return records, end
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+                end += len(line)
+        return records, end
+
+    def _load(self):
+        if os.path.exists(self.header_path):
+            with open(self.header_path) as f:
+                header = json.load(f)
+            if header["quantization"] != self.quantization:
+                raise ValueError(
+                    f"Index at {self.path} uses {header['quantization']}, not {self.quantization}"
+                )
+            self.check_model(header.get("embedding_model", self.embedding_model))
+            self.dim = header.get("dim")
+        else:
+            self._write_header()
+        self.meta, meta_end = self._read_jsonl(self.meta_path)
+        vector_bytes = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        scale_bytes = os.path.getsize(self.scales_path) if os.path.exists(self.scales_path) else 0
+        meta_bytes = os.path.getsize(self.meta_path) if os.path.exists(self.meta_path) else 0
+        if self.dim is not None:
+            rows = vector_bytes // (self.dim * self.dtype.itemsize)
+            if self.quantization == "int8":
+                rows = min(rows, scale_bytes // 4)
+            self.count = min(rows, len(self.meta))
+        torn = (
+            self.count != len(self.meta)
+            or meta_bytes != meta_end
+            or vector_bytes != self.count * (self.dim or 0) * self.dtype.itemsize
+            or (self.quantization == "int8" and scale_bytes != self.count * 4)
+        )
+        if torn:
+            self._truncate()
+        tasks, tasks_end = self._read_jsonl(self.tasks_path)
+        if os.path.exists(self.tasks_path) and os.path.getsize(self.tasks_path) != tasks_end:
+            with open(self.tasks_path, "r+b") as f:
+                f.truncate(tasks_end)
+        for record in tasks:
+            self.tasks[record["task_id"]] = record["task_data"]
+            self.task_timestamps[record["task_id"]] = record.get("timestamp")
+        logger.debug(f"Loaded vector partition {self.path}: rows={self.count}, tasks={len(self.tasks)}")
+
+    def check_model(self, embedding_model: str) -> None:
+        if embedding_model != self.embedding_model:
+            raise ValueError(f"Index at {self.path} was built with {self.embedding_model}, not {embedding_model}")
+
+    def _write_header(self) -> None:
+        with open(self.header_path, "w") as f:
+            json.dump({
+                "session_id": self.session_id, "embedding_model": self.embedding_model,
+                "dim": self.dim, "quantization": self.quantization,
+            }, f)
+
+    def _truncate(self):
+        """Cut every file back to the last row present in all of them."""
+        logger.warning(f"Truncating torn vector partition {self.path} to {self.count} rows")
+        self.meta = self.meta[:self.count]
+        with open(self.meta_path, "w") as f:
+            for record in self.meta:
+                f.write(json.dumps(record) + "\n")
+        if self.dim is not None and os.path.exists(self.vectors_path):
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(self.count * self.dim * self.dtype.itemsize)
+        if self.quantization == "int8" and os.path.exists(self.scales_path):
+            with open(self.scales_path, "r+b") as f:
+                f.truncate(self.count * 4)
+
+    def append(self, vectors: np.ndarray, records: List[Dict]) -> None:
+        with self.lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._write_header()
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+            if self.quantization == "int8":
+                scales = np.abs(vectors).max(axis=1) / 127.0
+                scales[scales == 0] = 1.0
+                codes = np.round(vectors / scales[:, None]).astype(np.int8)
+                self._vectors_file.write(codes.tobytes())
+                self._scales_file.write(scales.astype(np.float32).tobytes())
+                self._scales_file.flush()
+            else:
+                self._vectors_file.write(vectors.astype(np.float32).tobytes())
+            self._vectors_file.flush()
+            for record in records:
+                self._meta_file.write(json.dumps(record) + "\n")
+            self._meta_file.flush()
+            self.meta.extend(records)
+            self.count += len(records)
+            self._matrix = None
+            self._task_ids = None
+
+    def save_task(self, task_id: str, task_data: Dict, timestamp: Optional[str] = None) -> None:
+        timestamp = timestamp or utc_timestamp()
+        with self.lock:
+            self._tasks_file.write(
+                json.dumps({"task_id": task_id, "task_data": task_data, "timestamp": timestamp}) + "\n"
+            )
+            self._tasks_file.flush()
+            self.tasks[task_id] = task_data
+            self.task_timestamps[task_id] = timestamp
+
+    def _view(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], Optional[np.ndarray]]:
+        with self.lock:
+            if self.count == 0:
+                return None, None, None
+            if self._matrix is None:
+                self._matrix = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(self.count, self.dim))
+                if self.quantization == "int8":
+                    self._scales = np.memmap(self.scales_path, dtype=np.float32, mode="r", shape=(self.count,))
+            if self._task_ids is None:
+                self._task_ids = np.array([record["task_id"] for record in self.meta], dtype=object)
+            return self._matrix, self._scales, self._task_ids
+
+    def search(self, query: np.ndarray, k: int, task_id: Optional[str] = None) -> List[Tuple[Dict, float]]:
+        """Exact top-k cosine search over this partition."""
+        matrix, scales, task_ids = self._view()
+        if matrix is None or k <= 0:
+            return []
+        if self.quantization == "int8":
+            scores = (matrix @ query.astype(np.float32)) * scales
+        else:
+            scores = matrix @ query
+        if task_id is not None:
+            scores = np.where(task_ids == task_id, scores, -np.inf)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.meta[i], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def close(self) -> None:
+        with self.lock:
+            for f in (self._vectors_file, self._scales_file, self._meta_file, self._tasks_file):
+                if f:
+                    f.close()
+            self._matrix = None
+            self._scales = None
+
+
+_partitions: Dict[str, _Partition] = {}  # abspath -> partition shared by every backend on it
+_partitions_lock = threading.Lock()
+
+def _acquire_partition(path: str, session_id: str, quantization: str, embedding_model: str) -> _Partition:
+    key = os.path.abspath(path)
+    with _partitions_lock:
+        partition = _partitions.get(key)
+        if partition is None:
+            partition = _partitions[key] = _Partition(key, session_id, quantization, embedding_model)
+        else:
+            partition.check_model(embedding_model)
+        partition.refcount += 1
+        return partition
+
+def _release_partition(partition: _Partition) -> None:
+    with _partitions_lock:
+        partition.refcount -= 1
+        if partition.refcount > 0:
+            return
+        _partitions.pop(partition.path, None)
+    partition.close()
+
+
+class MmapVectorBackend(MemoryBackend):
+    """Exact vector search over NumPy memory-mapped matrices, one partition per session.
+
+    A lightweight alternative to VectorBackend: no server or client start-up, search is one
+    vectorized dot product plus `argpartition` top-k, and int8 quantization cuts the matrix to
+    a quarter of its float32 size.
+    """
+    supports_cache = False
+    semantic_similarity = True
+
+    def __init__(
+        self,
+        db_path: str,
+        embedding_model: Optional[str] = None,
+        quantization: str = "float32",
+        embedding_batch_size: int = 32,
+        embedding_threads: Optional[int] = None,
+        embedding_cache_path: Optional[str] = None,
+        embedding_cache_dtype: str = "float32",
+    ):
+        """
+        Args:
+            db_path: Directory holding one partition subdirectory per session.
+            embedding_model: Embedding model name; defaults to all-MiniLM-L6-v2.
+            quantization: "float32", or "int8" to store 8-bit codes with a per-row scale.
+            embedding_batch_size: Texts per batch when encoding.
+            embedding_threads: Torch threads for sentence-transformers models.
+            embedding_cache_path: SQLite file caching embeddings by content hash; None disables it.
+            embedding_cache_dtype: Precision of cached vectors, "float32" or "float16".
+        """
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        self.db_path = db_path
+        self.embedding_model = embedding_model
+        self.quantization = quantization
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_threads = embedding_threads
+        self.embedding_cache_path = embedding_cache_path
+        self.embedding_cache_dtype = embedding_cache_dtype
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        self._partitions: Dict[str, _Partition] = {}
+        self._lock = threading.Lock()
+
+    def initialize(self, **kwargs) -> None:
+        os.makedirs(self.db_path, exist_ok=True)
+        if self.embedding_cache_path and self.embedding_cache is None:
+            self.embedding_cache = EmbeddingCache(self.embedding_cache_path, dtype=self.embedding_cache_dtype)
+        logger.info(
+            f"Initialized MmapVectorBackend: db_path={self.db_path}, embedding_model={self.embedding_model}, "
+            f"quantization={self.quantization}"
+        )
+
+    def _partition(self, session_id: str) -> _Partition:
+        partition = self._partitions.get(session_id)
+        if partition is None:
+            with self._lock:
+                partition = self._partitions.get(session_id)
+                if partition is None:
+                    name = hashlib.sha1(session_id.encode("utf-8")).hexdigest()[:16]
+                    partition = _acquire_partition(
+                        os.path.join(self.db_path, name), session_id, self.quantization,
+                        self.embedding_model or DEFAULT_EMBEDDING_MODEL,
+                    )
+                    self._partitions[session_id] = partition
+        return partition
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        """Embed texts and L2-normalize the rows."""
+        embeddings = EmbeddingService.get(
+            self.embedding_model, batch_size=self.embedding_batch_size, num_threads=self.embedding_threads
+        ).embed_many(texts, cache=self.embedding_cache)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (embeddings / norms).astype(np.float32)
+
+    def save_conversation(
+        self, session_id: str, task_id: str, agent_name: str, prompt: str, response: str
+    ) -> None:
+        timestamp = utc_timestamp()
+        vectors = self.embed_many([f"{prompt}\n{response}"])
+        self._partition(session_id).append(vectors, [{
+            "task_id": task_id,
+            "agent_name": agent_name,
+            "prompt": prompt,
+            "response": response,
+            "timestamp": timestamp,
+        }])
+        logger.debug(f"Saved conversation vector: session_id={session_id}, task_id={task_id}")
+
+    def load_conversation_history(
+        self, session_id: str, task_id: str, agent_name: str
+    ) -> List[Tuple[str, str, str]]:
+        partition = self._partition(session_id)
+        with partition.lock:
+            return [
+                (r["prompt"], r["response"], r["timestamp"]) for r in partition.meta
+                if r["task_id"] == task_id and r["agent_name"] == agent_name
+            ]
+
+    def cache_response(self, session_id: str, prompt_hash: str, response: str) -> None:
+        logger.warning("MmapVectorBackend does not support caching responses")
+
+    def load_cached_response(self, session_id: str, prompt_hash: str) -> Optional[str]:
+        logger.warning("MmapVectorBackend does not support loading cached responses")
+        return None
+
+    def save_task(self, session_id: str, task_id: str, task_data: Dict) -> None:
+        self._partition(session_id).save_task(task_id, task_data)
+
+    def load_task(self, session_id: str, task_id: str) -> Optional[Dict]:
+        partition = self._partition(session_id)
+        with partition.lock:
+            return partition.tasks.get(task_id)
+
+    def _sessions(self) -> List[Tuple[str, str]]:
+        """Return (partition name, session_id) for every partition on disk, in name order."""
+        sessions = []
+        for name in sorted(os.listdir(self.db_path)):
+            header_path = os.path.join(self.db_path, name, "header.json")
+            if os.path.exists(header_path):
+                with open(header_path) as f:
+                    sessions.append((name, json.load(f)["session_id"]))
+        return sessions
+
+    def export_records(
+        self, session_id: Optional[str] = None, cursor: Optional[Any] = None, batch_size: int = 500
+    ) -> Iterator[Tuple[Any, Dict]]:
+        """Stream each partition's conversations, then its latest tasks; cursors are [partition, kind, offset]."""
+        sessions = self._sessions()
+        if session_id is not None:
+            sessions = [(name, sid) for name, sid in sessions if sid == session_id]
+        start_name, start_kind, start_offset = cursor if cursor else (None, "conversations", 0)
+        for name, sid in sessions:
+            if start_name is not None and name < start_name:
+                continue
+            resuming = name == start_name
+            partition = self._partition(sid)
+            with partition.lock:
+                meta = partition.meta[:partition.count]
+                tasks = list(partition.tasks.items())
+                task_timestamps = dict(partition.task_timestamps)
+            if not (resuming and start_kind == "tasks"):
+                for offset in range(start_offset if resuming else 0, len(meta)):
+                    record = meta[offset]
+                    yield [name, "conversations", offset + 1], {
+                        "type": "conversation", "session_id": sid, "task_id": record["task_id"],
+                        "agent_name": record["agent_name"], "prompt": record["prompt"],
+                        "response": record["response"], "timestamp": record["timestamp"],
+                    }
+            for offset in range(start_offset if resuming and start_kind == "tasks" else 0, len(tasks)):
+                task_id, task_data = tasks[offset]
+                yield [name, "tasks", offset + 1], {
+                    "type": "task", "session_id": sid, "task_id": task_id,
+                    "task_data": task_data, "timestamp": task_timestamps.get(task_id),
+                }
+
+    def import_records(self, records: List[Dict]) -> None:
+        """Embed conversations in one batch per session and append them with their original timestamps."""
+        conversations: Dict[str, List[Dict]] = {}
+        for record in records:
+            if record["type"] == "conversation":
+                conversations.setdefault(record["session_id"], []).append(record)
+            elif record["type"] == "task":
+                self._partition(record["session_id"]).save_task(
+                    record["task_id"], record["task_data"], record.get("timestamp")
+                )
+        for session_id, batch in conversations.items():
+            vectors = self.embed_many([f"{r['prompt']}\n{r['response']}" for r in batch])
+            self._partition(session_id).append(vectors, [
+                {
+                    "task_id": r["task_id"], "agent_name": r["agent_name"], "prompt": r["prompt"],
+                    "response": r["response"], "timestamp": r.get("timestamp") or utc_timestamp(),
+                }
+                for r in batch
+            ])
+        logger.debug(f"Imported {len(records)} records into {self.db_path}")
+
+    def find_similar(
+        self, text: str, session_id: str, task_id: str, n_results: int
+    ) -> List[Dict]:
+        """Return the session's n_results most similar conversations; task_id=None searches all tasks."""
+        try:
+            query = self.embed_many([text])[0]
+            matches = self._partition(session_id).search(query, n_results, task_id)
+            return [
+                {
+                    "session_id": session_id,
+                    "task_id": record["task_id"],
+                    "agent_name": record["agent_name"],
+                    "prompt": record["prompt"],
+                    "response": record["response"],
+                    "text": f"{record['prompt']}\n{record['response']}",
+                    "timestamp": record["timestamp"],
+                    "score": score,
+                }
+                for record, score in matches
+            ]
+        except Exception as e:
+            logger.error(f"Failed to find similar items for session_id={session_id}, task_id={task_id}: {str(e)}")
+            return []
+
+    def stop(self) -> None:
+        logger.info(f"Signaled shutdown for MmapVectorBackend: db_path={self.db_path}")
+
+    def close(self) -> None:
+        with self._lock:
+            partitions, self._partitions = list(self._partitions.values()), {}
+        for partition in partitions:
+            _release_partition(partition)
+        if self.embedding_cache:
+            self.embedding_cache.close()
+            self.embedding_cache = None
+        logger.info(f"Closed MmapVectorBackend: db_path={self.db_path}")
@@ -1,11 +1,40 @@
 # seclorum/agents/memory/protocol.py
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Optional, Tuple, Dict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator, List, Optional, Tuple, Dict
 from seclorum.models import Task
 
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+_timestamp_lock = threading.Lock()
+_last_timestamp = ""
+
+def utc_timestamp() -> str:
+    """Current UTC time with microseconds, e.g. "2025-01-01T12:00:00.123456Z".
+
+    Strictly increasing within the process, so a `since` cursor never skips a record saved in
+    the same instant as the one it stopped at.
+    """
+    global _last_timestamp
+    with _timestamp_lock:
+        timestamp = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+        if timestamp <= _last_timestamp:
+            last = datetime.strptime(_last_timestamp, TIMESTAMP_FORMAT)
+            timestamp = (last + timedelta(microseconds=1)).strftime(TIMESTAMP_FORMAT)
+        _last_timestamp = timestamp
+        return timestamp
+
 class MemoryBackend(ABC):
     """Abstract base class defining the protocol for memory backends."""
 
+    # Whether cache_response/load_cached_response are implemented rather than stubbed
+    supports_cache: bool = True
+    # Whether conversation history and similarity search return real results
+    supports_history: bool = True
+    supports_similarity: bool = True
+    # Whether find_similar ranks by embedding similarity (semantic) rather than by lexical match
+    semantic_similarity: bool = False
+
     @abstractmethod
     def initialize(self, **kwargs) -> None:
         """Initialize the backend with optional configuration."""
@@ -25,6 +54,25 @@ class MemoryBackend(ABC):
         """Load conversation history for the session, task, and agent."""
         pass
 
+    def load_conversation_window(
+        self,
+        session_id: str,
+        task_id: str,
+        agent_name: str,
+        limit: Optional[int] = None,
+        since: Optional[str] = None,
+    ) -> List[Tuple[str, str, str]]:
+        """Load the most recent `limit` turns, optionally only those newer than the `since` timestamp.
+
+        The default filters the full history; backends with an index should override it.
+        """
+        history = self.load_conversation_history(session_id, task_id, agent_name)
+        if since is not None:
+            history = [h for h in history if h[2] > since]
+        if limit is not None:
+            history = history[-limit:] if limit > 0 else []
+        return history
+
     @abstractmethod
     def load_cached_response(self, session_id: str, prompt_hash: str) -> Optional[str]:
         """Load a cached response for the prompt hash."""
@@ -52,6 +100,66 @@ class MemoryBackend(ABC):
         """Find similar conversations in the backend."""
         pass
 
+    def save_conversations_many(self, session_id: str, conversations: List[Tuple[str, str, str, str]]) -> None:
+        """Save (task_id, agent_name, prompt, response) tuples; backends override this with a bulk write."""
+        for task_id, agent_name, prompt, response in conversations:
+            self.save_conversation(session_id, task_id, agent_name, prompt, response)
+
+    def save_tasks_many(self, session_id: str, tasks: List[Tuple[str, Dict]]) -> None:
+        """Save (task_id, task_data) pairs; backends override this with a bulk write."""
+        for task_id, task_data in tasks:
+            self.save_task(session_id, task_id, task_data)
+
+    def load_tasks_many(self, session_id: str, task_ids: List[str]) -> Dict[str, Dict]:
+        """Return task data keyed by task id, omitting tasks that are not stored."""
+        tasks = {}
+        for task_id in task_ids:
+            task_data = self.load_task(session_id, task_id)
+            if task_data is not None:
+                tasks[task_id] = task_data
+        return tasks
+
+    def cache_responses_many(self, session_id: str, responses: List[Tuple[str, str]]) -> None:
+        """Cache (prompt_hash, response) pairs; backends override this with a bulk write."""
+        for prompt_hash, response in responses:
+            self.cache_response(session_id, prompt_hash, response)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until buffered writes are durable. Backends that write synchronously need not override."""
+        pass
+
+    def export_records(
+        self, session_id: Optional[str] = None, cursor: Optional[Any] = None, batch_size: int = 500
+    ) -> Iterator[Tuple[Any, Dict]]:
+        """Stream stored records as (cursor, record) pairs in a stable order.
+
+        Records are dicts with "type" set to "conversation" (session_id, task_id, agent_name,
+        prompt, response, timestamp) or "task" (session_id, task_id, task_data, timestamp).
+        Passing a yielded cursor back resumes after that record. Cursors are JSON-serializable.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not support exporting records")
+
+    def reconcile(self, source: "MemoryBackend", session_id: Optional[str] = None, batch_size: int = 500) -> int:
+        """Add records from `source` that this backend is missing and return how many were added.
+
+        Backends that hold a derived index (e.g. embeddings) override this; others keep nothing to repair.
+        """
+        return 0
+
+    def import_records(self, records: List[Dict]) -> None:
+        """Write records produced by export_records.
+
+        The default replays them through save_conversation and save_task, which stamps new
+        timestamps; backends with a bulk path override this and keep the original ones.
+        """
+        for record in records:
+            if record["type"] == "conversation":
+                self.save_conversation(
+                    record["session_id"], record["task_id"], record["agent_name"], record["prompt"], record["response"]
+                )
+            elif record["type"] == "task":
+                self.save_task(record["session_id"], record["task_id"], record["task_data"])
+
     @abstractmethod
     def stop(self) -> None:
         """Signal shutdown of the backend."""
@@ -4,9 +4,12 @@ import sqlite3
 import os
 import time
 import json
-from typing import List, Optional, Tuple, Dict
+import re
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, Tuple, Dict
 from seclorum.models import Task
-from seclorum.agents.memory.protocol import MemoryBackend
+from seclorum.agents.memory.protocol import MemoryBackend, utc_timestamp
 from contextlib import contextmanager
 import threading
 import queue
@@ -16,101 +19,447 @@ logger = logging.getLogger(__name__)
 class LockTimeoutError(RuntimeError):
     pass
 
+class WriterStoppedError(RuntimeError):
+    """Raised when a write-behind write is queued or flushed but the writer thread is not running."""
+
+_WRITER_STOP = object()
+
+# Ordered (version, statements) pairs; PRAGMA user_version records the last one applied.
+SCHEMA_MIGRATIONS: List[Tuple[int, List[str]]] = [
+    (1, [
+        '''
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT,
+            task_id TEXT,
+            agent_name TEXT,
+            prompt TEXT,
+            response TEXT,
+            timestamp TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS cache (
+            session_id TEXT,
+            prompt_hash TEXT,
+            response TEXT,
+            timestamp REAL,
+            PRIMARY KEY (session_id, prompt_hash)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS tasks (
+            session_id TEXT,
+            task_id TEXT,
+            task_data TEXT,
+            timestamp REAL,
+            PRIMARY KEY (session_id, task_id)
+        )
+        ''',
+    ]),
+    (2, [
+        # Serves the history filter and its ORDER BY from the index alone
+        "CREATE INDEX IF NOT EXISTS idx_conversations_history "
+        "ON conversations (session_id, task_id, agent_name, timestamp, id)",
+    ]),
+    (3, [
+        # Access bookkeeping for cache eviction; size is the stored byte cost of a row
+        "ALTER TABLE cache ADD COLUMN last_access REAL",
+        "ALTER TABLE cache ADD COLUMN hits INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE cache ADD COLUMN size INTEGER NOT NULL DEFAULT 0",
+        "UPDATE cache SET last_access = timestamp, "
+        "size = LENGTH(CAST(response AS BLOB)) + LENGTH(prompt_hash)",
+        "CREATE INDEX IF NOT EXISTS idx_cache_timestamp ON cache (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_cache_lru ON cache (last_access)",
+        "CREATE INDEX IF NOT EXISTS idx_cache_lfu ON cache (hits, last_access)",
+    ]),
+    (4, [
+        # External-content FTS5 index over conversations, kept in sync by triggers
+        "CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5("
+        "prompt, response, content='conversations', content_rowid='id')",
+        "CREATE TRIGGER IF NOT EXISTS conversations_fts_insert AFTER INSERT ON conversations BEGIN "
+        "INSERT INTO conversations_fts (rowid, prompt, response) VALUES (new.id, new.prompt, new.response); END",
+        "CREATE TRIGGER IF NOT EXISTS conversations_fts_delete AFTER DELETE ON conversations BEGIN "
+        "INSERT INTO conversations_fts (conversations_fts, rowid, prompt, response) "
+        "VALUES ('delete', old.id, old.prompt, old.response); END",
+        "CREATE TRIGGER IF NOT EXISTS conversations_fts_update AFTER UPDATE ON conversations BEGIN "
+        "INSERT INTO conversations_fts (conversations_fts, rowid, prompt, response) "
+        "VALUES ('delete', old.id, old.prompt, old.response); "
+        "INSERT INTO conversations_fts (rowid, prompt, response) VALUES (new.id, new.prompt, new.response); END",
+        "INSERT INTO conversations_fts (conversations_fts) VALUES ('rebuild')",
+    ]),
+    (5, [
+        # Natural key of a turn, so re-importing a batch (e.g. a resumed migration) is a no-op
+        "DELETE FROM conversations WHERE rowid NOT IN ("
+        "SELECT MIN(rowid) FROM conversations GROUP BY session_id, task_id, agent_name, timestamp, prompt)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_conversations_unique "
+        "ON conversations (session_id, task_id, agent_name, timestamp, prompt)",
+    ]),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+# A row matching an existing turn on the natural key is a duplicate and is skipped
+INSERT_CONVERSATION_SQL = (
+    "INSERT OR IGNORE INTO conversations (session_id, task_id, agent_name, prompt, response, timestamp) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+UPSERT_TASK_SQL = "INSERT OR REPLACE INTO tasks (session_id, task_id, task_data, timestamp) VALUES (?, ?, ?, ?)"
+UPSERT_CACHE_SQL = (
+    "INSERT INTO cache (session_id, prompt_hash, response, timestamp, last_access, hits, size) "
+    "VALUES (?, ?, ?, ?, ?, 0, ?) "
+    "ON CONFLICT (session_id, prompt_hash) DO UPDATE SET response = excluded.response, "
+    "timestamp = excluded.timestamp, last_access = excluded.last_access, size = excluded.size"
+)
+# SQLite's default limit on bound parameters is 999 in older builds
+IN_CLAUSE_CHUNK = 500
+
+# Rows kept first when a cache budget is exceeded
+CACHE_EVICTION_ORDER = {
+    "lru": "last_access DESC",
+    "lfu": "hits DESC, last_access DESC",
+}
+
+def _is_fatal(error: BaseException) -> bool:
+    """Whether an error leaves a connection unusable, so it is replaced instead of pooled."""
+    # Closed/misused connections raise ProgrammingError; a bare DatabaseError means a bad file handle
+    return isinstance(error, sqlite3.ProgrammingError) or type(error) is sqlite3.DatabaseError
+
+def fts_query(text: str) -> Optional[str]:
+    """Turn free text into an FTS5 query matching any of its terms, quoted so syntax is inert."""
+    terms = dict.fromkeys(term.lower() for term in re.findall(r"\w+", text))
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
 class SQLiteBackend(MemoryBackend):
-    def __init__(self, db_path: str, preserve_db: bool = False):
+    def __init__(
+        self,
+        db_path: str,
+        preserve_db: bool = False,
+        write_behind: bool = False,
+        batch_size: int = 64,
+        commit_interval: float = 0.05,
+        write_queue_size: int = 1024,
+        cache_ttl: Optional[float] = 3600,
+        cache_max_rows: Optional[int] = None,
+        cache_max_bytes: Optional[int] = None,
+        cache_eviction: str = "lru",
+        cache_sweep_interval: Optional[float] = None,
+        read_pool_size: int = 4,
+        read_timeout: Optional[float] = 30,
+    ):
+        """
+        Args:
+            db_path: Path to the SQLite database file.
+            preserve_db: Keep the database file on close.
+            write_behind: Queue writes to a dedicated writer thread that commits them in batches.
+            batch_size: Maximum number of rows committed in one write-behind transaction.
+            commit_interval: Durability window in seconds; a queued write is committed within this delay.
+            write_queue_size: Bound of the write-behind queue; writers block when it is full.
+            cache_ttl: Seconds a cached response stays valid; None disables expiry.
+            cache_max_rows: Maximum number of rows kept in the cache table.
+            cache_max_bytes: Maximum total size of cached responses in bytes.
+            cache_eviction: Policy used when a budget is exceeded, "lru" or "lfu".
+            cache_sweep_interval: Seconds between background cache compactions; None disables the sweeper.
+            read_pool_size: Number of read-only connections; reads run beside the single writer under WAL.
+            read_timeout: Seconds a read waits for a free pooled connection before raising
+                LockTimeoutError; None waits indefinitely.
+        """
+        if cache_eviction not in CACHE_EVICTION_ORDER:
+            raise ValueError(f"Unknown cache eviction policy: {cache_eviction}")
         self.db_path = db_path
         self.preserve_db = preserve_db
+        self.write_behind = write_behind
+        self.batch_size = max(1, batch_size)
+        self.commit_interval = commit_interval
         self._active_operations = 0
-        self._conn_queue = queue.Queue(maxsize=5)  # Connection pool
+        self._operations_lock = threading.Lock()
+        self.read_pool_size = max(1, read_pool_size)
+        self.read_timeout = read_timeout
+        # One writer serializes all writes; readers are opened lazily into fixed pool slots
+        self._writer_conn: Optional[sqlite3.Connection] = None
+        self._writer_lock = threading.Lock()
+        self._read_pool: queue.Queue = queue.Queue()
+        self._closed = False
         self._tables_created = False
+        self._write_queue = queue.Queue(maxsize=write_queue_size)
+        self._writer_thread = None
+        self._pending_writes = 0
+        self._pending_lock = threading.Lock()
+        self._write_error = None
+        self.cache_ttl = cache_ttl
+        self.cache_max_rows = cache_max_rows
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_eviction = cache_eviction
+        self.cache_sweep_interval = cache_sweep_interval
+        self._cache_touches: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        self._cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        self._cache_lock = threading.Lock()
+        self._sweeper_thread = None
+        self._sweeper_stop = threading.Event()
 
     def initialize(self, **kwargs) -> None:
-        """Initialize the SQLite backend with connection pool and tables."""
+        """Initialize the SQLite backend with its connection pools and tables."""
         preserve_db = kwargs.get("preserve_db", self.preserve_db)
         self.preserve_db = preserve_db
         try:
-            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-            for _ in range(5):
-                conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
-                conn.execute("PRAGMA journal_mode=WAL")
-                self._conn_queue.put(conn)
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._closed = False
+            self._read_pool = queue.Queue()
+            for _ in range(self.read_pool_size):
+                self._read_pool.put(None)
             self._create_tables()
-            logger.info(f"Initialized SQLiteBackend: db_path={self.db_path}, preserve_db={self.preserve_db}")
+            if self.write_behind:
+                self._start_writer()
+            if self.cache_sweep_interval:
+                self._start_sweeper()
+            logger.info(
+                f"Initialized SQLiteBackend: db_path={self.db_path}, preserve_db={self.preserve_db}, "
+                f"write_behind={self.write_behind}"
+            )
         except Exception as e:
             logger.error(f"Failed to initialize SQLiteBackend: {str(e)}")
             raise
 
-    def _get_connection(self):
-        try:
-            return self._conn_queue.get(timeout=2.0)
-        except queue.Empty:
-            logger.warning(f"No available connections in pool, creating new for {self.db_path}")
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        if read_only:
+            uri = Path(os.path.abspath(self.db_path)).as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+        else:
             conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
             conn.execute("PRAGMA journal_mode=WAL")
-            return conn
+        return conn
 
-    def _release_connection(self, conn):
-        if self._is_connection_closed(conn):
-            logger.debug(f"Connection already closed for {self.db_path}")
-            return
+    @contextmanager
+    def _writer(self):
+        """Hold the dedicated writer connection; an open transaction is rolled back on error."""
+        with self._writer_lock, self._track_operation():
+            if self._writer_conn is None:
+                self._writer_conn = self._connect()
+            conn = self._writer_conn
+            healthy = True
+            try:
+                yield conn
+            except BaseException as e:
+                healthy = not _is_fatal(e)
+                if healthy and conn.in_transaction:
+                    conn.rollback()
+                raise
+            finally:
+                if not healthy or self._closed:
+                    self._writer_conn = None
+                    self._close_connection(conn)
+
+    @contextmanager
+    def _reader(self):
+        """Borrow a read-only connection, waiting up to read_timeout while all of them are in use."""
         try:
-            self._conn_queue.put(conn, timeout=2.0)
-        except queue.Full:
-            conn.close()
-            logger.debug(f"Connection pool full, closed connection for {self.db_path}")
+            conn = self._read_pool.get(timeout=self.read_timeout)
+        except queue.Empty:
+            raise LockTimeoutError(
+                f"Timed out after {self.read_timeout}s waiting for one of {self.read_pool_size} "
+                f"read connections to {self.db_path}"
+            ) from None
+        healthy = True
+        try:
+            with self._track_operation():
+                if conn is None:
+                    conn = self._connect(read_only=True)
+                yield conn
+        except BaseException as e:
+            healthy = not _is_fatal(e)
+            raise
+        finally:
+            if conn is not None and (not healthy or self._closed):
+                # The slot is reopened on next use instead of probing connections on release
+                self._close_connection(conn)
+                conn = None
+            self._read_pool.put(conn)
 
-    def _is_connection_closed(self, conn):
+    def _close_connection(self, conn: sqlite3.Connection) -> None:
         try:
-            conn.execute("SELECT 1")
-            return False
-        except (sqlite3.ProgrammingError, AttributeError) as e:
-            logger.debug(f"Connection closed or invalid: {str(e)}")
-            return True
+            conn.close()
+            logger.debug(f"Closed database connection at {self.db_path}")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to close database connection: {str(e)}")
 
     @contextmanager
     def _track_operation(self):
-        self._active_operations += 1
+        with self._operations_lock:
+            self._active_operations += 1
         try:
             yield
         finally:
-            self._active_operations -= 1
+            with self._operations_lock:
+                self._active_operations -= 1
+
+    def _start_writer(self):
+        if self._writer_thread and self._writer_thread.is_alive():
+            return
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop,
+            name=f"SQLiteWriter-{os.path.basename(self.db_path)}",
+            daemon=True,
+        )
+        self._writer_thread.start()
+        logger.debug(
+            f"Started write-behind writer for {self.db_path}: batch_size={self.batch_size}, "
+            f"commit_interval={self.commit_interval}s"
+        )
+
+    def _enqueue_write(self, sql, params: Tuple = ()) -> None:
+        """Queue a write for the writer thread, blocking while the queue is full.
+
+        `sql` is either a statement or a callable that receives the batch cursor.
+        """
+        if not self._writer_running():
+            raise WriterStoppedError(f"Write-behind writer for {self.db_path} is not running; write not queued")
+        with self._pending_lock:
+            self._pending_writes += 1
+        self._write_queue.put((sql, params))
+
+    def _writer_running(self) -> bool:
+        return bool(self._writer_thread and self._writer_thread.is_alive())
+
+    def _apply_write(self, write: Callable, description: str) -> None:
+        """Run `write(cursor)` in one transaction, or queue it for the writer thread in write-behind mode."""
+        if self.write_behind:
+            self._enqueue_write(write)
+            logger.debug(f"Queued {description}: db_path={self.db_path}")
+            return
+        try:
+            with self._writer() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                write(cursor)
+                conn.commit()
+                logger.debug(f"Committed {description}: db_path={self.db_path}")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to commit {description}: {str(e)}")
+            raise
+
+    def _writer_loop(self):
+        """Drain the write queue, committing each batch in a single transaction."""
+        stopping = False
+        try:
+            while not stopping:
+                item = self._write_queue.get()
+                batch, barriers = [], []
+                deadline = time.monotonic() + self.commit_interval
+                while True:
+                    if item is _WRITER_STOP:
+                        stopping = True
+                    elif isinstance(item, threading.Event):
+                        barriers.append(item)
+                    else:
+                        batch.append(item)
+                    # Barriers and shutdown commit immediately instead of waiting out the window
+                    if stopping or barriers or len(batch) >= self.batch_size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._write_queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                try:
+                    if batch:
+                        self._commit_batch(batch)
+                except Exception as e:
+                    # Whatever one batch raises, later writes still need a live writer
+                    self._write_error = e
+                    logger.error(f"Write-behind writer failed on a batch of {len(batch)} rows: {str(e)}")
+                finally:
+                    for barrier in barriers:
+                        barrier.set()
+        finally:
+            logger.debug(f"Write-behind writer stopped for {self.db_path}")
+
+    def _commit_batch(self, batch: List[Tuple[str, Tuple]]) -> None:
+        """Commit a batch in one transaction; if it fails, retry its writes one at a time so a bad
+        row only loses itself."""
+        try:
+            self._commit_writes(batch)
+            logger.debug(f"Committed write-behind batch of {len(batch)} rows to {self.db_path}")
+        except Exception as e:
+            if len(batch) == 1:
+                self._write_error = e
+                logger.error(f"Failed to commit write-behind write: {str(e)}")
+            else:
+                logger.warning(f"Write-behind batch of {len(batch)} rows failed ({str(e)}); retrying row by row")
+                failed = 0
+                for write in batch:
+                    try:
+                        self._commit_writes([write])
+                    except Exception as row_error:
+                        failed += 1
+                        self._write_error = row_error
+                        logger.error(f"Failed to commit write-behind write: {str(row_error)}")
+                logger.debug(f"Committed {len(batch) - failed}/{len(batch)} rows individually to {self.db_path}")
+        finally:
+            with self._pending_lock:
+                self._pending_writes -= len(batch)
+
+    def _commit_writes(self, writes: List[Tuple[str, Tuple]]) -> None:
+        # The writer thread shares the writer connection, so synchronous writes wait their turn
+        with self._writer() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            for sql, params in writes:
+                if callable(sql):
+                    sql(cursor)
+                else:
+                    cursor.execute(sql, params)
+            conn.commit()
+
+    def _drain_writes(self, timeout: Optional[float] = None) -> None:
+        """Wait for the writer thread to commit everything queued so far."""
+        with self._pending_lock:
+            pending = self._pending_writes
+        if not pending:
+            return
+        if not self._writer_running():
+            raise WriterStoppedError(f"Write-behind writer for {self.db_path} stopped with {pending} writes queued")
+        barrier = threading.Event()
+        self._write_queue.put(barrier)
+        if not barrier.wait(timeout):
+            raise LockTimeoutError(f"Timed out flushing {pending} pending writes to {self.db_path}")
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until all queued writes are committed; re-raise the last writer error, if any."""
+        self._drain_writes(timeout)
+        error, self._write_error = self._write_error, None
+        if error:
+            raise error
+
+    def _stop_writer(self):
+        if self._writer_thread and self._writer_thread.is_alive():
+            self._write_queue.put(_WRITER_STOP)
+            self._writer_thread.join()
+        self._writer_thread = None
 
     def _create_tables(self):
         if self._tables_created:
             return
-        conn = self._get_connection()
         try:
-            with self._track_operation():
+            with self._writer() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS conversations (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        session_id TEXT,
-                        task_id TEXT,
-                        agent_name TEXT,
-                        prompt TEXT,
-                        response TEXT,
-                        timestamp TEXT
-                    )
-                ''')
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS cache (
-                        session_id TEXT,
-                        prompt_hash TEXT,
-                        response TEXT,
-                        timestamp REAL,
-                        PRIMARY KEY (session_id, prompt_hash)
-                    )
-                ''')
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS tasks (
-                        session_id TEXT,
-                        task_id TEXT,
-                        task_data TEXT,
-                        timestamp REAL,
-                        PRIMARY KEY (session_id, task_id)
-                    )
-                ''')
+                if cursor.execute("PRAGMA user_version").fetchone()[0] == 0:
+                    # Only takes effect before the first table is created
+                    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                cursor.execute("BEGIN IMMEDIATE")
+                version = cursor.execute("PRAGMA user_version").fetchone()[0]
+                for target_version, statements in SCHEMA_MIGRATIONS:
+                    if target_version <= version:
+                        continue
+                    for statement in statements:
+                        cursor.execute(statement)
+                    # PRAGMA does not accept bound parameters
+                    cursor.execute(f"PRAGMA user_version = {int(target_version)}")
+                    logger.debug(f"Migrated {self.db_path} to schema version {target_version}")
                 cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
                 tables = [row[0] for row in cursor.fetchall()]
                 required_tables = {'conversations', 'cache', 'tasks'}
@@ -118,92 +467,127 @@ class SQLiteBackend(MemoryBackend):
                     raise RuntimeError(f"Failed to create required tables: {required_tables - set(tables)}")
                 conn.commit()
                 self._tables_created = True
-                logger.debug(f"Created database tables at {self.db_path}: {tables}")
+                logger.debug(f"Created database tables at {self.db_path}: {tables}, schema_version={SCHEMA_VERSION}")
         except (sqlite3.OperationalError, RuntimeError) as e:
             logger.error(f"Failed to create tables: {str(e)}")
             raise
-        finally:
-            self._release_connection(conn)
 
     def save_conversation(
         self, session_id: str, task_id: str, agent_name: str, prompt: str, response: str
     ) -> None:
-        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S.%fZ", time.gmtime())
-        conn = self._get_connection()
+        timestamp = utc_timestamp()
+        sql = INSERT_CONVERSATION_SQL
+        params = (session_id, task_id, agent_name, prompt, response, timestamp)
+        if self.write_behind:
+            self._enqueue_write(sql, params)
+            logger.debug(
+                f"Queued conversation: session_id={session_id}, task_id={task_id}, agent_name={agent_name}"
+            )
+            return
         try:
-            with self._track_operation():
+            with self._writer() as conn:
                 cursor = conn.cursor()
                 cursor.execute("BEGIN IMMEDIATE")
-                cursor.execute(
-                    "INSERT INTO conversations (session_id, task_id, agent_name, prompt, response, timestamp) "
-                    "VALUES (?, ?, ?, ?, ?, ?)",
-                    (session_id, task_id, agent_name, prompt, response, timestamp)
-                )
+                cursor.execute(sql, params)
                 conn.commit()
                 logger.debug(
                     f"Saved conversation: session_id={session_id}, task_id={task_id}, "
                     f"agent_name={agent_name}, thread={threading.current_thread().name}"
                 )
         except sqlite3.OperationalError as e:
-            conn.rollback()
             logger.error(f"Failed to save conversation: {str(e)}")
             raise
-        finally:
-            self._release_connection(conn)
 
     def load_conversation_history(
         self, session_id: str, task_id: str, agent_name: str
     ) -> List[Tuple[str, str, str]]:
-        conn = self._get_connection()
+        return self.load_conversation_window(session_id, task_id, agent_name)
+
+    def load_conversation_window(
+        self,
+        session_id: str,
+        task_id: str,
+        agent_name: str,
+        limit: Optional[int] = None,
+        since: Optional[str] = None,
+    ) -> List[Tuple[str, str, str]]:
+        if self.write_behind:
+            self._drain_writes()
+        where = "WHERE session_id = ? AND task_id = ? AND agent_name = ?"
+        params: List = [session_id, task_id, agent_name]
+        if since is not None:
+            where += " AND timestamp > ?"
+            params.append(since)
+        if limit is not None:
+            # Take the newest rows through the index, then return them oldest first
+            sql = (
+                "SELECT prompt, response, timestamp FROM ("
+                f"SELECT id, prompt, response, timestamp FROM conversations {where} "
+                "ORDER BY timestamp DESC, id DESC LIMIT ?"
+                ") ORDER BY timestamp, id"
+            )
+            params.append(limit)
+        else:
+            sql = f"SELECT prompt, response, timestamp FROM conversations {where} ORDER BY timestamp, id"
         try:
-            with self._track_operation():
+            with self._reader() as conn:
                 cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT prompt, response, timestamp FROM conversations "
-                    "WHERE session_id = ? AND task_id = ? AND agent_name = ? ORDER BY timestamp",
-                    (session_id, task_id, agent_name)
-                )
+                cursor.execute(sql, params)
                 history = cursor.fetchall()
                 logger.debug(
                     f"Loaded {len(history)} conversation records: session_id={session_id}, "
-                    f"task_id={task_id}, agent_name={agent_name}"
+                    f"task_id={task_id}, agent_name={agent_name}, limit={limit}, since={since}"
                 )
                 return history
         except sqlite3.OperationalError as e:
             logger.error(f"Failed to load conversation history: {str(e)}")
             return []
-        finally:
-            self._release_connection(conn)
 
     def cache_response(self, session_id: str, prompt_hash: str, response: str) -> None:
-        conn = self._get_connection()
+        now = time.time()
+        sql = UPSERT_CACHE_SQL
+        params = (session_id, prompt_hash, response, now, now, len(response.encode()) + len(prompt_hash))
+        bounded = self.cache_max_rows is not None or self.cache_max_bytes is not None
+        if self.write_behind:
+            self._enqueue_write(sql, params)
+            if bounded:
+                self._enqueue_write(self._enforce_cache_budget)
+            logger.debug(f"Queued cached response: session_id={session_id}, prompt_hash={prompt_hash}")
+            return
         try:
-            with self._track_operation():
+            with self._writer() as conn:
                 cursor = conn.cursor()
                 cursor.execute("BEGIN IMMEDIATE")
-                cursor.execute(
-                    "INSERT OR REPLACE INTO cache (session_id, prompt_hash, response, timestamp) "
-                    "VALUES (?, ?, ?, ?)",
-                    (session_id, prompt_hash, response, time.time())
-                )
+                cursor.execute(sql, params)
+                if bounded:
+                    self._enforce_cache_budget(cursor)
                 conn.commit()
                 logger.debug(f"Cached response: session_id={session_id}, prompt_hash={prompt_hash}")
         except sqlite3.OperationalError as e:
-            conn.rollback()
             logger.error(f"Failed to cache response: {str(e)}")
-        finally:
-            self._release_connection(conn)
 
     def load_cached_response(self, session_id: str, prompt_hash: str) -> Optional[str]:
-        conn = self._get_connection()
+        if self.write_behind:
+            self._drain_writes()
+        now = time.time()
+        sql = "SELECT response FROM cache WHERE session_id = ? AND prompt_hash = ?"
+        params: List = [session_id, prompt_hash]
+        if self.cache_ttl is not None:
+            sql += " AND timestamp > ?"
+            params.append(now - self.cache_ttl)
         try:
-            with self._track_operation():
+            with self._reader() as conn:
                 cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT response FROM cache WHERE session_id = ? AND prompt_hash = ? AND timestamp > ?",
-                    (session_id, prompt_hash, time.time() - 3600)
-                )
+                cursor.execute(sql, params)
                 result = cursor.fetchone()
+                with self._cache_lock:
+                    if result:
+                        # Access bookkeeping is applied lazily so reads stay read-only
+                        _, hits = self._cache_touches.get((session_id, prompt_hash), (now, 0))
+                        self._cache_touches[(session_id, prompt_hash)] = (now, hits + 1)
+                        self._cache_stats["hits"] += 1
+                    else:
+                        self._cache_stats["misses"] += 1
                 if result:
                     logger.debug(f"Loaded cached response: session_id={session_id}, prompt_hash={prompt_hash}")
                     return result[0]
@@ -211,33 +595,132 @@ class SQLiteBackend(MemoryBackend):
         except sqlite3.OperationalError as e:
             logger.error(f"Failed to load cached response: {str(e)}")
             return None
-        finally:
-            self._release_connection(conn)
+
+    def _apply_cache_touches(self, cursor) -> None:
+        with self._cache_lock:
+            touches, self._cache_touches = self._cache_touches, {}
+        if touches:
+            cursor.executemany(
+                "UPDATE cache SET last_access = MAX(COALESCE(last_access, 0), ?), hits = hits + ? "
+                "WHERE session_id = ? AND prompt_hash = ?",
+                [(last_access, hits, session_id, prompt_hash)
+                 for (session_id, prompt_hash), (last_access, hits) in touches.items()]
+            )
+
+    def _enforce_cache_budget(self, cursor) -> int:
+        """Delete the least valuable cache rows until the row and byte budgets hold."""
+        self._apply_cache_touches(cursor)
+        order = CACHE_EVICTION_ORDER[self.cache_eviction]
+        evicted = 0
+        if self.cache_max_rows is not None:
+            cursor.execute(
+                f"DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY {order} LIMIT -1 OFFSET ?)",
+                (self.cache_max_rows,)
+            )
+            evicted += cursor.rowcount
+        if self.cache_max_bytes is not None:
+            cursor.execute(
+                "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM ("
+                f"SELECT rowid, SUM(size) OVER (ORDER BY {order} ROWS UNBOUNDED PRECEDING) AS kept FROM cache"
+                ") WHERE kept > ?)",
+                (self.cache_max_bytes,)
+            )
+            evicted += cursor.rowcount
+        if evicted:
+            with self._cache_lock:
+                self._cache_stats["evictions"] += evicted
+            logger.debug(f"Evicted {evicted} cache rows from {self.db_path} ({self.cache_eviction})")
+        return evicted
+
+    def _expire_cache(self, cursor) -> int:
+        if self.cache_ttl is None:
+            return 0
+        cursor.execute("DELETE FROM cache WHERE timestamp <= ?", (time.time() - self.cache_ttl,))
+        expired = cursor.rowcount
+        if expired:
+            with self._cache_lock:
+                self._cache_stats["expirations"] += expired
+        return expired
+
+    def compact_cache(self, vacuum_pages: int = 256) -> None:
+        """Delete expired cache rows, enforce cache budgets and reclaim free pages incrementally."""
+        def compact(cursor):
+            expired = self._expire_cache(cursor)
+            evicted = self._enforce_cache_budget(cursor)
+            logger.debug(f"Compacted cache at {self.db_path}: expired={expired}, evicted={evicted}")
+
+        if self.write_behind:
+            self._enqueue_write(compact)
+            self._drain_writes()
+        else:
+            try:
+                with self._writer() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("BEGIN IMMEDIATE")
+                    compact(cursor)
+                    conn.commit()
+            except sqlite3.OperationalError as e:
+                logger.error(f"Failed to compact cache: {str(e)}")
+                return
+        try:
+            with self._writer() as conn:
+                conn.execute(f"PRAGMA incremental_vacuum({int(vacuum_pages)})").fetchall()
+                conn.commit()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Incremental vacuum failed for {self.db_path}: {str(e)}")
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Return cache hit, miss, eviction and expiration counters."""
+        with self._cache_lock:
+            return dict(self._cache_stats)
+
+    def _start_sweeper(self):
+        if self._sweeper_thread and self._sweeper_thread.is_alive():
+            return
+        self._sweeper_stop.clear()
+        self._sweeper_thread = threading.Thread(
+            target=self._sweeper_loop,
+            name=f"SQLiteCacheSweeper-{os.path.basename(self.db_path)}",
+            daemon=True,
+        )
+        self._sweeper_thread.start()
+
+    def _sweeper_loop(self):
+        while not self._sweeper_stop.wait(self.cache_sweep_interval):
+            try:
+                self.compact_cache()
+            except Exception as e:
+                logger.error(f"Cache sweep failed for {self.db_path}: {str(e)}")
+
+    def _stop_sweeper(self):
+        self._sweeper_stop.set()
+        if self._sweeper_thread and self._sweeper_thread.is_alive():
+            self._sweeper_thread.join()
+        self._sweeper_thread = None
 
     def save_task(self, session_id: str, task_id: str, task_data: Dict) -> None:
-        conn = self._get_connection()
+        sql = UPSERT_TASK_SQL
+        params = (session_id, task_id, json.dumps(task_data), time.time())
+        if self.write_behind:
+            self._enqueue_write(sql, params)
+            logger.debug(f"Queued task: session_id={session_id}, task_id={task_id}")
+            return
         try:
-            with self._track_operation():
+            with self._writer() as conn:
                 cursor = conn.cursor()
                 cursor.execute("BEGIN IMMEDIATE")
-                cursor.execute(
-                    "INSERT OR REPLACE INTO tasks (session_id, task_id, task_data, timestamp) "
-                    "VALUES (?, ?, ?, ?)",
-                    (session_id, task_id, json.dumps(task_data), time.time())
-                )
+                cursor.execute(sql, params)
                 conn.commit()
                 logger.debug(f"Saved task: session_id={session_id}, task_id={task_id}")
         except sqlite3.OperationalError as e:
-            conn.rollback()
             logger.error(f"Failed to save task: {str(e)}")
             raise
-        finally:
-            self._release_connection(conn)
 
     def load_task(self, session_id: str, task_id: str) -> Optional[Dict]:
-        conn = self._get_connection()
+        if self.write_behind:
+            self._drain_writes()
         try:
-            with self._track_operation():
+            with self._reader() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     "SELECT task_data FROM tasks WHERE session_id = ? AND task_id = ?",
@@ -251,30 +734,370 @@ class SQLiteBackend(MemoryBackend):
         except (sqlite3.OperationalError, json.JSONDecodeError) as e:
             logger.error(f"Failed to load task: {str(e)}")
             return None
-        finally:
-            self._release_connection(conn)
+
+    def save_conversations_many(self, session_id: str, conversations: List[Tuple[str, str, str, str]]) -> None:
+        """Insert (task_id, agent_name, prompt, response) rows with one executemany in one transaction."""
+        timestamp = utc_timestamp()
+        rows = [(session_id, task_id, agent_name, prompt, response, timestamp)
+                for task_id, agent_name, prompt, response in conversations]
+        self._apply_write(
+            lambda cursor: cursor.executemany(INSERT_CONVERSATION_SQL, rows),
+            f"{len(rows)} conversations for session_id={session_id}",
+        )
+
+    def save_tasks_many(self, session_id: str, tasks: List[Tuple[str, Dict]]) -> None:
+        """Upsert (task_id, task_data) rows with one executemany in one transaction."""
+        now = time.time()
+        rows = [(session_id, task_id, json.dumps(task_data), now) for task_id, task_data in tasks]
+        self._apply_write(
+            lambda cursor: cursor.executemany(UPSERT_TASK_SQL, rows),
+            f"{len(rows)} tasks for session_id={session_id}",
+        )
+
+    def load_tasks_many(self, session_id: str, task_ids: List[str]) -> Dict[str, Dict]:
+        if self.write_behind:
+            self._drain_writes()
+        tasks: Dict[str, Dict] = {}
+        try:
+            with self._reader() as conn:
+                for start in range(0, len(task_ids), IN_CLAUSE_CHUNK):
+                    chunk = task_ids[start:start + IN_CLAUSE_CHUNK]
+                    rows = conn.execute(
+                        f"SELECT task_id, task_data FROM tasks WHERE session_id = ? "
+                        f"AND task_id IN ({', '.join('?' * len(chunk))})",
+                        [session_id, *chunk],
+                    ).fetchall()
+                    tasks.update((task_id, json.loads(task_data)) for task_id, task_data in rows)
+            logger.debug(f"Loaded {len(tasks)}/{len(task_ids)} tasks: session_id={session_id}")
+            return tasks
+        except (sqlite3.OperationalError, json.JSONDecodeError) as e:
+            logger.error(f"Failed to load tasks: {str(e)}")
+            return {}
+
+    def cache_responses_many(self, session_id: str, responses: List[Tuple[str, str]]) -> None:
+        """Upsert (prompt_hash, response) rows in one transaction, enforcing cache budgets once."""
+        now = time.time()
+        rows = [
+            (session_id, prompt_hash, response, now, now, len(response.encode()) + len(prompt_hash))
+            for prompt_hash, response in responses
+        ]
+        bounded = self.cache_max_rows is not None or self.cache_max_bytes is not None
+
+        def write(cursor):
+            cursor.executemany(UPSERT_CACHE_SQL, rows)
+            if bounded:
+                self._enforce_cache_budget(cursor)
+
+        self._apply_write(write, f"{len(rows)} cached responses for session_id={session_id}")
 
     def find_similar(
         self, text: str, session_id: str, task_id: str, n_results: int
     ) -> List[Dict]:
-        logger.warning("SQLiteBackend does not support similarity search")
-        return []
+        """Rank the session's conversations against `text` with FTS5 BM25; task_id=None searches all tasks.
+
+        Results carry a "score" where higher is more relevant.
+        """
+        query = fts_query(text)
+        if query is None:
+            return []
+        if self.write_behind:
+            self._drain_writes()
+        where = "conversations_fts MATCH ? AND c.session_id = ?"
+        params: List = [query, session_id]
+        if task_id is not None:
+            where += " AND c.task_id = ?"
+            params.append(task_id)
+        params.append(n_results)
+        sql = (
+            "SELECT c.session_id, c.task_id, c.agent_name, c.prompt, c.response, c.timestamp, "
+            "bm25(conversations_fts) AS rank FROM conversations_fts "
+            "JOIN conversations c ON c.id = conversations_fts.rowid "
+            f"WHERE {where} ORDER BY rank LIMIT ?"
+        )
+        try:
+            with self._reader() as conn:
+                rows = conn.execute(sql, params).fetchall()
+            results = [
+                {
+                    "session_id": row[0],
+                    "task_id": row[1],
+                    "agent_name": row[2],
+                    "prompt": row[3],
+                    "response": row[4],
+                    "text": f"{row[3]}\n{row[4]}",
+                    "timestamp": row[5],
+                    # bm25() is lower for better matches
+                    "score": -row[6],
+                }
+                for row in rows
+            ]
+            logger.debug(f"Found {len(results)} lexical matches: session_id={session_id}, task_id={task_id}")
+            return results
+        except sqlite3.OperationalError as e:
+            logger.error(f"Failed to search conversations: {str(e)}")
+            return []
+
+    def export_records(
+        self, session_id: Optional[str] = None, cursor: Optional[Any] = None, batch_size: int = 500
+    ) -> Iterator[Tuple[Any, Dict]]:
+        """Page through conversations, then tasks, by rowid; cursors are [table, last_rowid]."""
+        if self.write_behind:
+            self._drain_writes()
+        table, last_rowid = cursor if cursor else ("conversations", 0)
+        where = "WHERE rowid > ?" + (" AND session_id = ?" if session_id is not None else "")
+        queries = [
+            (
+                "conversations",
+                "SELECT rowid, session_id, task_id, agent_name, prompt, response, timestamp "
+                f"FROM conversations {where} ORDER BY rowid LIMIT ?",
+            ),
+            ("tasks", f"SELECT rowid, session_id, task_id, task_data, timestamp FROM tasks {where} ORDER BY rowid LIMIT ?"),
+        ]
+        for name, sql in queries:
+            if table == "tasks" and name == "conversations":
+                continue
+            if name != table:
+                last_rowid = 0
+            while True:
+                params = [last_rowid] + ([session_id] if session_id is not None else []) + [batch_size]
+                # A connection is only held per page, so long exports do not pin the pool
+                with self._reader() as conn:
+                    rows = conn.execute(sql, params).fetchall()
+                for row in rows:
+                    last_rowid = row[0]
+                    if name == "conversations":
+                        record = {
+                            "type": "conversation", "session_id": row[1], "task_id": row[2],
+                            "agent_name": row[3], "prompt": row[4], "response": row[5], "timestamp": row[6],
+                        }
+                    else:
+                        record = {
+                            "type": "task", "session_id": row[1], "task_id": row[2],
+                            "task_data": json.loads(row[3]), "timestamp": row[4],
+                        }
+                    yield [name, last_rowid], record
+                if len(rows) < batch_size:
+                    break
+
+    def import_records(self, records: List[Dict]) -> None:
+        """Insert records in one transaction, keeping their original timestamps.
+
+        Idempotent: conversations already present are ignored and tasks are replaced.
+        """
+        conversations = [
+            (r["session_id"], r["task_id"], r["agent_name"], r["prompt"], r["response"], r.get("timestamp")
+             or utc_timestamp())
+            for r in records if r["type"] == "conversation"
+        ]
+        tasks = [
+            (r["session_id"], r["task_id"], json.dumps(r["task_data"]),
+             r["timestamp"] if isinstance(r.get("timestamp"), (int, float)) else time.time())
+            for r in records if r["type"] == "task"
+        ]
+
+        def insert(cursor):
+            cursor.executemany(INSERT_CONVERSATION_SQL, conversations)
+            cursor.executemany(UPSERT_TASK_SQL, tasks)
+
+        self._apply_write(insert, f"import of {len(conversations)} conversations and {len(tasks)} tasks")
 
     def stop(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush pending writes on stop: {str(e)}")
         logger.info(f"Signaled shutdown for SQLiteBackend: db_path={self.db_path}")
 
     def close(self) -> None:
-        while not self._conn_queue.empty():
-            conn = self._conn_queue.get()
+        self._stop_sweeper()
+        self._stop_writer()
+        with self._writer_lock:
+            self._closed = True
+            if self._writer_conn is not None:
+                self._close_connection(self._writer_conn)
+                self._writer_conn = None
+        # Idle readers are closed here and borrowed ones by _reader when they come back
+        for _ in range(self.read_pool_size):
             try:
-                conn.close()
-                logger.debug(f"Closed database connection at {self.db_path}")
-            except Exception as e:
-                logger.error(f"Failed to close database connection: {str(e)}")
-        if not self.preserve_db and self._active_operations == 0 and os.path.exists(self.db_path):
+                conn = self._read_pool.get_nowait()
+            except queue.Empty:
+                break
+            if conn is not None:
+                self._close_connection(conn)
+            self._read_pool.put(None)
+        with self._operations_lock:
+            idle = self._active_operations == 0
+        if not self.preserve_db and idle and os.path.exists(self.db_path):
             try:
                 os.remove(self.db_path)
                 logger.debug(f"Removed database {self.db_path}")
             except OSError as e:
                 logger.error(f"Failed to remove database {self.db_path}: {str(e)}")
         logger.info(f"Closed SQLiteBackend: db_path={self.db_path}")
+
+
+_shared_backends: Dict[str, List] = {}  # abspath -> [SQLiteBackend, refcount]
+_shared_backends_lock = threading.Lock()
+
+def _acquire_shared_backend(db_path: str, config: Dict) -> SQLiteBackend:
+    key = os.path.abspath(db_path)
+    with _shared_backends_lock:
+        entry = _shared_backends.get(key)
+        if entry is None:
+            backend = SQLiteBackend(key, **config)
+            backend.initialize()
+            entry = _shared_backends[key] = [backend, 0]
+            logger.info(f"Opened shared SQLite store: db_path={key}")
+        entry[1] += 1
+        return entry[0]
+
+def _release_shared_backend(backend: SQLiteBackend) -> None:
+    with _shared_backends_lock:
+        entry = _shared_backends.get(backend.db_path)
+        if entry is None or entry[0] is not backend:
+            return
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del _shared_backends[backend.db_path]
+    backend.close()
+    logger.info(f"Closed shared SQLite store: db_path={backend.db_path}")
+
+
+class SharedSQLiteBackend(MemoryBackend):
+    """Per-session view over a process-wide SQLite store partitioned by session_id.
+
+    All views on the same path share one SQLiteBackend, and with it one connection pool,
+    writer thread and cache sweeper. With shards > 1, `db_path` must contain a "{shard}"
+    placeholder and each session is routed to a fixed shard by hashing its session_id.
+    """
+
+    def __init__(self, db_path: str, shards: int = 1, preserve_db: bool = True, **sqlite_config):
+        """
+        Args:
+            db_path: Path of the shared database, with a "{shard}" placeholder when shards > 1.
+            shards: Number of database files sessions are spread across.
+            preserve_db: Keep the database files when the last view closes.
+            **sqlite_config: Further SQLiteBackend options, applied when a shard is first opened.
+        """
+        if shards > 1 and "{shard}" not in db_path:
+            raise ValueError(f"db_path must contain '{{shard}}' when shards > 1: {db_path}")
+        self.db_path = db_path
+        self.shards = max(1, shards)
+        self.preserve_db = preserve_db
+        self.sqlite_config = sqlite_config
+        self._shard_backends: List[SQLiteBackend] = []
+
+    def initialize(self, **kwargs) -> None:
+        """Attach to the shared shard backends, opening them on first use in the process."""
+        if self._shard_backends:
+            return
+        config = {**self.sqlite_config, "preserve_db": self.preserve_db}
+        self._shard_backends = [
+            _acquire_shared_backend(self.db_path.replace("{shard}", str(shard)), config)
+            for shard in range(self.shards)
+        ]
+        logger.debug(f"Initialized SharedSQLiteBackend: db_path={self.db_path}, shards={self.shards}")
+
+    def _shard_index(self, session_id: str) -> int:
+        if not self._shard_backends:
+            raise RuntimeError(f"SharedSQLiteBackend is not initialized: db_path={self.db_path}")
+        if self.shards == 1:
+            return 0
+        return zlib.crc32(session_id.encode()) % self.shards
+
+    def _backend_for(self, session_id: str) -> SQLiteBackend:
+        return self._shard_backends[self._shard_index(session_id)]
+
+    def save_conversation(
+        self, session_id: str, task_id: str, agent_name: str, prompt: str, response: str
+    ) -> None:
+        self._backend_for(session_id).save_conversation(session_id, task_id, agent_name, prompt, response)
+
+    def load_conversation_history(
+        self, session_id: str, task_id: str, agent_name: str
+    ) -> List[Tuple[str, str, str]]:
+        return self._backend_for(session_id).load_conversation_history(session_id, task_id, agent_name)
+
+    def load_conversation_window(
+        self,
+        session_id: str,
+        task_id: str,
+        agent_name: str,
+        limit: Optional[int] = None,
+        since: Optional[str] = None,
+    ) -> List[Tuple[str, str, str]]:
+        return self._backend_for(session_id).load_conversation_window(
+            session_id, task_id, agent_name, limit=limit, since=since
+        )
+
+    def cache_response(self, session_id: str, prompt_hash: str, response: str) -> None:
+        self._backend_for(session_id).cache_response(session_id, prompt_hash, response)
+
+    def load_cached_response(self, session_id: str, prompt_hash: str) -> Optional[str]:
+        return self._backend_for(session_id).load_cached_response(session_id, prompt_hash)
+
+    def save_task(self, session_id: str, task_id: str, task_data: Dict) -> None:
+        self._backend_for(session_id).save_task(session_id, task_id, task_data)
+
+    def load_task(self, session_id: str, task_id: str) -> Optional[Dict]:
+        return self._backend_for(session_id).load_task(session_id, task_id)
+
+    def save_conversations_many(self, session_id: str, conversations: List[Tuple[str, str, str, str]]) -> None:
+        self._backend_for(session_id).save_conversations_many(session_id, conversations)
+
+    def save_tasks_many(self, session_id: str, tasks: List[Tuple[str, Dict]]) -> None:
+        self._backend_for(session_id).save_tasks_many(session_id, tasks)
+
+    def load_tasks_many(self, session_id: str, task_ids: List[str]) -> Dict[str, Dict]:
+        return self._backend_for(session_id).load_tasks_many(session_id, task_ids)
+
+    def cache_responses_many(self, session_id: str, responses: List[Tuple[str, str]]) -> None:
+        self._backend_for(session_id).cache_responses_many(session_id, responses)
+
+    def find_similar(
+        self, text: str, session_id: str, task_id: str, n_results: int
+    ) -> List[Dict]:
+        return self._backend_for(session_id).find_similar(text, session_id, task_id, n_results)
+
+    def export_records(
+        self, session_id: Optional[str] = None, cursor: Optional[Any] = None, batch_size: int = 500
+    ) -> Iterator[Tuple[Any, Dict]]:
+        """Export shard by shard; cursors are [shard_index, shard_cursor]."""
+        if session_id is not None:
+            shards = [self._shard_index(session_id)]
+        else:
+            shards = range(len(self._shard_backends))
+        start_shard, shard_cursor = cursor if cursor else (0, None)
+        for index in shards:
+            if index < start_shard:
+                continue
+            inner = shard_cursor if index == start_shard else None
+            for position, record in self._shard_backends[index].export_records(session_id, inner, batch_size):
+                yield [index, position], record
+
+    def import_records(self, records: List[Dict]) -> None:
+        by_shard: Dict[int, List[Dict]] = {}
+        for record in records:
+            by_shard.setdefault(self._shard_index(record["session_id"]), []).append(record)
+        for index, shard_records in by_shard.items():
+            self._shard_backends[index].import_records(shard_records)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        for backend in self._shard_backends:
+            backend.flush(timeout=timeout)
+
+    def stop(self) -> None:
+        """Flush pending writes; the shared backends keep running for other sessions."""
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush pending writes on stop: {str(e)}")
+        logger.info(f"Signaled shutdown for SharedSQLiteBackend: db_path={self.db_path}")
+
+    def close(self) -> None:
+        """Detach from the shared backends, closing each one when its last view closes."""
+        backends, self._shard_backends = self._shard_backends, []
+        for backend in backends:
+            _release_shared_backend(backend)
+        logger.info(f"Closed SharedSQLiteBackend: db_path={self.db_path}")
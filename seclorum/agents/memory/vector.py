@@ -1,21 +1,93 @@
 # seclorum/agents/memory/vector.py
+import calendar
+import hashlib
 import logging
+import queue
+import threading
+import time
 import chromadb
 import numpy as np
-from typing import List, Optional, Dict, Tuple
-from datetime import datetime
-from seclorum.agents.memory.protocol import MemoryBackend
+from typing import Any, Iterator, List, Optional, Dict, Tuple
+from seclorum.agents.memory.protocol import MemoryBackend, utc_timestamp
+from seclorum.agents.memory.embedding import DEFAULT_EMBEDDING_MODEL, EmbeddingCache, EmbeddingService
 import json
 
 logger = logging.getLogger(__name__)
 
+_INGEST_STOP = object()
+
+RETENTION_MODES = ("ephemeral", "persistent", "ttl")
+
+def _epoch(timestamp) -> Optional[float]:
+    """Seconds since the epoch for a stored timestamp (epoch number or ISO-8601 UTC string), or None."""
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    try:
+        # Only the second-resolution prefix; backends format fractional seconds differently
+        return float(calendar.timegm(time.strptime(str(timestamp)[:19], "%Y-%m-%dT%H:%M:%S")))
+    except ValueError:
+        return None
+
 class VectorBackend(MemoryBackend):
-    def __init__(self, db_path: str, embedding_model: Optional[str] = None):
+    supports_cache = False
+    supports_history = False
+    semantic_similarity = True
+
+    def __init__(
+        self,
+        db_path: str,
+        embedding_model: Optional[str] = None,
+        embedding_batch_size: int = 32,
+        embedding_threads: Optional[int] = None,
+        async_ingest: bool = True,
+        ingest_batch_size: int = 32,
+        ingest_interval: float = 0.05,
+        ingest_queue_size: int = 1024,
+        embedding_cache_path: Optional[str] = None,
+        embedding_cache_dtype: str = "float32",
+        retention: str = "persistent",
+        ttl_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            db_path: ChromaDB persistence directory.
+            embedding_model: Embedding model name; defaults to all-MiniLM-L6-v2.
+            embedding_batch_size: Texts per batch when encoding with embed_many.
+            embedding_threads: Torch threads for sentence-transformers models.
+            async_ingest: Embed and add documents on a background worker instead of the caller's thread.
+            ingest_batch_size: Maximum documents embedded and added per batch.
+            ingest_interval: Seconds the worker waits to fill a batch.
+            ingest_queue_size: Queued documents before saves block (backpressure).
+            embedding_cache_path: SQLite file caching embeddings by content hash; None disables it.
+            embedding_cache_dtype: Precision of cached vectors, "float32" or "float16".
+            retention: "persistent" keeps collections across restarts, "ephemeral" deletes them on
+                close, and "ttl" keeps them but expires documents older than ttl_seconds.
+            ttl_seconds: Document lifetime in "ttl" mode.
+        """
+        if retention not in RETENTION_MODES:
+            raise ValueError(f"Unknown retention mode: {retention}")
+        if retention == "ttl" and not ttl_seconds:
+            raise ValueError("retention='ttl' requires ttl_seconds")
         self.db_path = db_path
+        self.retention = retention
+        self.ttl_seconds = ttl_seconds
         self.embedding_model = embedding_model
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_threads = embedding_threads
+        self.async_ingest = async_ingest
+        self.embedding_cache_path = embedding_cache_path
+        self.embedding_cache_dtype = embedding_cache_dtype
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        self.ingest_batch_size = max(1, ingest_batch_size)
+        self.ingest_interval = ingest_interval
         self.client = None
         self.conversation_collection = None
         self.task_collection = None
+        self._ingest_queue = queue.Queue(maxsize=ingest_queue_size)
+        self._ingest_thread: Optional[threading.Thread] = None
+        self._ingest_error: Optional[Exception] = None
+        self._ingest_lock = threading.Lock()
+        self._ingest_stats = {"pending": 0, "ingested": 0, "batches": 0, "errors": 0, "last_lag": 0.0, "max_lag": 0.0}
         logger.debug(f"VectorBackend initialized with db_path={db_path}, embedding_model={embedding_model}")
 
     def initialize(self, **kwargs) -> None:
@@ -25,72 +97,238 @@ class VectorBackend(MemoryBackend):
             self.client = chromadb.PersistentClient(
                 path=self.db_path, settings=chromadb.Settings(anonymized_telemetry=False)
             )
-            self.conversation_collection = self.client.get_or_create_collection(name="conversations")
-            self.task_collection = self.client.get_or_create_collection(name="tasks")
-            logger.info(f"Initialized VectorBackend: db_path={self.db_path}, embedding_model={self.embedding_model}")
+            self._open_collections()
+            if self.retention == "ttl":
+                self.expire()
+            if self.embedding_cache_path and self.embedding_cache is None:
+                self.embedding_cache = EmbeddingCache(self.embedding_cache_path, dtype=self.embedding_cache_dtype)
+            if self.async_ingest:
+                self._start_ingest_worker()
+            logger.info(
+                f"Initialized VectorBackend: db_path={self.db_path}, embedding_model={self.embedding_model}, "
+                f"retention={self.retention}, conversations={self.conversation_collection.count()}"
+            )
         except Exception as e:
             logger.error(f"Failed to initialize VectorBackend: {str(e)}")
             raise
 
+    def _open_collections(self) -> None:
+        """Reuse existing collections, recreating them if they hold another model's embeddings."""
+        metadata = {"embedding_model": self.embedding_model or DEFAULT_EMBEDDING_MODEL}
+        collections = []
+        for name in ("conversations", "tasks"):
+            collection = self.client.get_or_create_collection(name=name, metadata=metadata)
+            stored_model = (collection.metadata or {}).get("embedding_model")
+            if stored_model is None:
+                # Created before the model was recorded; assume it matches
+                collection.modify(metadata=metadata)
+            elif stored_model != metadata["embedding_model"]:
+                logger.warning(
+                    f"Collection {name} in {self.db_path} was embedded with {stored_model}, "
+                    f"not {metadata['embedding_model']}; recreating it"
+                )
+                self.client.delete_collection(name)
+                collection = self.client.create_collection(name=name, metadata=metadata)
+            collections.append(collection)
+        self.conversation_collection, self.task_collection = collections
+
+    @property
+    def embedder(self) -> EmbeddingService:
+        """The process-wide embedding service for the configured model."""
+        return EmbeddingService.get(
+            self.embedding_model, batch_size=self.embedding_batch_size, num_threads=self.embedding_threads
+        )
+
     def _generate_embedding(self, text: str) -> np.ndarray:
         """Generate an embedding for the given text using the configured model."""
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings for several texts in batched, vectorized calls."""
         try:
-            logger.debug(f"Generating embedding for text with model {self.embedding_model}")
-            if self.embedding_model:
-                # For ollama models
-                if self.embedding_model.startswith("nomic-embed-text"):
-                    import ollama
-                    embedding = ollama.embeddings(model=self.embedding_model, prompt=text)["embedding"]
-                    embedding = np.array(embedding)
-                    logger.debug("Completed ollama embedding generation")
-                else:
-                    # For sentence-transformers
-                    from sentence_transformers import SentenceTransformer
-                    model = SentenceTransformer(self.embedding_model)
-                    embedding = model.encode(text, convert_to_numpy=True)
-                    logger.debug("Completed sentence-transformers embedding generation")
-            else:
-                # Default fallback
-                from sentence_transformers import SentenceTransformer
-                model = SentenceTransformer("all-MiniLM-L6-v2")
-                embedding = model.encode(text, convert_to_numpy=True)
-                logger.debug("Completed fallback embedding generation")
-            return embedding
+            return self.embedder.embed_many(texts, cache=self.embedding_cache)
         except Exception as e:
-            logger.error(f"Failed to generate embedding for text: {str(e)}")
+            logger.error(f"Failed to generate embeddings for {len(texts)} texts: {str(e)}")
             raise
 
+    def _start_ingest_worker(self):
+        if self._ingest_thread and self._ingest_thread.is_alive():
+            return
+        self._ingest_thread = threading.Thread(target=self._ingest_loop, name="VectorIngest", daemon=True)
+        self._ingest_thread.start()
+        logger.debug(
+            f"Started ingestion worker for {self.db_path}: batch_size={self.ingest_batch_size}, "
+            f"interval={self.ingest_interval}s"
+        )
+
+    def _ingest(self, collection_name: str, doc_id: str, document: str, metadata: Dict) -> None:
+        """Queue a document for embedding, or embed and add it immediately when ingestion is synchronous."""
+        item = (collection_name, doc_id, document, metadata, time.monotonic())
+        if not (self._ingest_thread and self._ingest_thread.is_alive()):
+            self._add_batch([item])
+            error, self._ingest_error = self._ingest_error, None
+            if error:
+                raise error
+            return
+        with self._ingest_lock:
+            self._ingest_stats["pending"] += 1
+        # Blocks while the queue is full, throttling producers to the embedding rate
+        self._ingest_queue.put(item)
+
+    def _ingest_many(self, items: List[Tuple]) -> None:
+        """Queue several documents, or add them in ingest_batch_size chunks when ingestion is synchronous."""
+        if not (self._ingest_thread and self._ingest_thread.is_alive()):
+            for start in range(0, len(items), self.ingest_batch_size):
+                self._add_batch(items[start:start + self.ingest_batch_size])
+                error, self._ingest_error = self._ingest_error, None
+                if error:
+                    raise error
+            return
+        with self._ingest_lock:
+            self._ingest_stats["pending"] += len(items)
+        for item in items:
+            self._ingest_queue.put(item)
+
+    def _ingest_loop(self):
+        """Collect documents into batches of up to ingest_batch_size or ingest_interval seconds."""
+        stopping = False
+        while not stopping:
+            item = self._ingest_queue.get()
+            batch, barriers = [], []
+            deadline = time.monotonic() + self.ingest_interval
+            while True:
+                if item is _INGEST_STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    barriers.append(item)
+                else:
+                    batch.append(item)
+                if stopping or barriers or len(batch) >= self.ingest_batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._ingest_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self._add_batch(batch)
+            for barrier in barriers:
+                barrier.set()
+        logger.debug(f"Ingestion worker stopped for {self.db_path}")
+
+    def _add_batch(self, batch: List[Tuple]) -> None:
+        """Embed a batch in one call and bulk-upsert it, one upsert per collection."""
+        try:
+            # Later saves of the same id supersede earlier ones, so only the latest is embedded
+            latest = {(item[0], item[1]): item for item in batch}
+            items = list(latest.values())
+            embeddings = self.embed_many([document for _, _, document, _, _ in items])
+            collections = {"conversations": self.conversation_collection, "tasks": self.task_collection}
+            for name, collection in collections.items():
+                rows = [(i, item) for i, item in enumerate(items) if item[0] == name]
+                if not rows:
+                    continue
+                collection.upsert(
+                    ids=[item[1] for _, item in rows],
+                    documents=[item[2] for _, item in rows],
+                    metadatas=[item[3] for _, item in rows],
+                    embeddings=[embeddings[i].tolist() for i, _ in rows],
+                )
+            lag = time.monotonic() - min(item[4] for item in batch)
+            with self._ingest_lock:
+                self._ingest_stats["ingested"] += len(batch)
+                self._ingest_stats["batches"] += 1
+                self._ingest_stats["last_lag"] = lag
+                self._ingest_stats["max_lag"] = max(self._ingest_stats["max_lag"], lag)
+            logger.debug(f"Ingested batch of {len(batch)} documents into {self.db_path}, lag={lag:.3f}s")
+        except Exception as e:
+            self._ingest_error = e
+            with self._ingest_lock:
+                self._ingest_stats["errors"] += 1
+            logger.error(f"Failed to ingest batch of {len(batch)} documents: {str(e)}")
+        finally:
+            if self._ingest_thread and threading.current_thread() is self._ingest_thread:
+                with self._ingest_lock:
+                    self._ingest_stats["pending"] -= len(batch)
+
+    def _drain_ingest(self, timeout: Optional[float] = None) -> None:
+        """Wait until every document queued so far has been added."""
+        if not (self._ingest_thread and self._ingest_thread.is_alive()):
+            return
+        with self._ingest_lock:
+            pending = self._ingest_stats["pending"]
+        if not pending:
+            return
+        barrier = threading.Event()
+        self._ingest_queue.put(barrier)
+        if not barrier.wait(timeout):
+            raise TimeoutError(f"Timed out flushing {pending} pending documents to {self.db_path}")
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until queued documents are ingested; re-raise the last ingestion error, if any."""
+        self._drain_ingest(timeout)
+        error, self._ingest_error = self._ingest_error, None
+        if error:
+            raise error
+
+    def ingest_stats(self) -> Dict:
+        """Return queue depth, pending and ingested document counts, batch count and ingestion lag."""
+        with self._ingest_lock:
+            return {**self._ingest_stats, "queue_depth": self._ingest_queue.qsize()}
+
+    def _stop_ingest_worker(self):
+        if self._ingest_thread and self._ingest_thread.is_alive():
+            self._ingest_queue.put(_INGEST_STOP)
+            self._ingest_thread.join()
+        self._ingest_thread = None
+
     def save_conversation(
         self, session_id: str, task_id: str, agent_name: str, prompt: str, response: str
     ) -> None:
         """Save a conversation to the conversation collection with an embedding."""
-        timestamp = datetime.utcnow().isoformat() + "Z"
-        text = f"{prompt}\n{response}"
+        timestamp = utc_timestamp()
         try:
-            logger.debug(f"Saving conversation: session_id={session_id}, task_id={task_id}")
-            embedding = self._generate_embedding(text)
-            self.conversation_collection.add(
-                documents=[text],
-                embeddings=[embedding.tolist()],
-                metadatas=[{
+            self._ingest(
+                "conversations",
+                self._conversation_doc_id(session_id, task_id, agent_name, prompt, response),
+                f"{prompt}\n{response}",
+                {
                     "session_id": session_id,
                     "task_id": task_id,
                     "agent_name": agent_name,
                     "prompt": prompt,
                     "response": response,
-                    "timestamp": timestamp
-                }],
-                ids=[f"{session_id}_{task_id}_{timestamp}"]
-            )
-            count = self.conversation_collection.count()
-            logger.debug(
-                f"Saved conversation: session_id={session_id}, task_id={task_id}, "
-                f"agent_name={agent_name}, collection_size={count}"
+                    "timestamp": timestamp,
+                    "created_at": time.time(),
+                },
             )
+            logger.debug(f"Saved conversation: session_id={session_id}, task_id={task_id}, agent_name={agent_name}")
         except Exception as e:
             logger.error(f"Failed to save conversation: session_id={session_id}, task_id={task_id}: {str(e)}")
             raise
 
+    def save_conversations_many(self, session_id: str, conversations: List[Tuple[str, str, str, str]]) -> None:
+        """Embed and add (task_id, agent_name, prompt, response) tuples as bulk upserts."""
+        timestamp = utc_timestamp()
+        now, queued = time.time(), time.monotonic()
+        items = [
+            (
+                "conversations",
+                self._conversation_doc_id(session_id, task_id, agent_name, prompt, response),
+                f"{prompt}\n{response}",
+                {
+                    "session_id": session_id, "task_id": task_id, "agent_name": agent_name,
+                    "prompt": prompt, "response": response, "timestamp": timestamp, "created_at": now,
+                },
+                queued,
+            )
+            for task_id, agent_name, prompt, response in conversations
+        ]
+        self._ingest_many(items)
+        logger.debug(f"Saved {len(items)} conversations: session_id={session_id}")
+
     def load_conversation_history(
         self, session_id: str, task_id: str, agent_name: str
     ) -> List[Tuple[str, str, str]]:
@@ -107,39 +345,89 @@ class VectorBackend(MemoryBackend):
         logger.warning("VectorBackend does not support loading cached responses")
         return None
 
+    @staticmethod
+    def _conversation_doc_id(session_id: str, task_id: str, agent_name: str, prompt: str, response: str) -> str:
+        """Content-addressed conversation id, so the same exchange maps to the same document in every
+        process and an integrity check can tell which exchanges are already indexed. Repeating an
+        identical exchange refreshes its document rather than adding a duplicate."""
+        content = "\0".join((session_id, task_id, agent_name, prompt, response))
+        return f"conv:{hashlib.sha1(content.encode()).hexdigest()}"
+
+    @staticmethod
+    def _task_doc_id(session_id: str, task_id: str) -> str:
+        """Deterministic task document id; the length prefix keeps ids containing ':' unambiguous."""
+        return f"task:{len(session_id)}:{session_id}:{task_id}"
+
     def save_task(self, session_id: str, task_id: str, task_data: Dict) -> None:
-        """Save task data to the task collection."""
-        timestamp = datetime.utcnow().isoformat() + "Z"
-        task_text = json.dumps(task_data)
+        """Upsert task data in the task collection, replacing any earlier version of the task."""
+        timestamp = utc_timestamp()
         try:
-            embedding = self._generate_embedding(task_text)
-            self.task_collection.add(
-                documents=[task_text],
-                embeddings=[embedding.tolist()],
-                metadatas=[{
-                    "session_id": session_id,
-                    "task_id": task_id,
-                    "timestamp": timestamp
-                }],
-                ids=[f"{session_id}_{task_id}_{timestamp}"]
+            self._ingest(
+                "tasks",
+                self._task_doc_id(session_id, task_id),
+                json.dumps(task_data),
+                {"session_id": session_id, "task_id": task_id, "timestamp": timestamp, "created_at": time.time()},
             )
-            count = self.task_collection.count()
-            logger.debug(f"Saved task: session_id={session_id}, task_id={task_id}, collection_size={count}")
+            logger.debug(f"Saved task: session_id={session_id}, task_id={task_id}")
         except Exception as e:
             logger.error(f"Failed to save task: session_id={session_id}, task_id={task_id}: {str(e)}")
             raise
 
-    def load_task(self, session_id: str, task_id: str) -> Optional[Dict]:
-        """Load task data from the task collection."""
+    def save_tasks_many(self, session_id: str, tasks: List[Tuple[str, Dict]]) -> None:
+        """Upsert (task_id, task_data) pairs as bulk upserts."""
+        timestamp = utc_timestamp()
+        now, queued = time.time(), time.monotonic()
+        items = [
+            (
+                "tasks",
+                self._task_doc_id(session_id, task_id),
+                json.dumps(task_data),
+                {"session_id": session_id, "task_id": task_id, "timestamp": timestamp, "created_at": now},
+                queued,
+            )
+            for task_id, task_data in tasks
+        ]
+        self._ingest_many(items)
+        logger.debug(f"Saved {len(items)} tasks: session_id={session_id}")
+
+    def load_tasks_many(self, session_id: str, task_ids: List[str]) -> Dict[str, Dict]:
+        """Load several tasks with one get by id; tasks saved under legacy ids are not found."""
         try:
-            results = self.task_collection.query(
-                query_texts=[f"{session_id}_{task_id}"],
-                where={"session_id": session_id, "task_id": task_id},
-                n_results=1
+            self._drain_ingest()
+            results = self.task_collection.get(
+                ids=[self._task_doc_id(session_id, task_id) for task_id in task_ids], include=["documents", "metadatas"]
             )
-            if results["documents"] and results["documents"][0]:
-                task_text = results["documents"][0][0]
-                task_data = json.loads(task_text)
+            return {
+                metadata["task_id"]: json.loads(document)
+                for document, metadata in zip(results["documents"], results["metadatas"])
+            }
+        except Exception as e:
+            logger.error(f"Failed to load tasks: session_id={session_id}: {str(e)}")
+            return {}
+
+    def cache_responses_many(self, session_id: str, responses: List[Tuple[str, str]]) -> None:
+        """Cache responses (not natively supported, log warning)."""
+        logger.warning("VectorBackend does not support caching responses")
+
+    def load_task(self, session_id: str, task_id: str) -> Optional[Dict]:
+        """Load task data by id, without computing an embedding."""
+        try:
+            self._drain_ingest()
+            results = self.task_collection.get(ids=[self._task_doc_id(session_id, task_id)], include=["documents"])
+            documents = results["documents"]
+            if not documents:
+                # Tasks saved before ids were deterministic carry a timestamp suffix; take the newest
+                results = self.task_collection.get(
+                    where={"$and": [{"session_id": {"$eq": session_id}}, {"task_id": {"$eq": task_id}}]},
+                    include=["documents", "metadatas"],
+                )
+                documents = [
+                    document for document, _ in sorted(
+                        zip(results["documents"], results["metadatas"]), key=lambda row: row[1]["timestamp"]
+                    )
+                ][-1:]
+            if documents:
+                task_data = json.loads(documents[0])
                 logger.debug(f"Loaded task: session_id={session_id}, task_id={task_id}")
                 return task_data
             return None
@@ -147,11 +435,148 @@ class VectorBackend(MemoryBackend):
             logger.error(f"Failed to load task: session_id={session_id}, task_id={task_id}: {str(e)}")
             return None
 
+    def export_records(
+        self, session_id: Optional[str] = None, cursor: Optional[Any] = None, batch_size: int = 500
+    ) -> Iterator[Tuple[Any, Dict]]:
+        """Page through conversations, then tasks, without embeddings; cursors are [collection, offset]."""
+        self._drain_ingest()
+        name, offset = cursor if cursor else ("conversations", 0)
+        where = {"session_id": {"$eq": session_id}} if session_id is not None else None
+        for collection_name in ("conversations", "tasks"):
+            if name == "tasks" and collection_name == "conversations":
+                continue
+            if collection_name != name:
+                offset = 0
+            collection = self.conversation_collection if collection_name == "conversations" else self.task_collection
+            while True:
+                page = collection.get(
+                    where=where, limit=batch_size, offset=offset, include=["documents", "metadatas"]
+                )
+                for document, metadata in zip(page["documents"], page["metadatas"]):
+                    offset += 1
+                    if collection_name == "conversations":
+                        record = {"type": "conversation", **{
+                            key: metadata[key]
+                            for key in ("session_id", "task_id", "agent_name", "prompt", "response", "timestamp")
+                        }}
+                    else:
+                        record = {
+                            "type": "task", "session_id": metadata["session_id"], "task_id": metadata["task_id"],
+                            "task_data": json.loads(document), "timestamp": metadata["timestamp"],
+                        }
+                    yield [collection_name, offset], record
+                if len(page["ids"]) < batch_size:
+                    break
+
+    def import_records(self, records: List[Dict]) -> None:
+        """Embed and upsert records in ingest_batch_size chunks, keeping their original timestamps.
+
+        In "ttl" mode records that have already expired are skipped.
+        """
+        items = self._import_items(records)
+        for start in range(0, len(items), self.ingest_batch_size):
+            self._add_batch(items[start:start + self.ingest_batch_size])
+            error, self._ingest_error = self._ingest_error, None
+            if error:
+                raise error
+        logger.debug(f"Imported {len(items)} records into {self.db_path}")
+
+    def _import_items(self, records: List[Dict]) -> List[Tuple]:
+        """Build ingest items for records, dropping any older than the TTL."""
+        items = []
+        now, queued = time.time(), time.monotonic()
+        cutoff = now - self.ttl_seconds if self.retention == "ttl" else None
+        for record in records:
+            session_id, task_id = record["session_id"], record["task_id"]
+            timestamp = str(record.get("timestamp") or utc_timestamp())
+            created_at = _epoch(record.get("timestamp")) or now
+            if cutoff is not None and created_at < cutoff:
+                continue
+            if record["type"] == "conversation":
+                prompt, response = record["prompt"], record["response"]
+                items.append((
+                    "conversations",
+                    self._conversation_doc_id(session_id, task_id, record["agent_name"], prompt, response),
+                    f"{prompt}\n{response}",
+                    {
+                        "session_id": session_id, "task_id": task_id, "agent_name": record["agent_name"],
+                        "prompt": prompt, "response": response, "timestamp": timestamp, "created_at": created_at,
+                    },
+                    queued,
+                ))
+            elif record["type"] == "task":
+                items.append((
+                    "tasks",
+                    self._task_doc_id(session_id, task_id),
+                    json.dumps(record["task_data"]),
+                    {"session_id": session_id, "task_id": task_id, "timestamp": timestamp, "created_at": created_at},
+                    queued,
+                ))
+        return items
+
+    def reconcile(self, source: MemoryBackend, session_id: Optional[str] = None, batch_size: int = 500) -> int:
+        """Index the records of `source` that are missing here, embedding only those.
+
+        Presence is checked by document id without reading embeddings, so a warm index costs one
+        id lookup per batch. The export cursor of the last conversation checked is kept in the
+        collection metadata, and the next reconcile resumes from it instead of re-reading the whole
+        history. Returns the number of documents added. Ephemeral indexes are skipped.
+        """
+        if self.retention == "ephemeral":
+            return 0
+        self._drain_ingest()
+        source_path = getattr(source, "db_path", None) or getattr(source, "log_path", None)
+        mark_key = f"reconciled:{source.__class__.__name__}:{source_path}:{session_id}"
+        metadata = dict(self.conversation_collection.metadata or {})
+        mark = json.loads(metadata[mark_key]) if mark_key in metadata else None
+        added = 0
+        batch: List[Dict] = []
+        for cursor, record in source.export_records(session_id=session_id, cursor=mark, batch_size=batch_size):
+            batch.append(record)
+            if record["type"] == "conversation":
+                # Tasks are upserted in place, so only conversations advance the mark
+                mark = cursor
+            if len(batch) >= batch_size:
+                added += self._reconcile_batch(batch)
+                batch = []
+        if batch:
+            added += self._reconcile_batch(batch)
+        if mark is not None:
+            metadata[mark_key] = json.dumps(mark)
+            self.conversation_collection.modify(metadata=metadata)
+        logger.info(f"Reconciled {self.db_path} against {source.__class__.__name__}: added={added}")
+        return added
+
+    def _reconcile_batch(self, records: List[Dict]) -> int:
+        items = self._import_items(records)
+        present = set()
+        for name, collection in (("conversations", self.conversation_collection), ("tasks", self.task_collection)):
+            ids = [item[1] for item in items if item[0] == name]
+            if ids:
+                present.update(collection.get(ids=ids, include=[])["ids"])
+        missing = [item for item in items if item[1] not in present]
+        for start in range(0, len(missing), self.ingest_batch_size):
+            self._add_batch(missing[start:start + self.ingest_batch_size])
+            error, self._ingest_error = self._ingest_error, None
+            if error:
+                raise error
+        return len({item[1] for item in missing})
+
+    def expire(self) -> None:
+        """Delete documents older than ttl_seconds; a no-op unless retention is "ttl"."""
+        if self.retention != "ttl":
+            return
+        cutoff = time.time() - self.ttl_seconds
+        for collection in (self.conversation_collection, self.task_collection):
+            collection.delete(where={"created_at": {"$lt": cutoff}})
+        logger.debug(f"Expired documents older than {self.ttl_seconds}s from {self.db_path}")
+
     def find_similar(
         self, text: str, session_id: str, task_id: str, n_results: int
     ) -> List[Dict]:
         """Find similar conversations in the conversation collection."""
         try:
+            self._drain_ingest()
             query_embedding = self._generate_embedding(text)
             query_params = {
                 "n_results": n_results,
@@ -191,16 +616,27 @@ class VectorBackend(MemoryBackend):
             return []
 
     def stop(self) -> None:
-        """Signal shutdown of the VectorBackend."""
+        """Flush queued documents and signal shutdown of the VectorBackend."""
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush pending documents on stop: {str(e)}")
         logger.info(f"Signaled shutdown for VectorBackend: db_path={self.db_path}")
 
     def close(self) -> None:
-        """Close the ChromaDB client."""
+        """Close the ChromaDB client, deleting the collections only in "ephemeral" mode."""
+        self._stop_ingest_worker()
+        if self.embedding_cache:
+            self.embedding_cache.close()
+            self.embedding_cache = None
         try:
             if self.client:
-                self.client.delete_collection("conversations")
-                self.client.delete_collection("tasks")
-                logger.debug(f"Deleted collections for VectorBackend: db_path={self.db_path}")
+                if self.retention == "ephemeral":
+                    self.client.delete_collection("conversations")
+                    self.client.delete_collection("tasks")
+                    logger.debug(f"Deleted collections for VectorBackend: db_path={self.db_path}")
+                elif self.retention == "ttl":
+                    self.expire()
             self.client = None
             self.conversation_collection = None
             self.task_collection = None
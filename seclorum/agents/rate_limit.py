@@ -0,0 +1,236 @@
+# seclorum/agents/rate_limit.py
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from seclorum.agents.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+Bucket = Tuple[str, float, float]  # (name, capacity, refill per second)
+
+
+class RateLimitTimeout(RuntimeError):
+    pass
+
+
+class LocalBucketStore:
+    """Bucket levels kept in this process, guarded by a lock."""
+
+    def __init__(self):
+        self._levels: Dict[str, Tuple[float, float]] = {}  # name -> (level, updated)
+        self._lock = threading.Lock()
+
+    def reserve(
+        self, buckets: List[Bucket], costs: List[float], max_wait: Optional[float], commit: bool = True
+    ) -> Optional[float]:
+        """Deduct `costs` and return the seconds until they are covered, or None past `max_wait`."""
+        with self._lock:
+            now = time.monotonic()
+            levels = [self._level(name, capacity, rate, now) for name, capacity, rate in buckets]
+            wait = _wait_for(levels, buckets, costs)
+            if max_wait is not None and wait > max_wait:
+                return None
+            if not commit:
+                return wait
+            for (name, _, _), level, cost in zip(buckets, levels, costs):
+                self._levels[name] = (level - cost, now)
+            return wait
+
+    def _level(self, name: str, capacity: float, rate: float, now: float) -> float:
+        level, updated = self._levels.get(name, (capacity, now))
+        return min(capacity, level + (now - updated) * rate)
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBucketStore:
+    """Bucket levels in a SQLite file, so every process using the file draws from the same quota."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets (name TEXT PRIMARY KEY, level REAL, updated REAL)"
+        )
+        self._lock = threading.Lock()
+
+    def reserve(
+        self, buckets: List[Bucket], costs: List[float], max_wait: Optional[float], commit: bool = True
+    ) -> Optional[float]:
+        # Wall-clock time, since monotonic clocks are not comparable across processes
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                levels = []
+                for name, capacity, rate in buckets:
+                    row = cursor.execute("SELECT level, updated FROM rate_buckets WHERE name = ?", (name,)).fetchone()
+                    level, updated = row if row else (capacity, now)
+                    levels.append(min(capacity, level + max(0.0, now - updated) * rate))
+                wait = _wait_for(levels, buckets, costs)
+                if max_wait is not None and wait > max_wait:
+                    wait = None
+                elif commit:
+                    cursor.executemany(
+                        "INSERT OR REPLACE INTO rate_buckets (name, level, updated) VALUES (?, ?, ?)",
+                        [(name, level - cost, now) for (name, _, _), level, cost in zip(buckets, levels, costs)],
+                    )
+                cursor.execute("COMMIT")
+                return wait
+            except sqlite3.Error:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _wait_for(levels: List[float], buckets: List[Bucket], costs: List[float]) -> float:
+    """Seconds until every bucket has refilled enough to cover its cost."""
+    wait = 0.0
+    for level, (_, _, rate), cost in zip(levels, buckets, costs):
+        if cost > 0 and level < cost:
+            wait = max(wait, (cost - level) / rate)
+    return wait
+
+
+class RateLimiter:
+    """Per-endpoint token buckets for requests and model tokens per minute.
+
+    Callers reserve capacity up front and sleep until their reservation comes due, so
+    concurrent callers queue in arrival order at the configured rate instead of bursting into
+    429s. Use `RateLimiter.get(endpoint)`; limits come from the endpoint's settings, and with
+    `Settings.Agent.RemoteInfer.RATE_LIMIT_DB` (or SECLORUM_RATE_LIMIT_DB) set, buckets live in
+    that SQLite file and are shared by every process on the machine.
+    """
+
+    _instances: Dict[str, "RateLimiter"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        endpoint: str,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        burst_requests: Optional[float] = None,
+        db_path: Optional[str] = None,
+        max_wait: Optional[float] = Settings.Agent.RemoteInfer.RATE_LIMIT_MAX_WAIT,
+    ):
+        """
+        Args:
+            endpoint: Endpoint name; bucket names are derived from it.
+            requests_per_minute: Sustained request rate; None disables the request bucket.
+            tokens_per_minute: Sustained model-token rate; None disables the token bucket.
+            burst_requests: Requests allowed back to back from a full bucket; defaults to one second's worth, at least 1.
+            db_path: SQLite file shared between processes; None keeps buckets in this process.
+            max_wait: Longest a caller may be queued before RateLimitTimeout; None waits indefinitely.
+        """
+        self.endpoint = endpoint
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_wait = max_wait
+        self._request_bucket: Optional[Bucket] = None
+        self._token_bucket: Optional[Bucket] = None
+        if requests_per_minute:
+            burst = burst_requests if burst_requests is not None else max(1.0, requests_per_minute / 60)
+            self._request_bucket = (f"{endpoint}:requests", burst, requests_per_minute / 60)
+        if tokens_per_minute:
+            # A minute's worth of tokens, so one large prompt is never larger than the bucket
+            self._token_bucket = (f"{endpoint}:tokens", tokens_per_minute, tokens_per_minute / 60)
+        self.store = SQLiteBucketStore(db_path) if db_path else LocalBucketStore()
+
+    @classmethod
+    def get(cls, endpoint: str) -> "RateLimiter":
+        """Return the shared limiter for an endpoint, configured from its settings on first use."""
+        with cls._instances_lock:
+            limiter = cls._instances.get(endpoint)
+            if limiter is None:
+                config = Settings.get_endpoint_config(endpoint)
+                requests_per_minute = config.get("requests_per_minute")
+                if requests_per_minute is None and config.get("max_calls_per_window"):
+                    window = config.get("rate_limit_window", Settings.Agent.RemoteInfer.RATE_LIMIT_WINDOW)
+                    requests_per_minute = config["max_calls_per_window"] * 60 / window
+                limiter = cls._instances[endpoint] = cls(
+                    endpoint,
+                    requests_per_minute=requests_per_minute,
+                    tokens_per_minute=config.get("tokens_per_minute"),
+                    burst_requests=config.get("burst_requests"),
+                    db_path=os.getenv("SECLORUM_RATE_LIMIT_DB") or Settings.Agent.RemoteInfer.RATE_LIMIT_DB,
+                )
+                logger.debug(
+                    f"Registered rate limiter for {endpoint}: rpm={requests_per_minute}, "
+                    f"tpm={limiter.tokens_per_minute}, shared={not isinstance(limiter.store, LocalBucketStore)}"
+                )
+            return limiter
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drop all shared limiters."""
+        with cls._instances_lock:
+            limiters, cls._instances = list(cls._instances.values()), {}
+        for limiter in limiters:
+            limiter.store.close()
+
+    def _reserve(self, requests: float, tokens: float, max_wait: Optional[float]) -> float:
+        buckets, costs = [], []
+        if self._request_bucket and requests:
+            buckets.append(self._request_bucket)
+            costs.append(requests)
+        if self._token_bucket and tokens:
+            buckets.append(self._token_bucket)
+            costs.append(tokens)
+        if not buckets:
+            return 0.0
+        wait = self.store.reserve(buckets, costs, max_wait)
+        if wait is None:
+            raise RateLimitTimeout(
+                f"Rate limit for {self.endpoint} would queue this call for more than {max_wait}s"
+            )
+        if wait > 0:
+            logger.debug(f"Rate limit for {self.endpoint}: queued {wait:.2f}s for {requests} requests, {tokens} tokens")
+        return wait
+
+    def _max_wait(self, max_wait: Optional[float]) -> Optional[float]:
+        """The tighter of the limiter's own max_wait and a caller's deadline."""
+        if max_wait is None:
+            return self.max_wait
+        return max_wait if self.max_wait is None else min(max_wait, self.max_wait)
+
+    def acquire(self, tokens: float = 0, requests: float = 1, max_wait: Optional[float] = None) -> float:
+        """Reserve one request (and `tokens` model tokens), sleeping until the reservation is due.
+
+        Returns the seconds waited; raises RateLimitTimeout instead of queueing past `max_wait`
+        (capped by the limiter's own), so callers under a deadline fail before reserving quota.
+        """
+        wait = self._reserve(requests, tokens, self._max_wait(max_wait))
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens: float = 0, requests: float = 1, max_wait: Optional[float] = None) -> float:
+        """Async `acquire`; the reservation (a SQLite transaction for shared stores) runs in a worker
+        thread and the wait uses asyncio.sleep, so the event loop keeps running."""
+        wait = await asyncio.to_thread(self._reserve, requests, tokens, self._max_wait(max_wait))
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def settle(self, reserved: float, actual: Optional[float]) -> None:
+        """Charge (or refund) the difference between tokens reserved up front and tokens actually used."""
+        if actual is None or not self._token_bucket or actual == reserved:
+            return
+        self.store.reserve([self._token_bucket], [actual - reserved], None)
+
+    def delay(self) -> float:
+        """Seconds a request reserved now would wait, without reserving it."""
+        if not self._request_bucket:
+            return 0.0
+        return self.store.reserve([self._request_bucket], [1], None, commit=False)
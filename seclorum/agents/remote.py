@@ -4,6 +4,9 @@ from typing import Optional, Dict, Any
 import os
 import logging
 import time
+from seclorum.agents.http_client import HttpClient
+from seclorum.agents.memory.context import estimate_tokens
+from seclorum.agents.rate_limit import RateLimiter
 
 class Remote:
     """Mixin to provide optional remote inference capabilities to agents."""
@@ -16,11 +19,6 @@ class Remote:
         }
     }
 
-    _last_remote_call = 0
-    _remote_call_count = 0
-    _rate_limit_window = 60
-    _max_calls_per_window = 10
-
     def remote_infer(self, prompt: str, endpoint: str = "google_ai_studio", **kwargs) -> Optional[str]:
         logger = getattr(self, 'logger', logging.getLogger(f"Agent_{getattr(self, 'name', 'Remote')}"))
 
@@ -47,20 +45,18 @@ class Remote:
 
         logger.info(f"Sending inference request to {url} with payload: {payload}")
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
+            # Waits on the endpoint's shared rate limiter before sending
+            response = HttpClient.get(endpoint).post(
+                url, json=payload, headers=headers, timeout=10, tokens=estimate_tokens(prompt)
+            )
             response.raise_for_status()
             result = response.json()["candidates"][0]["content"]["parts"][0]["text"]
             logger.debug(f"Remote inference successful: {result[:50]}...")
-            current_time = time.time()
-            if current_time - self._last_remote_call > self._rate_limit_window:
-                self._remote_call_count = 0
-            self._remote_call_count += 1
-            self._last_remote_call = current_time
             return result.strip()
         except requests.RequestException as e:
             logger.error(f"Remote inference failed: {str(e)}")
-            logger.debug(f"Response status: {e.response.status_code if e.response else 'No response'}")
-            logger.debug(f"Response content: {e.response.text if e.response else 'No content'}")
+            logger.debug(f"Response status: {e.response.status_code if e.response is not None else 'No response'}")
+            logger.debug(f"Response content: {e.response.text if e.response is not None else 'No content'}")
             return None
 
     def should_use_remote(self, prompt: str) -> bool:
@@ -68,10 +64,8 @@ class Remote:
         has_local_model = hasattr(self, "model") and self.model is not None
         prompt_length = len(prompt)
         is_complex = prompt_length > 200
-        current_time = time.time()
-        if current_time - self._last_remote_call > self._rate_limit_window:
-            self._remote_call_count = 0
-        rate_limit_ok = self._remote_call_count < self._max_calls_per_window
+        # Remote is only preferred while a request would go out without queueing for quota
+        rate_limit_ok = RateLimiter.get("google_ai_studio").delay() == 0
 
         if not has_local_model:
             logger.debug("No local model, preferring remote")
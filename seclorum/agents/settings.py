@@ -13,15 +13,27 @@ class Settings:
             TEMPERATURE_DEFAULT = 0.7
             RATE_LIMIT_WINDOW = 60  # Seconds
             MAX_CALLS_PER_WINDOW = 10  # Default max calls per window
+            # Shared keep-alive pool per endpoint; endpoints may override these in their config
+            HTTP_POOL_CONNECTIONS = 4
+            HTTP_POOL_MAXSIZE = 16
+            HEALTH_CHECK_TTL = 300  # Seconds an endpoint stays trusted after a successful probe or request
+            # SQLite file holding rate-limit buckets shared by all processes; None keeps them per process
+            RATE_LIMIT_DB = None
+            RATE_LIMIT_MAX_WAIT = 120  # Seconds a call may queue for quota before RateLimitTimeout
             # Remote endpoint configurations
             REMOTE_ENDPOINTS: Dict[str, Dict[str, Any]] = {
                 "google_ai_studio": {
                     "url": "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
+                    "stream_url": "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:streamGenerateContent",
+                    "models_url": "https://generativelanguage.googleapis.com/v1beta/models",  # Also the health probe
                     "api_key_env": "GOOGLE_AI_STUDIO_API_KEY",  # Environment variable for API key
                     "model": "gemini-1.5-flash",
                     "headers": {"Content-Type": "application/json"},
                     "rate_limit_window": 60,  # Endpoint-specific rate limit window
                     "max_calls_per_window": 10,  # Endpoint-specific max calls
+                    "tokens_per_minute": 1_000_000,
+                    # Where responses report tokens used, to settle the prompt estimate reserved up front
+                    "usage_path": ["usageMetadata", "totalTokenCount"],
                 },
                 # Example for future endpoints
                 # "openai": {
@@ -37,6 +49,18 @@ class Settings:
         class Infer:
             MAX_RETRIES = 3
             MAX_TOKENS_DEFAULT = 16384
+            # Context assembled when use_context=True: rolling summary + similar turns + recent turns
+            CONTEXT_TOKEN_BUDGET = 4096
+            CONTEXT_TOKEN_BUDGETS = {"llama_cpp": 1024, "ollama": 2048, "google_ai_studio": 8192}
+            CONTEXT_RECENT_TURNS = 6
+            CONTEXT_SIMILAR_TURNS = 3
+            # Most turns read per build: the recent window plus older turns not yet in the summary
+            CONTEXT_HISTORY_TURNS = 20
+            # Who shares cached answers to equivalent prompts: "agent", "task", "session" or "global"
+            # (all sessions, through MemoryManager's shared cache store)
+            CACHE_SCOPE = "agent"
+            # Seconds a caller waits for an identical in-flight inference before SingleFlightTimeout
+            COALESCE_TIMEOUT = 300
             TIMEOUT_DEFAULT = 300
             TEMPERATURE_DEFAULT = 0.7
 
@@ -0,0 +1,112 @@
+# seclorum/agents/single_flight.py
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightTimeout(TimeoutError):
+    pass
+
+
+class _LeaderCancelled(Exception):
+    """Handed to waiters when the leading coroutine was cancelled, so one of them takes over."""
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers arriving while it runs
+    wait for its result, or its exception, instead of running it again. Threads and coroutines
+    share keys: both wait on the same concurrent.futures.Future.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _finish(self, key: str, future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        # Later callers must start a new flight (and find the cache filled) rather than join a finished one
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """Run `fn` once for all concurrent callers with `key`.
+
+        Returns (result, joined), where joined is True for callers that waited on another
+        caller's run. Waiters re-raise the leader's exception, and raise SingleFlightTimeout
+        after `timeout` seconds. A caller on an event-loop thread runs `fn` itself instead of
+        waiting, as blocking would stall the loop (and any leader running on it); such callers
+        should use `ado`.
+        """
+        while True:
+            future, leader = self._join(key)
+            if not leader and _on_event_loop():
+                logger.debug(f"Not waiting on in-flight call {key} from an event-loop thread")
+                return fn(), False
+            if leader:
+                try:
+                    result = fn()
+                except BaseException as e:
+                    self._finish(key, future, error=e)
+                    raise
+                self._finish(key, future, result)
+                return result, False
+            logger.debug(f"Waiting on in-flight call {key}")
+            try:
+                return future.result(timeout), True
+            except _LeaderCancelled:
+                continue
+            except FutureTimeout:
+                if future.done():
+                    raise
+                raise SingleFlightTimeout(f"Timed out after {timeout}s waiting for in-flight call {key}")
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """Async `do`; waiting never blocks the event loop, and cancelling a waiter leaves the leader running."""
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                try:
+                    result = await fn()
+                except asyncio.CancelledError:
+                    self._finish(key, future, error=_LeaderCancelled())
+                    raise
+                except BaseException as e:
+                    self._finish(key, future, error=e)
+                    raise
+                self._finish(key, future, result)
+                return result, False
+            logger.debug(f"Waiting on in-flight call {key}")
+            waiter = asyncio.shield(asyncio.wrap_future(future))
+            try:
+                return await asyncio.wait_for(waiter, timeout), True
+            except _LeaderCancelled:
+                continue
+            except asyncio.TimeoutError:
+                if future.done():
+                    raise
+                raise SingleFlightTimeout(f"Timed out after {timeout}s waiting for in-flight call {key}")
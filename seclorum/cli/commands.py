@@ -95,10 +95,15 @@ def main():
                     logger.info(f"Created and cleared {log_file}")
             logger.info("Reset complete - restart with 'start' command")
         
+        elif sys.argv[1] == "migrate":
+            from seclorum.agents.memory.migrate import main as migrate_main
+            logger.info(f"Migrating memory: {' '.join(sys.argv[2:])}")
+            migrate_main(sys.argv[2:])
+
         else:
             logger.error(f"Unknown command: {sys.argv[1]}")
     else:
-        logger.error("No command provided. Use 'start', 'stop', or 'reset'")
+        logger.error("No command provided. Use 'start', 'stop', 'reset', or 'migrate'")
 
 if __name__ == "__main__":
     try:
@@ -1,6 +1,7 @@
 # seclorum/models/manager.py
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+import asyncio
+from typing import Optional, Dict, Any, Iterator
 import logging
 import os
 import json
@@ -22,6 +23,33 @@ class ModelManager(ABC):
     def generate(self, prompt: str, **kwargs) -> str:
         pass
 
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """Async generate; the default runs `generate` in a worker thread.
+
+        Cancelling the awaiting task returns control immediately, but a local model keeps
+        running in its thread until the current generation finishes. Providers with an async
+        client override this so cancellation also aborts the request.
+        """
+        return await asyncio.to_thread(self.generate, prompt, **kwargs)
+
+    def generate_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Yield the generated text in chunks as the model produces them.
+
+        The default yields the whole `generate` result as one chunk; providers that can stream
+        override this so the first chunk arrives before generation finishes.
+        """
+        result = self.generate(prompt, **kwargs)
+        if result is not None and len(result):
+            yield result
+
+    def finish_stream(self, text: str, **kwargs) -> str:
+        """Turn the joined chunks of `generate_stream` into the string `generate` would have returned.
+
+        Takes the same kwargs as `generate_stream`. The default returns the text unchanged;
+        providers whose `generate` post-processes the raw output apply the same steps here.
+        """
+        return text
+
     def close(self):
         """Optional method for resource cleanup."""
         pass
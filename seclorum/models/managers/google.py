@@ -1,9 +1,11 @@
 # seclorum/models/model_managers/google.py
 import logging
 import os
-import requests
+from typing import Dict, Iterator, List, Tuple
 from ..manager import ModelManager
 from ...agents.settings import Settings
+from ...agents.http_client import HttpClient
+from ...agents.memory.context import estimate_tokens
 
 logger = logging.getLogger("ModelManager")
 
@@ -14,78 +16,117 @@ class GoogleModelManager(ModelManager):
         if not self.api_key:
             self.logger.warning("GOOGLE_AI_STUDIO_API_KEY not set, structured output may be limited")
 
-    def generate(self, prompt: str, **kwargs) -> str:
-        if not self.api_key:
-            self.logger.error("GOOGLE_AI_STUDIO_API_KEY not set. Set it with 'export GOOGLE_AI_STUDIO_API_KEY=your_key'")
-            return ""
+    @property
+    def models_url(self) -> str:
+        return Settings.get_endpoint_config(self.provider).get(
+            "models_url", "https://generativelanguage.googleapis.com/v1beta/models"
+        )
 
-        max_tokens = kwargs.get("max_tokens", Settings.Agent.RemoteInfer.MAX_TOKENS_DEFAULT)
-        temperature = kwargs.get("temperature", Settings.Agent.RemoteInfer.TEMPERATURE_DEFAULT)
+    def _attempts(self, prompt: str, **kwargs) -> List[Tuple[str, Dict]]:
+        """(label, request body) pairs tried in order: schema-constrained JSON first when a function_call is given."""
+        generation_config = {
+            "maxOutputTokens": kwargs.get("max_tokens", Settings.Agent.RemoteInfer.MAX_TOKENS_DEFAULT),
+            "temperature": kwargs.get("temperature", Settings.Agent.RemoteInfer.TEMPERATURE_DEFAULT),
+        }
+        attempts = []
         function_call = kwargs.get("function_call", None)
-
         if function_call:
-            schema = function_call.get("schema")
-            self.logger.info(f"Using responseSchema for JSON generation with schema for {self.model_name}")
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model_name}:generateContent"
-            headers = {"Content-Type": "application/json"}
-            data = {
+            attempts.append(("responseSchema", {
                 "contents": [{"parts": [{"text": prompt}]}],
                 "generationConfig": {
-                    "maxOutputTokens": max_tokens,
-                    "temperature": temperature,
+                    **generation_config,
                     "responseMimeType": "application/json",
-                    "responseSchema": schema
-                }
-            }
+                    "responseSchema": function_call.get("schema"),
+                },
+            }))
+        attempts.append(("standard generation", {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": generation_config,
+        }))
+        return attempts
+
+    def _extract_text(self, result: Dict, label: str) -> str:
+        if not result.get("candidates"):
+            self.logger.error("Remote inference returned no candidates")
+            return ""
+        text = result["candidates"][0]["content"]["parts"][0]["text"]
+        if not text.strip():
+            self.logger.error("Remote inference returned empty text")
+            return ""
+        self.logger.debug(f"{label} output: {text[:200]}...")
+        return text.strip()
+
+    def _log_failure(self, label: str, error: Exception, last: bool) -> None:
+        if last:
+            self.logger.error(f"Remote inference failed: {str(error)}")
+        else:
+            self.logger.warning(f"{label} generation failed: {str(error)}. Falling back to standard generation.")
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        if not self.api_key:
+            self.logger.error("GOOGLE_AI_STUDIO_API_KEY not set. Set it with 'export GOOGLE_AI_STUDIO_API_KEY=your_key'")
+            return ""
+        url = f"{self.models_url}/{self.model_name}:generateContent?key={self.api_key}"
+        timeout = kwargs.get("timeout", Settings.Agent.RemoteInfer.TIMEOUT_DEFAULT)
+        attempts = self._attempts(prompt, **kwargs)
+        for i, (label, data) in enumerate(attempts):
+            self.logger.info(f"Using {label} for {self.model_name}")
             try:
-                response = requests.post(
-                    f"{url}?key={self.api_key}",
-                    json=data,
-                    headers=headers,
-                    timeout=kwargs.get("timeout", Settings.Agent.RemoteInfer.TIMEOUT_DEFAULT)
+                response = HttpClient.get(self.provider).post(
+                    url, json=data, headers={"Content-Type": "application/json"}, timeout=timeout,
+                    tokens=estimate_tokens(prompt),
                 )
                 response.raise_for_status()
-                result = response.json()
-                if not result.get("candidates"):
-                    self.logger.error("Remote inference returned no candidates")
-                    return ""
-                text = result["candidates"][0]["content"]["parts"][0]["text"]
-                if not text.strip():
-                    self.logger.error("Remote inference returned empty text")
-                    return ""
-                self.logger.debug(f"responseSchema output: {text[:200]}...")
-                return text.strip()
+                return self._extract_text(response.json(), label)
             except Exception as e:
-                self.logger.warning(f"responseSchema generation failed: {str(e)}. Falling back to standard generation.")
+                self._log_failure(label, e, last=i == len(attempts) - 1)
+        return ""
 
-        self.logger.info(f"Using standard generation for {self.model_name}")
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model_name}:generateContent"
-        headers = {"Content-Type": "application/json"}
-        data = {
-            "contents": [{"parts": [{"text": prompt}]}],
-            "generationConfig": {
-                "maxOutputTokens": max_tokens,
-                "temperature": temperature
-            }
-        }
-        try:
-            response = requests.post(
-                f"{url}?key={self.api_key}",
-                json=data,
-                headers=headers,
-                timeout=kwargs.get("timeout", Settings.Agent.RemoteInfer.TIMEOUT_DEFAULT)
-            )
-            response.raise_for_status()
-            result = response.json()
-            if not result.get("candidates"):
-                self.logger.error("Remote inference returned no candidates")
-                return ""
-            text = result["candidates"][0]["content"]["parts"][0]["text"]
-            if not text.strip():
-                self.logger.error("Remote inference returned empty text")
-                return ""
-            self.logger.debug(f"Standard generation output: {text[:200]}...")
-            return text.strip()
-        except Exception as e:
-            self.logger.error(f"Remote inference failed: {str(e)}")
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """Async generate over the endpoint's pooled httpx client; cancellation aborts the request."""
+        if not self.api_key:
+            self.logger.error("GOOGLE_AI_STUDIO_API_KEY not set. Set it with 'export GOOGLE_AI_STUDIO_API_KEY=your_key'")
             return ""
+        url = f"{self.models_url}/{self.model_name}:generateContent?key={self.api_key}"
+        timeout = kwargs.get("timeout", Settings.Agent.RemoteInfer.TIMEOUT_DEFAULT)
+        attempts = self._attempts(prompt, **kwargs)
+        for i, (label, data) in enumerate(attempts):
+            self.logger.info(f"Using {label} for {self.model_name}")
+            try:
+                response = await HttpClient.get(self.provider).apost(
+                    url, json=data, headers={"Content-Type": "application/json"}, timeout=timeout,
+                    tokens=estimate_tokens(prompt),
+                )
+                response.raise_for_status()
+                return self._extract_text(response.json(), label)
+            except Exception as e:
+                self._log_failure(label, e, last=i == len(attempts) - 1)
+        return ""
+
+    def generate_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Stream generate through streamGenerateContent; falls back between attempts only before the first chunk."""
+        if not self.api_key:
+            self.logger.error("GOOGLE_AI_STUDIO_API_KEY not set. Set it with 'export GOOGLE_AI_STUDIO_API_KEY=your_key'")
+            return
+        url = f"{self.models_url}/{self.model_name}:streamGenerateContent?alt=sse&key={self.api_key}"
+        timeout = kwargs.get("timeout", Settings.Agent.RemoteInfer.TIMEOUT_DEFAULT)
+        attempts = self._attempts(prompt, **kwargs)
+        for i, (label, data) in enumerate(attempts):
+            self.logger.info(f"Streaming {label} for {self.model_name}")
+            streamed = False
+            try:
+                for event in HttpClient.get(self.provider).stream_events(
+                    url, json=data, headers={"Content-Type": "application/json"}, timeout=timeout,
+                    tokens=estimate_tokens(prompt),
+                ):
+                    parts = (event.get("candidates") or [{}])[0].get("content", {}).get("parts", [])
+                    text = "".join(part.get("text", "") for part in parts)
+                    if text:
+                        streamed = True
+                        yield text
+                return
+            except Exception as e:
+                # Chunks already handed out cannot be taken back, so a broken stream is not retried
+                self._log_failure(label, e, last=streamed or i == len(attempts) - 1)
+                if streamed:
+                    return
@@ -1,5 +1,5 @@
 # seclorum/models/managers/llama_cpp.py
-from typing import Optional
+from typing import Iterator, Optional
 import logging
 import os
 import json
@@ -72,47 +72,83 @@ class LlamaCppModelManager(ModelManager):
         except json.JSONDecodeError:
             return json_str.strip()
 
-    def generate(self, prompt: str, **kwargs) -> str:
-        try:
-            max_tokens = kwargs.get("max_tokens", 4096)
-            temperature = kwargs.get("temperature", 0.3)
-            messages = kwargs.get("messages", None)
-            system = kwargs.get("system", "Output only valid JSON. Do not include markdown, comments, or additional text.")
-            function_call = kwargs.get("function_call", None)
-            tools = function_call.get("tools") if function_call else None
+    def _format_prompt(self, prompt: str, **kwargs) -> str:
+        messages = kwargs.get("messages", None)
+        system = kwargs.get("system", "Output only valid JSON. Do not include markdown, comments, or additional text.")
+        function_call = kwargs.get("function_call", None)
+        tools = function_call.get("tools") if function_call else None
+        if messages:
+            try:
+                return self.chat_template.apply_chat_template(messages, system=system, tools=tools)
+            except Exception as e:
+                logger.warning(f"Chat template failed: {str(e)}. Using raw prompt.")
+        return f"{system}\n\n{prompt}"
 
-            if not self.llama_cpp:
-                raise ValueError("llama_cpp model not initialized")
+    def _completion(self, prompt: str, stream: bool = False, **kwargs):
+        if not self.llama_cpp:
+            raise ValueError("llama_cpp model not initialized")
+        max_tokens = kwargs.get("max_tokens", 4096)
+        temperature = kwargs.get("temperature", 0.3)
+        logger.info(f"Using {'streaming' if stream else 'standard'} generation for {self.model_name} with max_tokens={max_tokens}, temperature={temperature}")
+        return self.llama_cpp(
+            prompt=self._format_prompt(prompt, **kwargs),
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stop=["</s>", "<|eot_id|>", "\n\n"],
+            top_p=0.9,
+            top_k=40,
+            stream=stream,
+        )
 
-            if messages:
-                try:
-                    prompt = self.chat_template.apply_chat_template(messages, system=system, tools=tools)
-                except Exception as e:
-                    logger.warning(f"Chat template failed: {str(e)}. Using raw prompt.")
-                    prompt = f"{system}\n\n{prompt}"
-            else:
-                prompt = f"{system}\n\n{prompt}"
+    def _postprocess(self, raw_output: str, function_call=None) -> str:
+        """Extract the JSON payload from raw completion text, validating it for function calls."""
+        raw_result = raw_output.strip()
+        result = self._extract_json(raw_result)
+        if function_call:
+            try:
+                json.loads(result)
+                logger.debug(f"JSON output validated: {result[:200]}...")
+            except json.JSONDecodeError as e:
+                logger.warning(f"Output is not valid JSON: {str(e)}. Returning raw output.")
+                result = json.dumps({"error": "Invalid JSON output", "raw": raw_result})
+        return result
 
-            logger.info(f"Using standard generation for {self.model_name} with max_tokens={max_tokens}, temperature={temperature}")
-            output = self.llama_cpp(
-                prompt=prompt,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                stop=["</s>", "<|eot_id|>", "\n\n"],
-                top_p=0.9,
-                top_k=40
-            )
-            raw_result = output["choices"][0]["text"].strip()
-            result = self._extract_json(raw_result)
-            if function_call:
-                try:
-                    json.loads(result)
-                    logger.debug(f"JSON output validated: {result[:200]}...")
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Output is not valid JSON: {str(e)}. Returning raw output.")
-                    result = json.dumps({"error": "Invalid JSON output", "raw": raw_result})
+    def generate(self, prompt: str, **kwargs) -> str:
+        try:
+            output = self._completion(prompt, **kwargs)
+            result = self._postprocess(output["choices"][0]["text"], kwargs.get("function_call"))
             logger.debug(f"Standard generation output: {result[:200]}...")
             return result
         except Exception as e:
             logger.error(f"Failed to generate with {self.model_name}: {str(e)}")
             return json.dumps({"error": "Generation failed", "raw": str(e)})
+
+    def generate_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Stream raw completion text with stream=True; function calls yield one validated chunk.
+
+        `finish_stream` turns the joined chunks into what `generate` returns. A failure before
+        the first chunk yields generate's error payload; one after it raises, since the chunks
+        already handed out cannot be replaced by that payload.
+        """
+        if kwargs.get("function_call"):
+            # JSON extraction and validation need the complete output
+            yield from super().generate_stream(prompt, **kwargs)
+            return
+        streamed = False
+        try:
+            for chunk in self._completion(prompt, stream=True, **kwargs):
+                text = chunk["choices"][0]["text"]
+                if text:
+                    streamed = True
+                    yield text
+        except Exception as e:
+            logger.error(f"Failed to stream with {self.model_name}: {str(e)}")
+            if streamed:
+                raise
+            yield json.dumps({"error": "Generation failed", "raw": str(e)})
+
+    def finish_stream(self, text: str, **kwargs) -> str:
+        if kwargs.get("function_call"):
+            # Already the validated output of generate
+            return text
+        return self._postprocess(text)
@@ -1,18 +1,24 @@
 # seclorum/models/managers/ollama.py
-from typing import Optional, Any
+from typing import Optional, Any, Dict, Iterator
+import asyncio
 import subprocess
 import time
 import logging
+import weakref
 import ollama
 import numpy as np
 from ..manager import ModelManager
 
 logger = logging.getLogger("OllamaModelManager")
 
+DEFAULT_SYSTEM_PROMPT = "Output only valid JSON. Do not include markdown, comments, or additional text."
+
 class OllamaModelManager(ModelManager):
     def __init__(self, model_name: str = "llama3.2", host: str = "http://localhost:11434"):
         super().__init__(model_name, provider="ollama", host=host)
         self.client = ollama.Client(host=self.host)
+        # ollama.AsyncClient wraps an httpx client bound to the loop that first used it
+        self._async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
         self.ensure_model_and_server()
 
     def ensure_model_and_server(self):
@@ -33,6 +39,23 @@ class OllamaModelManager(ModelManager):
             time.sleep(2)
             self.ensure_model_and_server()
 
+    def _request_kwargs(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Arguments of a standard generate request, shared by the sync, async and streaming paths.
+
+        A caller's `system` replaces the default JSON-only instruction instead of being passed twice.
+        """
+        return {
+            "model": self.model_name,
+            "prompt": prompt,
+            "system": kwargs.get("system") or DEFAULT_SYSTEM_PROMPT,
+            "options": {
+                "num_predict": kwargs.get("max_tokens", 16384),
+                "temperature": kwargs.get("temperature", 0.7),
+                "raw": kwargs.get("raw", False),
+            },
+            **{k: v for k, v in kwargs.items() if k in ("template", "context")},
+        }
+
     def generate(self, prompt: str, task: str = "text", **kwargs) -> Any:
         try:
             if task == "embedding":
@@ -84,18 +107,7 @@ class OllamaModelManager(ModelManager):
                 self.logger.warning("No valid function call result, falling back to standard generation.")
 
             self.logger.info(f"Using standard generation for {self.model_name}")
-            options = {
-                "num_predict": max_tokens,
-                "temperature": temperature,
-                "raw": raw_mode
-            }
-            response = self.client.generate(
-                model=self.model_name,
-                prompt=prompt,
-                system="Output only valid JSON. Do not include markdown, comments, or additional text.",
-                options=options,
-                **{k: v for k, v in kwargs.items() if k in ['system', 'template', 'context']}
-            )
+            response = self.client.generate(**self._request_kwargs(prompt, **kwargs))
             result = response['response'].strip()
             self.logger.debug(f"Standard generation output: {result[:200]}...")
             return result
@@ -103,5 +115,39 @@ class OllamaModelManager(ModelManager):
             self.logger.error(f"Failed to generate {task} with {self.model_name}: {str(e)}")
             return np.zeros(768) if task == "embedding" else ""
 
+    def _async_client(self) -> "ollama.AsyncClient":
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = ollama.AsyncClient(host=self.host)
+        return client
+
+    async def agenerate(self, prompt: str, task: str = "text", **kwargs) -> Any:
+        """Async standard generation through ollama.AsyncClient; embeddings and function calls use a thread."""
+        if task == "embedding" or (kwargs.get("function_call") and "mistral" in self.model_name.lower()):
+            return await super().agenerate(prompt, task=task, **kwargs)
+        try:
+            self.logger.info(f"Using async standard generation for {self.model_name}")
+            response = await self._async_client().generate(**self._request_kwargs(prompt, **kwargs))
+            result = response['response'].strip()
+            self.logger.debug(f"Standard generation output: {result[:200]}...")
+            return result
+        except Exception as e:
+            self.logger.error(f"Failed to generate {task} with {self.model_name}: {str(e)}")
+            return ""
+
+    def generate_stream(self, prompt: str, task: str = "text", **kwargs) -> Iterator[str]:
+        """Stream standard generation with stream=True; embeddings and function calls yield one chunk."""
+        if task == "embedding" or (kwargs.get("function_call") and "mistral" in self.model_name.lower()):
+            yield from super().generate_stream(prompt, task=task, **kwargs)
+            return
+        try:
+            self.logger.info(f"Using streaming generation for {self.model_name}")
+            for chunk in self.client.generate(stream=True, **self._request_kwargs(prompt, **kwargs)):
+                if chunk['response']:
+                    yield chunk['response']
+        except Exception as e:
+            self.logger.error(f"Failed to stream {task} with {self.model_name}: {str(e)}")
+
     def close(self):
         self.logger.debug(f"Closing OllamaModelManager for model: {self.model_name}")
@@ -0,0 +1,107 @@
+# tests/test_async_inference.py
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from seclorum.agents.agent import Agent
+from seclorum.agents.memory.manager import MemoryManager
+from seclorum.agents.memory.sqlite import SQLiteBackend
+from seclorum.models import Task
+from seclorum.models.managers.mock import MockModelManager
+
+
+class SlowModelManager(MockModelManager):
+    """Blocking local model; agenerate falls back to the base class thread offload."""
+
+    def __init__(self, delay: float):
+        super().__init__("slow")
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return f"answer to {prompt}"
+
+
+class StubAgent(Agent):
+    def __init__(self, model, memory_manager, session_id="async_session"):
+        # Agent.__init__ would also set up git, filesystem and the shared memory stores
+        self.name = "stub_agent"
+        self.session_id = session_id
+        self.logger = logging.getLogger("Agent_stub_agent")
+        self.logs = []
+        self.model = model
+        self.available_models = {"default": model}
+        self.current_model_key = "default"
+        self.memory_manager = memory_manager
+
+    def get_retry_prompt(self, original_prompt, previous_result, error, validation_passed):
+        return original_prompt
+
+    def get_schema(self):
+        return {}
+
+    def get_prompt(self, task):
+        return task.description
+
+
+class TestAsyncInference(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_async_inference_")
+        self.manager = MemoryManager(
+            base_dir=self.base_dir,
+            backends=[{"backend": SQLiteBackend, "config": {"db_path": os.path.join(self.base_dir, "{session_id}.db")}}],
+        )
+        self.model = SlowModelManager(delay=0.3)
+        self.agent = StubAgent(self.model, self.manager)
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def task(self, task_id):
+        return Task(task_id=task_id, description="describe", parameters={})
+
+    async def test_concurrent_inferences_share_one_loop(self):
+        started = time.monotonic()
+        results = await asyncio.gather(*(
+            self.agent.ainfer(f"prompt {i}", self.task(f"task_{i}")) for i in range(4)
+        ))
+        self.assertEqual(results, [f"answer to prompt {i}" for i in range(4)])
+        # Four 0.3s generations overlap instead of running back to back
+        self.assertLess(time.monotonic() - started, 1.0)
+        # Results land in memory and the prompt cache exactly as with infer()
+        self.assertEqual(len(self.manager.load_history("task_0", "stub_agent", "async_session")), 1)
+        self.assertEqual(await self.agent.ainfer("prompt 0", self.task("task_0")), "answer to prompt 0")
+        self.assertEqual(self.model.calls, 4)
+
+    async def test_deadline_raises_timeout(self):
+        self.model.delay = 2
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.agent.ainfer("slow prompt", self.task("task_slow"), timeout=0.2)
+
+    async def test_cancellation_is_not_retried(self):
+        self.model.delay = 1
+        call = asyncio.ensure_future(self.agent.ainfer("prompt", self.task("task_cancel"), max_retries=3))
+        await asyncio.sleep(0.1)
+        call.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await call
+        self.assertEqual(self.model.calls, 1)
+
+    async def test_validation_retries(self):
+        results = iter(["bad", "good"])
+        self.model.generate = lambda prompt, **kwargs: next(results)
+        result = await self.agent.ainfer("prompt", self.task("task_valid"), validate_fn=lambda r: r == "good")
+        self.assertEqual(result, "good")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+# tests/test_context_builder.py
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from seclorum.agents.memory.context import ContextBuilder, estimate_tokens, summarize_turns
+from seclorum.agents.memory.manager import MemoryManager
+from seclorum.agents.memory.sqlite import SQLiteBackend
+
+
+class TestContextBuilder(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_context_")
+        self.session_id = "test_session"
+        self.manager = MemoryManager(
+            base_dir=self.base_dir,
+            backends=[{"backend": SQLiteBackend, "config": {"db_path": os.path.join(self.base_dir, "{session_id}.db")}}],
+        )
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def save_turns(self, start, count):
+        for i in range(start, start + count):
+            self.manager.save(
+                f"prompt {i} " + "detail " * 50, f"response {i} " + "result " * 50, "task", "agent", self.session_id
+            )
+
+    def test_no_history(self):
+        builder = ContextBuilder(self.manager, token_budget=512)
+        self.assertEqual(builder.build("prompt", "task", "agent", self.session_id), "")
+
+    def test_context_stays_within_budget(self):
+        builder = ContextBuilder(self.manager, token_budget=512, recent_turns=4)
+        saved = 0
+        for batch in (10, 40, 100):
+            self.save_turns(saved, batch)
+            saved += batch
+            context = builder.build("prompt 7 detail", "task", "agent", self.session_id)
+            self.assertLessEqual(estimate_tokens(context), 512 * 1.05)
+            self.assertIn("Summary of earlier conversation", context)
+            # The newest turn is always kept
+            self.assertIn(f"prompt {saved - 1} ", context)
+
+    def test_summary_is_extended_incrementally(self):
+        summarizer = mock.Mock(side_effect=summarize_turns)
+        builder = ContextBuilder(self.manager, token_budget=4096, recent_turns=2, summarizer=summarizer)
+        self.save_turns(0, 5)
+        builder.build("prompt", "task", "agent", self.session_id)
+        self.assertEqual(len(summarizer.call_args.args[1]), 3)
+        builder.build("prompt", "task", "agent", self.session_id)
+        self.assertEqual(summarizer.call_count, 1)
+        self.save_turns(5, 2)
+        builder.build("prompt", "task", "agent", self.session_id)
+        self.assertEqual(summarizer.call_count, 2)
+        previous, new_turns = summarizer.call_args.args
+        self.assertIn("prompt 0", previous)
+        self.assertEqual([t[0].split(" detail")[0] for t in new_turns], ["prompt 3", "prompt 4"])
+
+    def test_builds_read_only_turns_after_the_summary(self):
+        builder = ContextBuilder(self.manager, token_budget=1024, recent_turns=3, history_turns=10)
+        self.save_turns(0, 50)
+        with mock.patch.object(self.manager, "load_history", wraps=self.manager.load_history) as load_history:
+            builder.build("prompt", "task", "agent", self.session_id)
+            self.assertEqual(load_history.call_args.kwargs["limit"], 10)
+            self.assertIsNone(load_history.call_args.kwargs["since"])
+            self.save_turns(50, 2)
+            context = builder.build("prompt", "task", "agent", self.session_id)
+        kwargs = load_history.call_args.kwargs
+        self.assertEqual(kwargs["limit"], 10)
+        self.assertIsNotNone(kwargs["since"])
+        # Only the two new turns plus the recent window are read, not the 52-turn history
+        window = self.manager.load_history("task", "agent", self.session_id, limit=10, since=kwargs["since"])
+        self.assertEqual([t[0].split(" detail")[0] for t in window], [f"prompt {i}" for i in range(47, 52)])
+        self.assertIn("prompt 51 ", context)
+        self.assertIn("prompt 48 ", context)
+
+    def test_summary_survives_response_cache_eviction(self):
+        builder = ContextBuilder(self.manager, token_budget=4096, recent_turns=2, similar_turns=0, history_turns=5)
+        self.save_turns(0, 5)
+        builder.build("prompt", "task", "agent", self.session_id)
+        # Empty both cache tiers, as TTL expiry or LRU eviction would
+        memory = self.manager.get_memory(self.session_id)
+        memory.prompt_cache.invalidate()
+        with memory.primary._writer() as conn:
+            conn.execute("DELETE FROM cache")
+            conn.commit()
+        self.save_turns(5, 5)
+        context = builder.build("prompt", "task", "agent", self.session_id)
+        self.assertIn("prompt 0 ", context)
+        self.assertIn("prompt 7 ", context)
+
+    def test_similar_older_turns_are_included(self):
+        builder = ContextBuilder(self.manager, token_budget=4096, recent_turns=2)
+        self.manager.save("configure the websocket server", "use port 8080", "task", "agent", self.session_id)
+        self.save_turns(0, 4)
+        context = builder.build("websocket server port", "task", "agent", self.session_id)
+        self.assertIn("Relevant earlier exchanges:\nPrompt: configure the websocket server", context)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+# tests/test_embedding.py
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+import numpy as np
+from seclorum.agents.memory.embedding import EmbeddingCache, EmbeddingService
+
+
+class FakeSentenceTransformer:
+    instances = 0
+
+    def __init__(self, model_name):
+        FakeSentenceTransformer.instances += 1
+        self.encode_calls = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.encode_calls.append((list(texts), batch_size))
+        return np.array([[len(t), 1.0] for t in texts])
+
+
+class TestEmbeddingService(unittest.TestCase):
+    def setUp(self):
+        EmbeddingService.reset()
+        FakeSentenceTransformer.instances = 0
+        fake_module = types.ModuleType("sentence_transformers")
+        fake_module.SentenceTransformer = FakeSentenceTransformer
+        patcher = mock.patch.dict(sys.modules, {"sentence_transformers": fake_module})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(EmbeddingService.reset)
+
+    def test_model_is_loaded_once_per_process(self):
+        first = EmbeddingService.get("mini-model")
+        second = EmbeddingService.get("mini-model")
+        self.assertIs(first, second)
+        first.embed("a")
+        second.embed_many(["b", "cc"])
+        self.assertEqual(FakeSentenceTransformer.instances, 1)
+
+    def test_embed_many_encodes_in_one_vectorized_call(self):
+        service = EmbeddingService.get("mini-model", batch_size=8)
+        embeddings = service.embed_many(["a", "bb", "ccc"])
+        self.assertEqual(embeddings.shape, (3, 2))
+        self.assertEqual(embeddings.dtype, np.float32)
+        self.assertEqual(service._model.encode_calls, [(["a", "bb", "ccc"], 8)])
+        np.testing.assert_array_equal(service.embed("bb"), embeddings[1])
+
+    def test_ollama_requests_are_batched(self):
+        client = mock.Mock()
+        client.embed.side_effect = lambda model, input, keep_alive: {"embeddings": [[1.0, 2.0]] * len(input)}
+        with mock.patch("ollama.Client", return_value=client):
+            service = EmbeddingService.get("nomic-embed-text:latest", batch_size=2)
+            embeddings = service.embed_many(["a", "b", "c"])
+        self.assertEqual(embeddings.shape, (3, 2))
+        self.assertEqual([c.kwargs["input"] for c in client.embed.call_args_list], [["a", "b"], ["c"]])
+
+    def test_cache_skips_repeated_texts(self):
+        base_dir = tempfile.mkdtemp(prefix="test_embedding_")
+        self.addCleanup(shutil.rmtree, base_dir, True)
+        cache = EmbeddingCache(os.path.join(base_dir, "embeddings.db"))
+        self.addCleanup(cache.close)
+        service = EmbeddingService.get("mini-model")
+        first = service.embed_many(["a", "bb", "a"], cache=cache)
+        second = service.embed_many(["bb", "ccc"], cache=cache)
+        np.testing.assert_array_equal(first[0], first[2])
+        np.testing.assert_array_equal(first[1], second[0])
+        self.assertEqual([c[0] for c in service._model.encode_calls], [["a", "bb"], ["ccc"]])
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 3, "size": 3})
+
+    def test_cache_is_keyed_by_model_and_persists(self):
+        base_dir = tempfile.mkdtemp(prefix="test_embedding_")
+        self.addCleanup(shutil.rmtree, base_dir, True)
+        db_path = os.path.join(base_dir, "embeddings.db")
+        cache = EmbeddingCache(db_path, dtype="float16")
+        EmbeddingService.get("mini-model").embed_many(["text"], cache=cache)
+        cache.close()
+        reopened = EmbeddingCache(db_path)
+        self.addCleanup(reopened.close)
+        content_hash = EmbeddingCache.content_hash("text")
+        cached = reopened.get_many("mini-model", [content_hash])[content_hash]
+        self.assertEqual(cached.dtype, np.float32)
+        np.testing.assert_allclose(cached, [4.0, 1.0])
+        self.assertEqual(reopened.get_many("other-model", [content_hash]), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
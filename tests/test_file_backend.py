@@ -0,0 +1,109 @@
+# tests/test_file_backend.py
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from seclorum.agents.memory.file import FileBackend
+
+
+class TestFileBackend(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_file_backend_")
+        self.log_path = os.path.join(self.base_dir, "conversation_test.jsonl")
+        self.session_id = "test_session"
+        self.backend = FileBackend(self.log_path)
+        self.backend.initialize()
+
+    def tearDown(self):
+        self.backend.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def reopen(self):
+        self.backend.close()
+        self.backend = FileBackend(self.log_path)
+        self.backend.initialize()
+
+    def test_writes_are_appends(self):
+        self.backend.save_conversation(self.session_id, "task", "agent", "p1", "r1")
+        size = os.path.getsize(self.log_path)
+        with mock.patch("json.load") as json_load:
+            self.backend.save_conversation(self.session_id, "task", "agent", "p2", "r2")
+            json_load.assert_not_called()
+        with open(self.log_path, "rb") as f:
+            f.seek(size)
+            self.assertEqual(json.loads(f.readline())["prompt"], "p2")
+
+    def test_history_and_tasks_survive_reopen(self):
+        for i in range(5):
+            self.backend.save_conversation(self.session_id, "task", "agent", f"p{i}", f"r{i}")
+        self.backend.save_conversation(self.session_id, "task", "other", "other", "other")
+        self.backend.save_task(self.session_id, "task", {"description": "v1"})
+        self.backend.save_task(self.session_id, "task", {"description": "v2"})
+        self.reopen()
+        history = self.backend.load_conversation_history(self.session_id, "task", "agent")
+        self.assertEqual([h[0] for h in history], [f"p{i}" for i in range(5)])
+        self.assertEqual(
+            [h[0] for h in self.backend.load_conversation_window(self.session_id, "task", "agent", limit=2)],
+            ["p3", "p4"]
+        )
+        self.assertEqual(self.backend.load_task(self.session_id, "task"), {"description": "v2"})
+
+    def test_rebuilds_missing_index_and_drops_torn_record(self):
+        self.backend.save_conversation(self.session_id, "task", "agent", "p1", "r1")
+        self.backend.close()
+        os.remove(self.backend.index_path)
+        with open(self.log_path, "a") as f:
+            f.write('{"type": "conversation", "session_id"')
+        self.backend = FileBackend(self.log_path)
+        self.backend.initialize()
+        self.backend.save_conversation(self.session_id, "task", "agent", "p2", "r2")
+        history = self.backend.load_conversation_history(self.session_id, "task", "agent")
+        self.assertEqual([h[0] for h in history], ["p1", "p2"])
+
+    def test_batch_writes_are_one_append(self):
+        with mock.patch.object(self.backend, "_append", wraps=self.backend._append) as append:
+            self.backend.save_conversations_many(self.session_id, [("task", "agent", f"p{i}", f"r{i}") for i in range(3)])
+            self.backend.save_tasks_many(self.session_id, [("a", {"n": 1}), ("b", {"n": 2})])
+            append.assert_not_called()
+        self.reopen()
+        self.assertEqual([h[0] for h in self.backend.load_conversation_history(self.session_id, "task", "agent")],
+                         ["p0", "p1", "p2"])
+        self.assertEqual(self.backend.load_tasks_many(self.session_id, ["a", "b", "c"]), {"a": {"n": 1}, "b": {"n": 2}})
+
+    def test_compact_drops_superseded_tasks(self):
+        for i in range(3):
+            self.backend.save_task(self.session_id, "task", {"version": i})
+        self.backend.save_conversation(self.session_id, "task", "agent", "p", "r")
+        self.backend.compact()
+        with open(self.log_path) as f:
+            self.assertEqual(len(f.readlines()), 2)
+        self.assertEqual(self.backend.load_task(self.session_id, "task"), {"version": 2})
+        self.assertEqual(len(self.backend.load_conversation_history(self.session_id, "task", "agent")), 1)
+
+    def test_migrates_legacy_json_log(self):
+        self.backend.close()
+        os.remove(self.log_path)
+        os.remove(self.backend.index_path)
+        legacy_path = os.path.join(self.base_dir, "conversation_test.json")
+        with open(legacy_path, "w") as f:
+            json.dump({
+                "conversations": [{
+                    "session_id": self.session_id, "task_id": "task", "agent_name": "agent",
+                    "prompt": "old", "response": "old response", "timestamp": "2025-01-01T00:00:00Z"
+                }],
+                "tasks": [{
+                    "session_id": self.session_id, "task_id": "task",
+                    "task_data": {"description": "old task"}, "timestamp": "2025-01-01T00:00:00Z"
+                }]
+            }, f, indent=2)
+        self.backend = FileBackend(self.log_path)
+        self.backend.initialize()
+        self.assertTrue(os.path.exists(f"{legacy_path}.migrated"))
+        self.assertEqual(self.backend.load_conversation_history(self.session_id, "task", "agent")[0][0], "old")
+        self.assertEqual(self.backend.load_task(self.session_id, "task"), {"description": "old task"})
+
+
+if __name__ == "__main__":
+    unittest.main()
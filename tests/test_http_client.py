@@ -0,0 +1,264 @@
+# tests/test_http_client.py
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import unittest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from seclorum.agents.agent import Agent
+from seclorum.agents.http_client import EndpointUnavailableError, HttpClient
+from seclorum.agents.rate_limit import RateLimiter, RateLimitTimeout
+from seclorum.agents.remote import Remote
+from seclorum.agents.settings import Settings
+from seclorum.models.managers.google import GoogleModelManager
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path))
+        self.reply(self.server.probe_status, {"models": []})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append(("POST", self.path))
+        time.sleep(self.server.post_delay)
+        status = self.server.post_statuses.pop(0) if self.server.post_statuses else 200
+        if "streamGenerateContent" in self.path and status == 200:
+            events = [{"candidates": [{"content": {"parts": [{"text": text}]}}]} for text in ["stub ", "streamed ", "reply"]]
+            self.reply_bytes(200, "".join(f"data: {json.dumps(event)}\r\n\r\n" for event in events).encode(), "text/event-stream")
+            return
+        self.reply(status, {"candidates": [{"content": {"parts": [{"text": " stub reply "}]}}]})
+
+    def reply(self, status, body):
+        self.reply_bytes(status, json.dumps(body).encode(), "application/json")
+
+    def reply_bytes(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RemoteOnlyAgent(Agent):
+    def __init__(self):
+        # Only what remote_infer touches; Agent.__init__ would open memory and a model
+        self.name = "remote_only"
+        self.logger = logging.getLogger("Agent_remote_only")
+        self.logs = []
+
+    def get_retry_prompt(self, original_prompt, previous_result, error, validation_passed):
+        return original_prompt
+
+    def get_schema(self):
+        return {}
+
+    def get_prompt(self, task):
+        return task.description
+
+
+class TestHttpClient(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.connections = 0
+        self.server.requests = []
+        self.server.probe_status = 200
+        self.server.post_statuses = []
+        self.server.post_delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1beta/models"
+        endpoint = {
+            **Settings.get_endpoint_config("google_ai_studio"),
+            "url": f"{self.base_url}/gemini-1.5-flash:generateContent",
+            "models_url": self.base_url,
+            "requests_per_minute": 60_000,  # Rate limiting has its own tests
+        }
+        patches = [
+            mock.patch.dict(Settings.Agent.RemoteInfer.REMOTE_ENDPOINTS, {"google_ai_studio": endpoint}),
+            mock.patch.dict(os.environ, {"GOOGLE_AI_STUDIO_API_KEY": "test-key-0123456789"}),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        HttpClient.reset()
+        RateLimiter.reset()
+
+    def tearDown(self):
+        HttpClient.reset()
+        RateLimiter.reset()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_requests_reuse_one_connection(self):
+        client = HttpClient.get("google_ai_studio")
+        self.assertIs(HttpClient.get("google_ai_studio"), client)
+        for _ in range(5):
+            self.assertEqual(client.post(f"{self.base_url}/m:generateContent", json={}).status_code, 200)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_health_probe_is_cached_until_ttl_or_failure(self):
+        client = HttpClient("stub", health_ttl=60)
+        for _ in range(3):
+            client.ensure_healthy(self.base_url)
+        self.assertEqual(self.server.requests, [("GET", "/v1beta/models")])
+        client.mark_unhealthy()
+        self.server.probe_status = 503
+        with self.assertRaises(EndpointUnavailableError):
+            client.ensure_healthy(self.base_url)
+        with self.assertRaises(EndpointUnavailableError):
+            client.ensure_healthy(self.base_url)
+        self.assertEqual(len(self.server.requests), 3)
+        client.close()
+
+    def test_only_successful_responses_mark_the_endpoint_healthy(self):
+        client = HttpClient("stub", health_ttl=60)
+        self.server.post_statuses = [401, 404]
+        for _ in range(2):
+            client.post(f"{self.base_url}/m:generateContent", json={})
+        client.ensure_healthy(self.base_url)
+        self.assertEqual(self.server.requests[-1], ("GET", "/v1beta/models"))
+        client.mark_unhealthy()
+        client.post(f"{self.base_url}/m:generateContent", json={})
+        client.ensure_healthy(self.base_url)
+        self.assertEqual(self.server.requests[-1][0], "POST")
+        client.close()
+
+    def test_agent_remote_infer_probes_once_and_retries_429_on_the_pool(self):
+        agent = RemoteOnlyAgent()
+        with mock.patch("seclorum.agents.agent.time.sleep"):
+            self.assertEqual(agent.remote_infer("prompt"), "stub reply")
+            self.server.post_statuses = [429]
+            self.assertEqual(agent.remote_infer("prompt"), "stub reply")
+        methods = [method for method, _ in self.server.requests]
+        self.assertEqual(methods, ["GET", "POST", "POST", "POST"])
+        self.assertEqual(self.server.connections, 1)
+
+    def test_quota_wait_past_the_infer_timeout_fails_without_reserving(self):
+        agent = RemoteOnlyAgent()
+        with mock.patch.dict(Settings.Agent.RemoteInfer.REMOTE_ENDPOINTS["google_ai_studio"], {
+            "requests_per_minute": 2, "burst_requests": 1,
+        }):
+            RateLimiter.reset()
+            self.assertEqual(agent.remote_infer("prompt"), "stub reply")
+            # The next slot is 30s away, past the 15s timeout: fail now instead of queueing to be killed
+            started = time.monotonic()
+            with self.assertRaises(RateLimitTimeout):
+                agent.remote_infer("prompt")
+            self.assertLess(time.monotonic() - started, 1)
+            self.assertAlmostEqual(RateLimiter.get("google_ai_studio").delay(), 30, delta=1)
+
+    def test_remote_mixin_and_model_manager_share_the_pool(self):
+        remote = Remote()
+        with mock.patch.dict(Remote.REMOTE_ENDPOINTS, {"google_ai_studio": {
+            **Remote.REMOTE_ENDPOINTS["google_ai_studio"], "url": f"{self.base_url}/gemini-1.5-flash:generateContent",
+        }}):
+            self.assertEqual(remote.remote_infer("prompt"), "stub reply")
+        self.assertEqual(GoogleModelManager().generate("prompt"), "stub reply")
+        path = "/v1beta/models/gemini-1.5-flash:generateContent?key=test-key-0123456789"
+        self.assertEqual(self.server.requests, [("POST", path)] * 2)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_streaming_yields_events_as_chunks(self):
+        self.assertEqual(list(GoogleModelManager().generate_stream("prompt")), ["stub ", "streamed ", "reply"])
+        agent = RemoteOnlyAgent()
+        with mock.patch.dict(Settings.Agent.RemoteInfer.REMOTE_ENDPOINTS["google_ai_studio"], {
+            "stream_url": f"{self.base_url}/gemini-1.5-flash:streamGenerateContent",
+        }):
+            self.assertEqual(list(agent.remote_infer_stream("prompt")), ["stub ", "streamed ", "reply"])
+            self.server.post_statuses = [429]
+            with self.assertRaises(requests.HTTPError):
+                next(agent.remote_infer_stream("prompt"))
+        paths = [path for method, path in self.server.requests if method == "POST"]
+        self.assertTrue(all(":streamGenerateContent?alt=sse&key=" in path for path in paths))
+        # The stream was read to the end, so its connection went back to the pool
+        self.assertEqual(self.server.connections, 1)
+
+
+class TestAsyncClientLifetime(unittest.TestCase):
+    def setUp(self):
+        self.client = HttpClient("stub")
+
+    async def loop_client(self):
+        return self.client.async_client()
+
+    def test_loop_shutdown_closes_its_client(self):
+        async_client = asyncio.run(self.loop_client())
+        self.assertTrue(async_client.is_closed)
+        self.assertEqual(len(self.client._async_clients), 0)
+
+    def test_close_closes_clients_on_their_own_loops(self):
+        running = asyncio.new_event_loop()
+        thread = threading.Thread(target=running.run_forever, daemon=True)
+        thread.start()
+        idle = asyncio.new_event_loop()
+        try:
+            clients = [
+                asyncio.run_coroutine_threadsafe(self.loop_client(), running).result(5),
+                idle.run_until_complete(self.loop_client()),
+            ]
+            self.assertEqual(len(self.client._async_clients), 2)
+            self.client.close()
+            self.assertTrue(all(c.is_closed for c in clients))
+            self.assertEqual(len(self.client._async_clients), 0)
+        finally:
+            running.call_soon_threadsafe(running.stop)
+            thread.join(5)
+            for loop in (running, idle):
+                loop.close()
+
+
+class TestAsyncHttpClient(unittest.IsolatedAsyncioTestCase):
+    setUp = TestHttpClient.setUp
+    tearDown = TestHttpClient.tearDown
+
+    async def test_async_paths_reuse_the_loop_client_and_probe_once(self):
+        agent = RemoteOnlyAgent()
+        self.server.post_statuses = [429]
+        with mock.patch("seclorum.agents.agent.asyncio.sleep") as sleep:
+            self.assertEqual(await agent.aremote_infer("prompt"), "stub reply")
+        sleep.assert_awaited_once()
+        self.assertEqual(await GoogleModelManager().agenerate("prompt"), "stub reply")
+        methods = [method for method, _ in self.server.requests]
+        self.assertEqual(methods.count("GET"), 1)
+        self.assertEqual(methods.count("POST"), 3)
+        client = HttpClient.get("google_ai_studio")
+        self.assertIs(client.async_client(), client.async_client())
+        await client.aclose()
+
+    async def test_async_quota_wait_past_the_infer_timeout_fails_without_reserving(self):
+        agent = RemoteOnlyAgent()
+        with mock.patch.dict(Settings.Agent.RemoteInfer.REMOTE_ENDPOINTS["google_ai_studio"], {
+            "requests_per_minute": 2, "burst_requests": 1,
+        }):
+            RateLimiter.reset()
+            self.assertEqual(await agent.aremote_infer("prompt"), "stub reply")
+            with self.assertRaises(RateLimitTimeout):
+                await agent.aremote_infer("prompt")
+            self.assertAlmostEqual(RateLimiter.get("google_ai_studio").delay(), 30, delta=1)
+        await HttpClient.get("google_ai_studio").aclose()
+
+    async def test_cancellation_aborts_the_request(self):
+        self.server.post_delay = 5
+        call = asyncio.ensure_future(GoogleModelManager().agenerate("prompt"))
+        await asyncio.sleep(0.2)
+        call.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await asyncio.wait_for(call, 1)
+        await HttpClient.get("google_ai_studio").aclose()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -59,7 +59,7 @@ class TestMemory(unittest.TestCase):
                 },
                 {
                     "backend": FileBackend,
-                    "config": {"log_path": os.path.join(self.base_dir, "conversation_{session_id}.json")}
+                    "config": {"log_path": os.path.join(self.base_dir, "conversation_{session_id}.jsonl")}
                 },
                 {
                     "backend": VectorBackend,
@@ -71,8 +71,8 @@ class TestMemory(unittest.TestCase):
             ],
             embedding_model="nomic-embed-text:latest"
         )
-        self.log_file1 = os.path.join(self.base_dir, f"conversation_{self.session_id1}.json")
-        self.log_file2 = os.path.join(self.base_dir, f"conversation_{self.session_id2}.json")
+        self.log_file1 = os.path.join(self.base_dir, f"conversation_{self.session_id1}.jsonl")
+        self.log_file2 = os.path.join(self.base_dir, f"conversation_{self.session_id2}.jsonl")
         self.db_file1 = os.path.join(self.base_dir, f"{self.session_id1}.db")
         self.db_file2 = os.path.join(self.base_dir, f"{self.session_id2}.db")
         self.vector_db_path1 = os.path.join(self.base_dir, f"vector_db_{self.session_id1}")
@@ -118,10 +118,11 @@ class TestMemory(unittest.TestCase):
             # Check log file
             self.assertTrue(os.path.exists(self.log_file1))
             with open(self.log_file1, 'r') as f:
-                log_data = json.load(f)
-            self.assertGreaterEqual(len(log_data["conversations"]), 1)
+                records = [json.loads(line) for line in f]
+            conversations = [r for r in records if r["type"] == "conversation"]
+            self.assertGreaterEqual(len(conversations), 1)
             conv = next(
-                c for c in log_data["conversations"]
+                c for c in conversations
                 if c["session_id"] == self.session_id1 and c["task_id"] == self.task_id
             )
             self.assertEqual(conv["prompt"], prompt)
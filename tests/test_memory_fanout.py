@@ -0,0 +1,204 @@
+# tests/test_memory_fanout.py
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from typing import Dict, List, Optional, Tuple
+from seclorum.agents.memory.file import FileBackend
+from seclorum.agents.memory.memory import Memory
+from seclorum.agents.memory.protocol import MemoryBackend
+from seclorum.agents.memory.sqlite import SQLiteBackend
+from seclorum.models import Task
+
+
+class SlowBackend(MemoryBackend):
+    """In-memory backend whose writes block until `release` is set."""
+
+    release = threading.Event()
+
+    def __init__(self, delay: float = 0.0, **kwargs):
+        self.delay = delay
+        self.conversations: List[Tuple[str, str, str]] = []
+        self.threads = set()
+
+    def initialize(self, **kwargs) -> None:
+        pass
+
+    def save_conversation(self, session_id, task_id, agent_name, prompt, response) -> None:
+        self.release.wait(5)
+        self.threads.add(threading.current_thread().name)
+        self.conversations.append((prompt, response, "ts"))
+
+    def load_conversation_history(self, session_id, task_id, agent_name) -> List[Tuple[str, str, str]]:
+        time.sleep(self.delay)
+        return list(self.conversations)
+
+    def load_cached_response(self, session_id, prompt_hash) -> Optional[str]:
+        return None
+
+    def cache_response(self, session_id, prompt_hash, response) -> None:
+        pass
+
+    def save_task(self, session_id, task_id, task_data: Dict) -> None:
+        pass
+
+    def load_task(self, session_id, task_id) -> Optional[Dict]:
+        time.sleep(self.delay)
+        return None
+
+    def find_similar(self, text, session_id, task_id, n_results) -> List[Dict]:
+        return []
+
+    def stop(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class FlakyBackend(SlowBackend):
+    """Fast backend whose writes all fail, like a vector store with embeddings down."""
+
+    def save_conversation(self, session_id, task_id, agent_name, prompt, response) -> None:
+        raise RuntimeError("embedding service unavailable")
+
+    def save_task(self, session_id, task_id, task_data: Dict) -> None:
+        raise RuntimeError("embedding service unavailable")
+
+
+class FailingSecondWriteFileBackend(FileBackend):
+    """File backend whose second save_task fails, leaving it one version behind."""
+
+    def __init__(self, log_path: str):
+        super().__init__(log_path)
+        self.task_writes = 0
+
+    def save_task(self, session_id, task_id, task_data: Dict) -> None:
+        self.task_writes += 1
+        if self.task_writes == 2:
+            raise RuntimeError("disk full")
+        super().save_task(session_id, task_id, task_data)
+
+
+class TestMemoryFanOut(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_fanout_")
+        self.session_id = "test_session"
+        SlowBackend.release.clear()
+
+    def tearDown(self):
+        SlowBackend.release.set()
+        if getattr(self, "memory", None):
+            self.memory.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def make_memory(self, **kwargs):
+        self.memory = Memory(
+            session_id=self.session_id,
+            backends=[
+                {"backend": SQLiteBackend, "config": {"db_path": os.path.join(self.base_dir, "memory.db")}},
+                {"backend": SlowBackend, "config": {}},
+            ],
+            **kwargs,
+        )
+        return self.memory
+
+    def test_secondary_writes_do_not_block_caller(self):
+        memory = self.make_memory(fan_out=True)
+        slow = memory.backends[1]
+        memory.save("prompt 1", "response 1", "task", "agent")
+        memory.save("prompt 2", "response 2", "task", "agent")
+        # The primary is written synchronously and serves reads while the secondary lags
+        self.assertEqual([h[0] for h in memory.load_history("task", "agent")], ["prompt 1", "prompt 2"])
+        self.assertEqual(slow.conversations, [])
+        SlowBackend.release.set()
+        memory.flush(timeout=5)
+        self.assertEqual([c[0] for c in slow.conversations], ["prompt 1", "prompt 2"])
+        self.assertEqual(len(slow.threads), 1)
+        self.assertNotIn(threading.current_thread().name, slow.threads)
+
+    def test_wait_for_all(self):
+        memory = self.make_memory(fan_out=True, wait_for_all=True)
+        SlowBackend.release.set()
+        memory.save("prompt", "response", "task", "agent")
+        self.assertEqual(len(memory.backends[1].conversations), 1)
+
+    def test_fan_out_reads_prefer_fastest_backend(self):
+        SlowBackend.release.set()
+        memory = self.make_memory(fan_out=True)
+        memory.backends[1].delay = 0.05
+        memory.save_task(Task(task_id="task", description="describe", parameters={}), wait=True)
+        for _ in range(3):
+            self.assertIsNotNone(memory.load_task("task"))
+        latencies = memory.read_latencies()
+        # Each backend is probed once, after which the faster one serves reads
+        self.assertEqual(set(latencies), {"SQLiteBackend", "SlowBackend"})
+        self.assertLess(latencies["SQLiteBackend"], latencies["SlowBackend"])
+        self.assertIs(memory._readers()[0], memory.backends[0])
+
+    def test_secondary_with_failed_writes_never_hides_primary_data(self):
+        for fan_out in (False, True):
+            with self.subTest(fan_out=fan_out):
+                memory = Memory(
+                    session_id=f"{self.session_id}_{fan_out}",
+                    backends=[
+                        {"backend": FlakyBackend, "config": {}},
+                        {"backend": SQLiteBackend, "config": {"db_path": os.path.join(self.base_dir, f"{fan_out}.db")},
+                         "primary": True},
+                    ],
+                    fan_out=fan_out,
+                    wait_for_all=True,
+                )
+                try:
+                    memory.save("prompt", "response", "task", "agent")
+                    memory.save_task(Task(task_id="task", description="describe", parameters={}))
+                    for _ in range(4):
+                        self.assertIsNotNone(memory.load_task("task"))
+                        self.assertEqual(len(memory.load_history("task", "agent")), 1)
+                        self.assertEqual(list(memory.load_tasks_many(["task"])), ["task"])
+                finally:
+                    memory.close()
+
+    def test_secondary_that_missed_an_update_stops_serving_reads(self):
+        self.memory = Memory(
+            session_id=self.session_id,
+            backends=[
+                {"backend": SQLiteBackend, "config": {"db_path": os.path.join(self.base_dir, "primary.db")}},
+                {"backend": FailingSecondWriteFileBackend, "config": {"log_path": os.path.join(self.base_dir, "log.jsonl")}},
+            ],
+            fan_out=True,
+            wait_for_all=True,
+        )
+        secondary = self.memory.backends[1]
+        save = lambda version: self.memory.save_task(Task(task_id="t", description=version, parameters={}))
+        save("v1")
+        save("v2")
+        self.assertEqual(secondary.load_task(self.session_id, "t")["description"], "v1")
+        for _ in range(4):
+            self.assertEqual(self.memory.load_task("t").description, "v2")
+            self.assertEqual(self.memory.load_tasks_many(["t"])["t"].description, "v2")
+        self.assertNotIn(secondary, self.memory._readers())
+        # Writing the task again brings the secondary back up to date
+        save("v3")
+        self.assertIn(secondary, self.memory._readers())
+        self.assertEqual(self.memory.load_task("t").description, "v3")
+
+    def test_explicit_primary(self):
+        SlowBackend.release.set()
+        self.memory = Memory(
+            session_id=self.session_id,
+            backends=[
+                {"backend": SQLiteBackend, "config": {"db_path": os.path.join(self.base_dir, "memory.db")}},
+                {"backend": SlowBackend, "config": {}, "primary": True},
+            ],
+            fan_out=True,
+        )
+        self.assertIs(self.memory.primary, self.memory.backends[1])
+        self.memory.save("prompt", "response", "task", "agent")
+        self.assertEqual(len(self.memory.backends[1].conversations), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+# tests/test_memory_manager.py
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import numpy as np
+from seclorum.agents.memory.manager import MemoryManager, acquire_memory_manager, release_memory_manager
+from seclorum.agents.memory.sqlite import SQLiteBackend
+from seclorum.agents.memory.vector import VectorBackend
+
+
+class TestMemoryManagerRegistry(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_manager_")
+        self.kwargs = {
+            "base_dir": self.base_dir,
+            "backends": [{
+                "backend": SQLiteBackend,
+                "config": {"db_path": os.path.join(self.base_dir, "{session_id}.db"), "preserve_db": True},
+            }],
+        }
+        patcher = mock.patch("seclorum.agents.memory.manager.ollama")
+        self.ollama = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_construction_does_not_touch_ollama(self):
+        manager = MemoryManager(base_dir=self.base_dir)
+        self.ollama.list.assert_not_called()
+        self.assertFalse(manager._initialized)
+
+    def test_ollama_is_initialized_once_on_first_use(self):
+        manager = MemoryManager(
+            base_dir=self.base_dir,
+            backends=self.kwargs["backends"] + [{
+                "backend": VectorBackend,
+                "config": {"db_path": os.path.join(self.base_dir, "vector_{session_id}"),
+                           "embedding_model": "nomic-embed-text:latest"},
+            }],
+        )
+        try:
+            manager.get_memory("session_1")
+            manager.get_memory("session_2")
+            self.ollama.list.assert_called_once()
+        finally:
+            manager.close()
+
+    def test_same_config_shares_manager_and_sessions(self):
+        first = acquire_memory_manager(**self.kwargs)
+        second = acquire_memory_manager(**self.kwargs)
+        try:
+            self.assertIs(first, second)
+            other = acquire_memory_manager(base_dir=os.path.join(self.base_dir, "other"))
+            self.assertIsNot(first, other)
+            release_memory_manager(other)
+            self.assertIs(first.get_memory("session"), second.get_memory("session"))
+        finally:
+            release_memory_manager(second)
+        # Earlier releases keep sessions open for the remaining holders
+        first.save("prompt", "response", "task", "agent", "session")
+        self.assertEqual(len(first.load_history("task", "agent", "session")), 1)
+        release_memory_manager(first)
+        fresh = acquire_memory_manager(**self.kwargs)
+        self.assertIsNot(fresh, first)
+        release_memory_manager(fresh)
+        first.close()
+
+    def test_last_release_closes_sessions(self):
+        manager = acquire_memory_manager(**self.kwargs)
+        memory = manager.get_memory("session")
+        with mock.patch.object(memory, "close", wraps=memory.close) as close:
+            release_memory_manager(manager)
+        close.assert_called_once()
+        self.assertEqual(manager.sessions, {})
+
+    def test_concurrent_get_memory_creates_one_session(self):
+        manager = MemoryManager(**self.kwargs)
+        memories = []
+        threads = [threading.Thread(target=lambda: memories.append(manager.get_memory("session"))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        try:
+            self.assertEqual(len({id(m) for m in memories}), 1)
+        finally:
+            manager.close()
+
+    def test_reconcile_does_not_block_other_sessions(self):
+        manager = MemoryManager(**self.kwargs)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_reconcile():
+            started.set()
+            release.wait(5)
+            return 0
+
+        try:
+            with mock.patch("seclorum.agents.memory.manager.Memory.reconcile_indexes", side_effect=slow_reconcile):
+                first = threading.Thread(target=manager.get_memory, args=("session_1",))
+                first.start()
+                self.assertTrue(started.wait(5))
+                # Only the first session is reconciling; the second is created and returned meanwhile
+                with mock.patch("seclorum.agents.memory.manager.Memory.reconcile_indexes", return_value=0):
+                    second = threading.Thread(target=manager.get_memory, args=("session_2",))
+                    second.start()
+                    second.join(1)
+                    self.assertFalse(second.is_alive())
+                self.assertIn("session_1", manager.sessions)
+                release.set()
+                first.join()
+        finally:
+            release.set()
+            manager.close()
+
+    def test_new_session_backfills_persistent_vector_index(self):
+        embed = lambda texts: np.ones((len(texts), 3), dtype=np.float32)
+        backends = self.kwargs["backends"] + [{
+            "backend": VectorBackend,
+            "config": {"db_path": os.path.join(self.base_dir, "vector_{session_id}")},
+        }]
+        with mock.patch.object(VectorBackend, "embed_many", side_effect=embed) as embed_many:
+            manager = MemoryManager(base_dir=self.base_dir, backends=backends)
+            manager.save("prompt", "response", "task", "agent", "session")
+            manager.close()
+            # Simulate an index that lost its documents, e.g. it was enabled after the history was written
+            manager = MemoryManager(base_dir=self.base_dir, backends=self.kwargs["backends"])
+            manager.save("later prompt", "response", "task", "agent", "session")
+            manager.close()
+            embed_many.reset_mock()
+            manager = MemoryManager(base_dir=self.base_dir, backends=backends)
+            try:
+                vector = manager.get_memory("session").backends[1]
+                self.assertEqual(vector.conversation_collection.count(), 2)
+                self.assertEqual([len(c.args[0]) for c in embed_many.call_args_list], [1])
+            finally:
+                manager.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+# tests/test_migrate.py
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from seclorum.agents.memory.file import FileBackend
+from seclorum.agents.memory.migrate import main, migrate, save_checkpoint
+from seclorum.agents.memory.sqlite import SQLiteBackend
+from seclorum.agents.memory.vector import VectorBackend
+
+
+def fake_embed_many(texts):
+    return np.array([[float(len(t)), 1.0, 0.5] for t in texts], dtype=np.float32)
+
+
+class TestMigrate(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_migrate_")
+        self.backends = []
+        self.source = self.make_backend(SQLiteBackend, os.path.join(self.base_dir, "source.db"))
+        for i in range(25):
+            session_id = "session_a" if i % 5 else "session_b"
+            self.source.save_conversation(session_id, "task", "agent", f"prompt {i}", f"response {i}")
+        self.source.save_task("session_a", "task", {"task_id": "task", "status": "planned"})
+        self.source.save_task("session_a", "task", {"task_id": "task", "status": "done"})
+
+    def tearDown(self):
+        for backend in self.backends:
+            backend.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def make_backend(self, backend_class, path, **kwargs):
+        backend = backend_class(path, **kwargs)
+        backend.initialize()
+        self.backends.append(backend)
+        return backend
+
+    def test_sqlite_to_file_keeps_order_and_timestamps(self):
+        target = self.make_backend(FileBackend, os.path.join(self.base_dir, "log.jsonl"))
+        progress = []
+        self.assertEqual(migrate(self.source, target, batch_size=10, progress=progress.append), 26)
+        self.assertEqual(progress, [10, 20, 26])
+        for session_id in ("session_a", "session_b"):
+            self.assertEqual(
+                target.load_conversation_history(session_id, "task", "agent"),
+                self.source.load_conversation_history(session_id, "task", "agent"),
+            )
+        self.assertEqual(target.load_task("session_a", "task")["status"], "done")
+
+    def test_resume_from_checkpoint(self):
+        target = self.make_backend(SQLiteBackend, os.path.join(self.base_dir, "target.db"))
+        checkpoint = os.path.join(self.base_dir, "checkpoint.json")
+        calls = []
+
+        def fail_on_third_batch(records):
+            calls.append(len(records))
+            if len(calls) == 3:
+                raise RuntimeError("interrupted")
+            SQLiteBackend.import_records(target, records)
+
+        with mock.patch.object(target, "import_records", side_effect=fail_on_third_batch):
+            with self.assertRaises(RuntimeError):
+                migrate(self.source, target, batch_size=8, checkpoint_path=checkpoint)
+        self.assertEqual(migrate(self.source, target, batch_size=8, checkpoint_path=checkpoint), 26)
+        history = target.load_conversation_history("session_a", "task", "agent")
+        self.assertEqual([h[0] for h in history], [f"prompt {i}" for i in range(25) if i % 5])
+
+    def test_resume_after_crash_before_checkpoint_does_not_duplicate(self):
+        targets = [
+            self.make_backend(SQLiteBackend, os.path.join(self.base_dir, "target.db")),
+            self.make_backend(FileBackend, os.path.join(self.base_dir, "log.jsonl")),
+        ]
+        for target in targets:
+            checkpoint = os.path.join(self.base_dir, f"{type(target).__name__}.json")
+            saves = []
+
+            def crash_on_second_checkpoint(path, state):
+                saves.append(state)
+                if len(saves) == 2:
+                    raise RuntimeError("interrupted")
+                save_checkpoint(path, state)
+
+            # The second batch reaches the target, but its checkpoint does not
+            with mock.patch("seclorum.agents.memory.migrate.save_checkpoint", side_effect=crash_on_second_checkpoint):
+                with self.assertRaises(RuntimeError):
+                    migrate(self.source, target, batch_size=8, checkpoint_path=checkpoint)
+            migrate(self.source, target, batch_size=8, checkpoint_path=checkpoint)
+            records = [record for _, record in target.export_records()]
+            self.assertEqual(sum(r["type"] == "conversation" for r in records), 25, type(target).__name__)
+            self.assertEqual(sum(r["type"] == "task" for r in records), 1, type(target).__name__)
+            self.assertEqual(len(target.load_conversation_history("session_a", "task", "agent")), 20)
+            # Importing the same records again is a no-op
+            target.import_records(records)
+            target.flush()
+            self.assertEqual(len(list(target.export_records())), 26)
+
+    def test_session_filter_and_checkpoint_mismatch(self):
+        target = self.make_backend(FileBackend, os.path.join(self.base_dir, "log.jsonl"))
+        checkpoint = os.path.join(self.base_dir, "checkpoint.json")
+        self.assertEqual(migrate(self.source, target, session_id="session_b", checkpoint_path=checkpoint), 5)
+        self.assertEqual(target.load_conversation_history("session_a", "task", "agent"), [])
+        with self.assertRaises(ValueError):
+            migrate(self.source, target, session_id="session_a", checkpoint_path=checkpoint)
+
+    def test_rebuild_vector_index_from_sqlite(self):
+        with mock.patch.object(VectorBackend, "embed_many", side_effect=fake_embed_many) as embed_many:
+            target = self.make_backend(VectorBackend, os.path.join(self.base_dir, "chroma"), ingest_batch_size=16)
+            migrate(self.source, target, batch_size=100)
+            self.assertEqual(target.conversation_collection.count(), 25)
+            self.assertEqual([len(c.args[0]) for c in embed_many.call_args_list], [16, 10])
+            self.assertEqual(target.load_task("session_a", "task")["status"], "done")
+            # And back again, through the vector store's own export
+            round_trip = self.make_backend(FileBackend, os.path.join(self.base_dir, "round_trip.jsonl"))
+            self.assertEqual(migrate(target, round_trip, batch_size=7), 26)
+        self.assertEqual(len(round_trip.load_conversation_history("session_a", "task", "agent")), 20)
+
+    def test_cli(self):
+        source_path = self.source.db_path
+        self.source.flush()
+        log_path = os.path.join(self.base_dir, "cli.jsonl")
+        with mock.patch("sys.stderr"):
+            self.assertEqual(main([f"sqlite:{source_path}", f"file:{log_path}", "--batch-size", "10"]), 0)
+        target = self.make_backend(FileBackend, log_path)
+        self.assertEqual(len(target.load_conversation_history("session_b", "task", "agent")), 5)
+
+    def test_cli_keeps_sqlite_source_and_target(self):
+        source = SQLiteBackend(os.path.join(self.base_dir, "src.db"), preserve_db=True)
+        source.initialize()
+        for i in range(5):
+            source.save_conversation("session_b", "task", "agent", f"prompt {i}", f"response {i}")
+        source.close()
+        cwd = os.getcwd()
+        os.chdir(self.base_dir)
+        try:
+            # Relative paths, as in the help text
+            with mock.patch("sys.stderr"):
+                self.assertEqual(main(["sqlite:src.db", "sqlite:dst.db"]), 0)
+        finally:
+            os.chdir(cwd)
+        for name in ("src.db", "dst.db"):
+            self.assertTrue(os.path.exists(os.path.join(self.base_dir, name)), name)
+        target = self.make_backend(SQLiteBackend, os.path.join(self.base_dir, "dst.db"), preserve_db=True)
+        self.assertEqual(len(target.load_conversation_history("session_b", "task", "agent")), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+# tests/test_mmap_vector_backend.py
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+import numpy as np
+from seclorum.agents.memory.embedding import EmbeddingService
+from seclorum.agents.memory.manager import MemoryManager
+from seclorum.agents.memory.memory import Memory
+from seclorum.agents.memory.mmap_vector import MmapVectorBackend
+from seclorum.agents.memory.sqlite import SQLiteBackend
+
+
+class BagOfWordsEmbedder:
+    """Deterministic stand-in for an embedding model: hashed word counts."""
+
+    def embed_many(self, texts, cache=None):
+        vectors = np.zeros((len(texts), 32), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[i, zlib.crc32(word.encode()) % 32] += 1.0
+        return vectors
+
+
+class TestMmapVectorBackend(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_mmap_vector_")
+        self.db_path = os.path.join(self.base_dir, "index")
+        self.session_id = "test_session"
+        patcher = mock.patch.object(EmbeddingService, "get", return_value=BagOfWordsEmbedder())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backends = []
+
+    def tearDown(self):
+        for backend in self.backends:
+            backend.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def make_backend(self, **kwargs):
+        backend = MmapVectorBackend(self.db_path, **kwargs)
+        backend.initialize()
+        self.backends.append(backend)
+        return backend
+
+    def populate(self, backend):
+        backend.save_conversation(self.session_id, "task", "agent", "websocket server", "uses asyncio")
+        backend.save_conversation(self.session_id, "task", "agent", "csv parser", "uses pandas")
+        backend.save_conversation(self.session_id, "other", "agent", "websocket client", "uses asyncio")
+        backend.save_conversation("other_session", "task", "agent", "websocket server", "uses asyncio")
+
+    def test_top_k_search_filtered_by_session_and_task(self):
+        backend = self.make_backend()
+        self.populate(backend)
+        results = backend.find_similar("websocket server", self.session_id, "task", n_results=2)
+        self.assertEqual([r["prompt"] for r in results], ["websocket server", "csv parser"])
+        self.assertGreater(results[0]["score"], results[1]["score"])
+        all_tasks = backend.find_similar("websocket", self.session_id, None, n_results=2)
+        self.assertEqual({r["prompt"] for r in all_tasks}, {"websocket server", "websocket client"})
+
+    def test_vector_index_answers_before_fts(self):
+        memory = Memory(self.session_id, backends=[
+            {"backend": SQLiteBackend, "config": {"db_path": os.path.join(self.base_dir, "memory.db")}},
+            {"backend": MmapVectorBackend, "config": {"db_path": self.db_path}},
+        ])
+        try:
+            memory.save("websocket server", "uses asyncio", "task", "agent")
+            memory.save("csv parser", "uses pandas", "task", "agent")
+            with mock.patch.object(SQLiteBackend, "find_similar", wraps=memory.backends[0].find_similar) as fts:
+                results = memory.find_similar("websocket server", "task", n_results=1)
+                self.assertEqual(results[0]["prompt"], "websocket server")
+                fts.assert_not_called()
+                # Fusion still consults both
+                memory.find_similar("websocket server", "task", n_results=1, fuse=True)
+                fts.assert_called_once()
+        finally:
+            memory.close()
+
+    def test_int8_matches_float32_ranking(self):
+        exact = self.make_backend()
+        self.populate(exact)
+        self.db_path = os.path.join(self.base_dir, "index_int8")
+        quantized = self.make_backend(quantization="int8")
+        self.populate(quantized)
+        for backend in (exact, quantized):
+            results = backend.find_similar("csv pandas", self.session_id, None, n_results=3)
+            self.assertEqual(results[0]["prompt"], "csv parser")
+        # One byte per dimension per stored row
+        sizes = [os.path.getsize(os.path.join(self.db_path, d, "vectors.bin")) for d in os.listdir(self.db_path)]
+        self.assertEqual(sum(sizes), 4 * 32)
+
+    def test_reopen_and_recover_torn_append(self):
+        backend = self.make_backend()
+        self.populate(backend)
+        backend.save_task(self.session_id, "task", {"task_id": "task", "status": "planned"})
+        backend.save_task(self.session_id, "task", {"task_id": "task", "status": "done"})
+        backend.close()
+        self.backends.remove(backend)
+        partition_dir = next(
+            os.path.join(self.db_path, d) for d in os.listdir(self.db_path)
+            if os.path.getsize(os.path.join(self.db_path, d, "meta.jsonl")) > 200
+        )
+        # Simulate a crash after the vector write but before its metadata line
+        with open(os.path.join(partition_dir, "vectors.bin"), "ab") as f:
+            f.write(np.ones(32, dtype=np.float32).tobytes())
+        reopened = self.make_backend()
+        self.assertEqual(len(reopened.load_conversation_history(self.session_id, "task", "agent")), 2)
+        self.assertEqual(reopened.load_task(self.session_id, "task")["status"], "done")
+        self.assertEqual(len(reopened.find_similar("websocket", self.session_id, None, n_results=10)), 3)
+
+    def test_bulk_export_and_import_keep_timestamps(self):
+        source = self.make_backend()
+        self.populate(source)
+        source.save_task(self.session_id, "task", {"task_id": "task", "status": "done"})
+        records = [record for _, record in source.export_records()]
+        self.assertEqual(len(records), 5)
+        self.db_path = os.path.join(self.base_dir, "copy")
+        target = self.make_backend()
+        with mock.patch.object(target, "embed_many", wraps=target.embed_many) as embed:
+            target.import_records(records)
+        self.assertEqual(embed.call_count, 2)  # One batch per session, not one call per record
+        self.assertEqual(
+            target.load_conversation_history(self.session_id, "task", "agent"),
+            source.load_conversation_history(self.session_id, "task", "agent"),
+        )
+        self.assertEqual(target.load_task(self.session_id, "task")["status"], "done")
+        # Resuming from a cursor skips what was already exported
+        cursor, _ = next(iter(source.export_records(session_id=self.session_id)))
+        self.assertEqual(len(list(source.export_records(session_id=self.session_id, cursor=cursor))), 3)
+
+    def test_reopening_with_another_embedding_model_is_rejected(self):
+        backend = self.make_backend(embedding_model="mini-model")
+        self.populate(backend)
+        backend.close()
+        self.backends.remove(backend)
+        with self.assertRaises(ValueError):
+            self.make_backend(embedding_model="other-model").load_task(self.session_id, "task")
+
+    def test_memory_manager_option(self):
+        manager = MemoryManager(base_dir=self.base_dir, embedding_model="mini-model", vector_index="mmap")
+        self.assertIn(MmapVectorBackend, [b["backend"] for b in manager.backends])
+        with self.assertRaises(ValueError):
+            MemoryManager(base_dir=self.base_dir, vector_index="faiss")
+
+
+if __name__ == "__main__":
+    unittest.main()
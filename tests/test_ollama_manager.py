@@ -0,0 +1,39 @@
+# tests/test_ollama_manager.py
+import unittest
+import weakref
+from unittest import mock
+from seclorum.models.managers.ollama import OllamaModelManager
+
+
+class TestOllamaRequests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # Skip __init__, which would contact (or start) an ollama server
+        self.model = OllamaModelManager.__new__(OllamaModelManager)
+        self.model.model_name = "stub"
+        self.model.logger = mock.Mock()
+        self.model.client = mock.Mock()
+        self.model.client.generate.side_effect = lambda stream=False, **kwargs: (
+            iter([{"response": "a"}, {"response": "b"}]) if stream else {"response": " ab "}
+        )
+        self.model._async_clients = weakref.WeakKeyDictionary()
+
+    async def test_all_paths_send_the_same_request_and_honour_system(self):
+        async_client = mock.Mock()
+        async_client.generate = mock.AsyncMock(return_value={"response": " ab "})
+        kwargs = {"system": "Answer in French.", "max_tokens": 64, "temperature": 0.1, "context": [1, 2]}
+        with mock.patch.object(self.model, "_async_client", return_value=async_client):
+            self.assertEqual(self.model.generate("prompt", **kwargs), "ab")
+            self.assertEqual(await self.model.agenerate("prompt", **kwargs), "ab")
+        self.assertEqual(list(self.model.generate_stream("prompt", **kwargs)), ["a", "b"])
+        sync_call, stream_call = self.model.client.generate.call_args_list
+        expected = {
+            "model": "stub", "prompt": "prompt", "system": "Answer in French.", "context": [1, 2],
+            "options": {"num_predict": 64, "temperature": 0.1, "raw": False},
+        }
+        self.assertEqual(sync_call.kwargs, expected)
+        self.assertEqual(async_client.generate.call_args.kwargs, expected)
+        self.assertEqual(stream_call.kwargs, {**expected, "stream": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+# tests/test_prompt_cache.py
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+from seclorum.agents.memory.cache import CacheKeyPolicy, PromptCache
+from seclorum.agents.memory.manager import MemoryManager
+from seclorum.agents.memory.file import FileBackend
+from seclorum.agents.memory.sqlite import SQLiteBackend
+
+
+class TestPromptCache(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_prompt_cache_")
+        self.session_id = "test_session"
+        self.sqlite = SQLiteBackend(os.path.join(self.base_dir, "cache.db"))
+        self.sqlite.initialize()
+        self.file = FileBackend(os.path.join(self.base_dir, "conversation.json"))
+        self.file.initialize()
+
+    def tearDown(self):
+        self.sqlite.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_skips_backends_without_cache_support(self):
+        cache = PromptCache(self.session_id, [self.file, self.sqlite])
+        self.assertEqual(cache.backends, [self.sqlite])
+        with mock.patch.object(FileBackend, "load_cached_response") as file_load:
+            self.assertIsNone(cache.get("missing"))
+            file_load.assert_not_called()
+
+    def test_l2_hits_are_promoted(self):
+        self.sqlite.cache_response(self.session_id, "hash", "response")
+        cache = PromptCache(self.session_id, [self.sqlite])
+        self.assertEqual(cache.get("hash"), "response")
+        with mock.patch.object(self.sqlite, "load_cached_response") as sqlite_load:
+            self.assertEqual(cache.get("hash"), "response")
+            sqlite_load.assert_not_called()
+        stats = cache.stats()
+        self.assertEqual((stats["l1_hits"], stats["l2_hits"], stats["misses"]), (1, 1, 0))
+
+    def test_put_writes_through_and_evicts_lru(self):
+        cache = PromptCache(self.session_id, [self.sqlite], max_entries=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        cache.get("a")
+        cache.put("c", "C")
+        self.assertEqual(cache.stats()["l1_size"], 2)
+        cache.invalidate()
+        # Entries evicted from L1 are still served by L2
+        self.assertEqual(cache.get("b"), "B")
+        self.assertEqual(self.sqlite.load_cached_response(self.session_id, "c"), "C")
+
+    def test_l1_ttl(self):
+        cache = PromptCache(self.session_id, [], ttl=0.01)
+        cache.put("a", "A")
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+
+
+class TestCacheKeyPolicy(unittest.TestCase):
+    def key(self, scope, prompt, task_id="task_1234", agent_name="Generator_task_1234", session_id="session_a", **kwargs):
+        return CacheKeyPolicy(scope).key(prompt, task_id, agent_name, session_id=session_id, **kwargs)
+
+    def test_normalizes_whitespace_and_volatile_values(self):
+        policy = CacheKeyPolicy("agent")
+        self.assertEqual(
+            policy.normalize("Write  main.js\n\n  at 2025-01-02T03:04:05.%fZ for 1b4e28ba-2fa1-11d2-883f-0016d3cca427"),
+            "Write main.js at <timestamp> for <uuid>",
+        )
+        self.assertEqual(self.key("agent", "a  b\n"), self.key("agent", " a b"))
+
+    def test_scope_decides_what_is_shared(self):
+        prompt = "Generate main.js for task_1234"
+        other_task = dict(task_id="task_5678", agent_name="Generator_task_5678")
+        self.assertNotEqual(self.key("agent", prompt), self.key("agent", prompt, agent_name="Tester_task_1234"))
+        self.assertEqual(self.key("task", prompt), self.key("task", prompt, agent_name="Tester_task_1234"))
+        self.assertNotEqual(self.key("task", prompt), self.key("task", prompt.replace("1234", "5678"), **other_task))
+        self.assertEqual(self.key("session", prompt), self.key("session", prompt.replace("1234", "5678"), **other_task))
+        self.assertEqual(self.key("global", prompt), self.key("global", prompt, session_id="session_b"))
+        self.assertFalse(CacheKeyPolicy("session").shared)
+        self.assertTrue(CacheKeyPolicy("global").shared)
+        with self.assertRaises(ValueError):
+            CacheKeyPolicy("everyone")
+
+    def test_deciding_inputs_are_part_of_the_key(self):
+        base = dict(model="ollama:llama3.2", temperature=0.7, schema={"type": "string"})
+        self.assertEqual(self.key("global", "p", **base), self.key("global", "p", **dict(base)))
+        for change in ({"model": "ollama:qwen"}, {"temperature": 0.0}, {"schema": {"type": "array"}}):
+            self.assertNotEqual(self.key("global", "p", **base), self.key("global", "p", **{**base, **change}))
+
+    def test_short_ids_are_not_masked_inside_words(self):
+        policy = CacheKeyPolicy("session")
+        self.assertEqual(policy.normalize("step 1 of 10", task_id="1"), "step 1 of 10")
+        self.assertEqual(policy.normalize("build abcd_js now", task_id="abcd"), "build <task>_js now")
+
+
+class TestSharedPromptCache(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_prompt_cache_")
+        self.backends = [{
+            "backend": SQLiteBackend,
+            "config": {"db_path": os.path.join(self.base_dir, "{session_id}.db")},
+        }]
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_shared_entries_are_visible_to_every_session_and_process(self):
+        manager = MemoryManager(base_dir=self.base_dir, backends=self.backends)
+        manager.cache_response("key", "response", "session_a", shared=True)
+        self.assertEqual(manager.load_cached_response("key", "session_b", shared=True), "response")
+        # Session-scoped entries stay in the session's own store
+        self.assertIsNone(manager.load_cached_response("key", "session_b"))
+        manager.close()
+        reopened = MemoryManager(base_dir=self.base_dir, backends=self.backends)
+        try:
+            self.assertEqual(reopened.load_cached_response("key", "session_c", shared=True), "response")
+        finally:
+            reopened.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+# tests/test_rate_limit.py
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from seclorum.agents.http_client import HttpClient
+from seclorum.agents.rate_limit import RateLimiter, RateLimitTimeout
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix="test_rate_limit_")
+        RateLimiter.reset()
+
+    def tearDown(self):
+        RateLimiter.reset()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_concurrent_callers_queue_at_the_configured_rate(self):
+        limiter = RateLimiter("stub", requests_per_minute=600, burst_requests=1)  # One every 0.1s
+        waits, lock = [], threading.Lock()
+
+        def call():
+            wait = limiter.acquire()
+            with lock:
+                waits.append(wait)
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=call) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Each caller is slotted 0.1s after the previous one instead of all firing at once
+        for expected, wait in zip([0, 0.1, 0.2, 0.3, 0.4], sorted(waits)):
+            self.assertAlmostEqual(wait, expected, delta=0.05)
+        self.assertLess(time.monotonic() - started, 0.8)
+
+    def test_queueing_past_max_wait_raises_without_consuming(self):
+        limiter = RateLimiter("stub", requests_per_minute=60, burst_requests=1, max_wait=0.5)
+        self.assertEqual(limiter.acquire(), 0)
+        with self.assertRaises(RateLimitTimeout):
+            limiter.acquire()
+        # The refused call left no reservation behind
+        self.assertAlmostEqual(limiter.delay(), 1.0, delta=0.05)
+
+    def test_tokens_are_reserved_and_settled(self):
+        limiter = RateLimiter("stub", tokens_per_minute=600, max_wait=0)
+        self.assertEqual(limiter.acquire(tokens=600), 0)
+        with self.assertRaises(RateLimitTimeout):
+            limiter.acquire(tokens=300)
+        # The response reported half the estimate, so half is refunded
+        limiter.settle(600, 300)
+        self.assertEqual(limiter.acquire(tokens=300), 0)
+
+    def test_sqlite_store_shares_quota_between_limiters(self):
+        db_path = os.path.join(self.temp_dir, "buckets.db")
+        first = RateLimiter("stub", requests_per_minute=60, burst_requests=1, db_path=db_path)
+        second = RateLimiter("stub", requests_per_minute=60, burst_requests=1, db_path=db_path)
+        self.assertEqual(first.acquire(), 0)
+        # The second limiter (as another process would) sees the request the first one made
+        self.assertAlmostEqual(second.delay(), 1.0, delta=0.05)
+        first.store.close()
+        second.store.close()
+
+    def test_get_derives_limits_from_endpoint_settings(self):
+        limiter = RateLimiter.get("google_ai_studio")
+        self.assertIs(RateLimiter.get("google_ai_studio"), limiter)
+        self.assertEqual(limiter.requests_per_minute, 10)  # max_calls_per_window over rate_limit_window
+        self.assertEqual(limiter.tokens_per_minute, 1_000_000)
+
+    def test_http_client_waits_on_limiter_and_settles_usage(self):
+        limiter = RateLimiter("stub", requests_per_minute=60, burst_requests=1, tokens_per_minute=600, max_wait=0)
+        client = HttpClient("stub", limiter=limiter, usage_path=["usageMetadata", "totalTokenCount"])
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {"usageMetadata": {"totalTokenCount": 100}}
+        session = mock.Mock()
+        session.request.return_value = response
+        with mock.patch.object(client, "_session", return_value=session):
+            client.post("http://stub/generate", tokens=500)
+            with self.assertRaises(RateLimitTimeout):
+                client.post("http://stub/generate", tokens=10)
+            # Unlimited GETs such as health probes are not counted
+            client.request("GET", "http://stub/models")
+        self.assertEqual(session.request.call_count, 2)
+        # 500 reserved, 100 used: the rest is back in the bucket
+        self.assertEqual(limiter._reserve(0, 500, 0), 0)
+        client.close()
+
+
+class TestAsyncRateLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_reservation_runs_off_the_event_loop(self):
+        temp_dir = tempfile.mkdtemp(prefix="test_rate_limit_")
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        limiter = RateLimiter("stub", requests_per_minute=60, db_path=os.path.join(temp_dir, "buckets.db"))
+        self.addCleanup(limiter.store.close)
+        threads = []
+        reserve = limiter.store.reserve
+
+        def spy(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return reserve(*args, **kwargs)
+
+        with mock.patch.object(limiter.store, "reserve", side_effect=spy):
+            self.assertEqual(await limiter.aacquire(), 0)
+        # BEGIN IMMEDIATE may wait on other processes' locks; it must not do so on the loop thread
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertEqual(len(threads), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+# tests/test_single_flight.py
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from seclorum.agents.memory.manager import MemoryManager
+from seclorum.agents.memory.sqlite import SQLiteBackend
+from seclorum.agents.single_flight import SingleFlight, SingleFlightTimeout
+from seclorum.models import Task
+from tests.test_async_inference import SlowModelManager, StubAgent
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def slow(self, result="done", delay=0.3):
+        def fn():
+            with self.lock:
+                self.calls += 1
+            time.sleep(delay)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return fn
+
+    def test_concurrent_callers_share_one_run(self):
+        with ThreadPoolExecutor(5) as pool:
+            outcomes = list(pool.map(lambda _: self.flight.do("key", self.slow()), range(5)))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(sorted(outcomes), [("done", False)] + [("done", True)] * 4)
+        # A finished flight is not reused
+        self.assertEqual(self.flight.do("key", self.slow("again", 0)), ("again", False))
+
+    def test_leader_exception_reaches_waiters(self):
+        def call(_):
+            try:
+                return self.flight.do("key", self.slow(ValueError("boom")))
+            except ValueError as e:
+                return str(e)
+        with ThreadPoolExecutor(3) as pool:
+            self.assertEqual(list(pool.map(call, range(3))), ["boom"] * 3)
+        self.assertEqual(self.calls, 1)
+
+    def test_waiter_times_out(self):
+        leader = threading.Thread(target=self.flight.do, args=("key", self.slow(delay=0.5)))
+        leader.start()
+        time.sleep(0.05)
+        with self.assertRaises(SingleFlightTimeout):
+            self.flight.do("key", self.slow(), timeout=0.1)
+        leader.join()
+        self.assertEqual(self.calls, 1)
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_sync_caller_on_the_loop_does_not_wait(self):
+        flight = SingleFlight()
+        leader = threading.Thread(target=flight.do, args=("key", lambda: time.sleep(0.5)))
+        leader.start()
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        self.assertEqual(flight.do("key", lambda: "own"), ("own", False))
+        self.assertLess(time.monotonic() - started, 0.3)
+        leader.join()
+
+    async def test_cancelled_leader_hands_over_to_a_waiter(self):
+        flight = SingleFlight()
+        runs = []
+
+        async def fn():
+            runs.append(None)
+            await asyncio.sleep(0.2)
+            return len(runs)
+
+        leader = asyncio.ensure_future(flight.ado("key", fn))
+        await asyncio.sleep(0.05)
+        waiter = asyncio.ensure_future(flight.ado("key", fn))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        self.assertEqual(await waiter, (2, False))
+
+
+class TestCoalescedInference(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_single_flight_")
+        self.manager = MemoryManager(
+            base_dir=self.base_dir,
+            backends=[{"backend": SQLiteBackend, "config": {"db_path": os.path.join(self.base_dir, "{session_id}.db")}}],
+        )
+        self.model = SlowModelManager(delay=0.3)
+        self.task = Task(task_id="task_same", description="describe", parameters={})
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_identical_prompts_generate_once(self):
+        agents = [StubAgent(self.model, self.manager, session_id="flight_session") for _ in range(4)]
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(lambda agent: agent.infer("same prompt", self.task), agents))
+        self.assertEqual(results, ["answer to same prompt"] * 4)
+        self.assertEqual(self.model.calls, 1)
+
+    def test_other_sessions_do_not_join(self):
+        agents = [StubAgent(self.model, self.manager, session_id=f"session_{i}") for i in range(2)]
+        with ThreadPoolExecutor(2) as pool:
+            list(pool.map(lambda agent: agent.infer("same prompt", self.task), agents))
+        self.assertEqual(self.model.calls, 2)
+
+    def test_different_validation_or_retries_do_not_join(self):
+        agents = [StubAgent(self.model, self.manager, session_id="flight_session") for _ in range(3)]
+        calls = [
+            lambda: agents[0].infer("same prompt", self.task),
+            lambda: agents[1].infer("same prompt", self.task, validate_fn=lambda result: True),
+            lambda: agents[2].infer("same prompt", self.task, max_retries=1),
+        ]
+        with ThreadPoolExecutor(3) as pool:
+            list(pool.map(lambda call: call(), calls))
+        self.assertEqual(self.model.calls, 3)
+
+    def test_sync_and_async_callers_coalesce(self):
+        agent = StubAgent(self.model, self.manager, session_id="flight_session")
+
+        async def gather():
+            return await asyncio.gather(*(agent.ainfer("same prompt", self.task) for _ in range(3)))
+
+        with ThreadPoolExecutor(1) as pool:
+            sync_result = pool.submit(agent.infer, "same prompt", self.task)
+            async_results = asyncio.run(gather())
+        self.assertEqual(async_results + [sync_result.result()], ["answer to same prompt"] * 4)
+        self.assertEqual(self.model.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
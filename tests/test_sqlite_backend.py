@@ -0,0 +1,497 @@
+# tests/test_sqlite_backend.py
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
+from seclorum.agents.memory.memory import Memory, reciprocal_rank_fusion
+from seclorum.agents.memory.sqlite import (
+    _WRITER_STOP, LockTimeoutError, SQLiteBackend, SharedSQLiteBackend, SCHEMA_VERSION, WriterStoppedError,
+)
+from seclorum.models import Task
+
+
+class TestSQLiteWriteBehind(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_sqlite_")
+        self.db_path = os.path.join(self.base_dir, f"{uuid.uuid4()}.db")
+        self.session_id = "test_session"
+        self.backend = SQLiteBackend(self.db_path, preserve_db=False, write_behind=True, commit_interval=0.5)
+        self.backend.initialize()
+
+    def tearDown(self):
+        self.backend.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_reads_see_queued_writes(self):
+        for i in range(10):
+            self.backend.save_conversation(self.session_id, "task", "agent", f"prompt {i}", f"response {i}")
+        self.backend.cache_response(self.session_id, "hash", "cached")
+        self.backend.save_task(self.session_id, "task", {"task_id": "task", "description": "desc"})
+        history = self.backend.load_conversation_history(self.session_id, "task", "agent")
+        self.assertEqual([h[0] for h in history], [f"prompt {i}" for i in range(10)])
+        self.assertEqual(self.backend.load_cached_response(self.session_id, "hash"), "cached")
+        self.assertEqual(self.backend.load_task(self.session_id, "task")["description"], "desc")
+
+    def test_concurrent_writers_are_batched(self):
+        def write(n):
+            for i in range(25):
+                self.backend.save_conversation(self.session_id, "task", f"agent_{n}", f"p{i}", f"r{i}")
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.backend.flush(timeout=5)
+        for n in range(4):
+            history = self.backend.load_conversation_history(self.session_id, "task", f"agent_{n}")
+            self.assertEqual(len(history), 25)
+
+    def test_close_drains_queue(self):
+        self.backend.preserve_db = True
+        self.backend.save_conversation(self.session_id, "task", "agent", "prompt", "response")
+        self.backend.close()
+        reopened = SQLiteBackend(self.db_path, preserve_db=False)
+        reopened.initialize()
+        try:
+            self.assertEqual(len(reopened.load_conversation_history(self.session_id, "task", "agent")), 1)
+        finally:
+            reopened.close()
+
+    def test_flush_raises_writer_errors(self):
+        self.backend._enqueue_write("INSERT INTO missing_table VALUES (?)", (1,))
+        with self.assertRaises(Exception):
+            self.backend.flush(timeout=5)
+        # The error is reported once
+        self.backend.flush(timeout=5)
+
+    def test_failed_batch_is_retried_row_by_row(self):
+        def bad_write(cursor):
+            raise ValueError("bad row")
+
+        # Queue everything before the writer wakes so it lands in one batch
+        with self.backend._writer():
+            self.backend.save_conversation(self.session_id, "task", "agent", "before", "response")
+            self.backend._enqueue_write(bad_write, ())
+            self.backend.save_conversation(self.session_id, "task", "agent", "after", "response")
+        with self.assertRaises(ValueError):
+            self.backend.flush(timeout=5)
+        history = self.backend.load_conversation_history(self.session_id, "task", "agent")
+        self.assertEqual([h[0] for h in history], ["before", "after"])
+        # The writer survived a non-sqlite error and keeps committing
+        self.assertTrue(self.backend._writer_thread.is_alive())
+        self.backend.save_conversation(self.session_id, "task", "agent", "later", "response")
+        self.backend.flush(timeout=5)
+        self.assertEqual(len(self.backend.load_conversation_history(self.session_id, "task", "agent")), 3)
+
+    def test_dead_writer_raises_instead_of_dropping_writes(self):
+        # Stop the writer with a write still queued behind it
+        with self.backend._writer():
+            self.backend._write_queue.put(_WRITER_STOP)
+            self.backend.save_conversation(self.session_id, "task", "agent", "prompt", "response")
+        self.backend._writer_thread.join(5)
+        with self.assertRaises(WriterStoppedError):
+            self.backend.flush(timeout=5)
+        with self.assertRaises(WriterStoppedError):
+            self.backend.save_conversation(self.session_id, "task", "agent", "prompt", "response")
+
+
+class TestSQLiteHistoryWindow(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_sqlite_")
+        self.db_path = os.path.join(self.base_dir, f"{uuid.uuid4()}.db")
+        self.session_id = "test_session"
+        self.backend = SQLiteBackend(self.db_path)
+        self.backend.initialize()
+
+    def tearDown(self):
+        self.backend.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_migrates_legacy_database(self):
+        legacy_path = os.path.join(self.base_dir, "legacy.db")
+        conn = sqlite3.connect(legacy_path)
+        conn.execute(
+            "CREATE TABLE conversations (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, task_id TEXT, "
+            "agent_name TEXT, prompt TEXT, response TEXT, timestamp TEXT)"
+        )
+        # The same turn twice, as an interrupted import could leave it
+        for _ in range(2):
+            conn.execute(
+                "INSERT INTO conversations (session_id, task_id, agent_name, prompt, response, timestamp) "
+                "VALUES ('s', 't', 'a', 'old prompt', 'old response', '2025-01-01T00:00:00Z')"
+            )
+        conn.commit()
+        conn.close()
+        backend = SQLiteBackend(legacy_path)
+        backend.initialize()
+        try:
+            conn = sqlite3.connect(legacy_path)
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+            indexes = {row[1] for row in conn.execute("PRAGMA index_list(conversations)")}
+            self.assertIn("idx_conversations_history", indexes)
+            self.assertIn("idx_conversations_unique", indexes)
+            plan = " ".join(str(row) for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT prompt FROM conversations "
+                "WHERE session_id = ? AND task_id = ? AND agent_name = ? ORDER BY timestamp, id",
+                ("s", "t", "a")
+            ))
+            conn.close()
+            self.assertIn("idx_conversations_history", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+            self.assertEqual([h[0] for h in backend.load_conversation_history("s", "t", "a")], ["old prompt"])
+        finally:
+            backend.close()
+
+    def test_window_returns_latest_turns_in_order(self):
+        for i in range(10):
+            self.backend.save_conversation(self.session_id, "task", "agent", f"prompt {i}", f"response {i}")
+        self.backend.save_conversation(self.session_id, "task", "other", "other prompt", "other response")
+        window = self.backend.load_conversation_window(self.session_id, "task", "agent", limit=3)
+        self.assertEqual([h[0] for h in window], ["prompt 7", "prompt 8", "prompt 9"])
+        self.assertEqual(len(self.backend.load_conversation_history(self.session_id, "task", "agent")), 10)
+
+    def test_window_since_cursor(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany(
+            "INSERT INTO conversations (session_id, task_id, agent_name, prompt, response, timestamp) "
+            "VALUES (?, 'task', 'agent', ?, 'r', ?)",
+            [(self.session_id, f"p{i}", f"2025-01-01T00:00:0{i}Z") for i in range(5)]
+        )
+        conn.commit()
+        conn.close()
+        window = self.backend.load_conversation_window(
+            self.session_id, "task", "agent", since="2025-01-01T00:00:02Z"
+        )
+        self.assertEqual([h[0] for h in window], ["p3", "p4"])
+
+    def test_window_cursor_keeps_turns_saved_in_the_same_second(self):
+        self.backend.save_conversation(self.session_id, "task", "agent", "first", "r")
+        cursor = self.backend.load_conversation_window(self.session_id, "task", "agent")[-1][2]
+        self.backend.save_conversation(self.session_id, "task", "agent", "second", "r")
+        self.backend.save_conversation(self.session_id, "task", "agent", "third", "r")
+        self.assertRegex(cursor, r"\.\d{6}Z$")
+        window = self.backend.load_conversation_window(self.session_id, "task", "agent", since=cursor)
+        self.assertEqual([h[0] for h in window], ["second", "third"])
+
+
+class TestSQLiteResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_sqlite_")
+        self.session_id = "test_session"
+        self.backends = []
+
+    def tearDown(self):
+        for backend in self.backends:
+            backend.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def make_backend(self, **kwargs):
+        backend = SQLiteBackend(os.path.join(self.base_dir, f"{uuid.uuid4()}.db"), **kwargs)
+        backend.initialize()
+        self.backends.append(backend)
+        return backend
+
+    def cached_hashes(self, backend):
+        conn = sqlite3.connect(backend.db_path)
+        try:
+            return {row[0] for row in conn.execute("SELECT prompt_hash FROM cache")}
+        finally:
+            conn.close()
+
+    def test_lru_row_budget(self):
+        backend = self.make_backend(cache_max_rows=2, cache_eviction="lru")
+        backend.cache_response(self.session_id, "a", "A")
+        backend.cache_response(self.session_id, "b", "B")
+        time.sleep(0.01)
+        self.assertEqual(backend.load_cached_response(self.session_id, "a"), "A")
+        backend.cache_response(self.session_id, "c", "C")
+        self.assertEqual(self.cached_hashes(backend), {"a", "c"})
+        self.assertEqual(backend.cache_stats()["evictions"], 1)
+
+    def test_lfu_byte_budget(self):
+        backend = self.make_backend(cache_max_bytes=30, cache_eviction="lfu")
+        backend.cache_response(self.session_id, "a", "x" * 10)
+        backend.cache_response(self.session_id, "b", "y" * 10)
+        for _ in range(3):
+            backend.load_cached_response(self.session_id, "a")
+        backend.load_cached_response(self.session_id, "b")
+        backend.cache_response(self.session_id, "c", "z" * 10)
+        self.assertEqual(self.cached_hashes(backend), {"a", "b"})
+
+    def test_ttl_expiry_and_sweep(self):
+        backend = self.make_backend(cache_ttl=0.05)
+        backend.cache_response(self.session_id, "a", "A")
+        time.sleep(0.1)
+        self.assertIsNone(backend.load_cached_response(self.session_id, "a"))
+        backend.compact_cache()
+        self.assertEqual(self.cached_hashes(backend), set())
+        stats = backend.cache_stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["expirations"], 1)
+
+    def test_background_sweeper(self):
+        backend = self.make_backend(cache_ttl=0.01, cache_sweep_interval=0.05, write_behind=True)
+        backend.cache_response(self.session_id, "a", "A")
+        deadline = time.time() + 5
+        while self.cached_hashes(backend) and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.cached_hashes(backend), set())
+
+    def test_hit_counters(self):
+        backend = self.make_backend()
+        backend.cache_response(self.session_id, "a", "A")
+        backend.load_cached_response(self.session_id, "a")
+        backend.load_cached_response(self.session_id, "missing")
+        stats = backend.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+
+class TestSQLiteLexicalSearch(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_sqlite_")
+        self.db_path = os.path.join(self.base_dir, f"{uuid.uuid4()}.db")
+        self.session_id = "test_session"
+        self.backend = SQLiteBackend(self.db_path)
+        self.backend.initialize()
+
+    def tearDown(self):
+        self.backend.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_bm25_ranking_filtered_by_session_and_task(self):
+        self.backend.save_conversation(self.session_id, "task", "agent", "build a websocket server", "done")
+        self.backend.save_conversation(self.session_id, "task", "agent", "websocket websocket client", "ok")
+        self.backend.save_conversation(self.session_id, "task", "agent", "parse a csv file", "ok")
+        self.backend.save_conversation(self.session_id, "other", "agent", "websocket elsewhere", "ok")
+        self.backend.save_conversation("other_session", "task", "agent", "websocket server", "ok")
+        results = self.backend.find_similar("websocket client", self.session_id, "task", n_results=5)
+        self.assertEqual([r["prompt"] for r in results], ["websocket websocket client", "build a websocket server"])
+        self.assertGreater(results[0]["score"], results[1]["score"])
+        all_tasks = self.backend.find_similar("websocket", self.session_id, None, n_results=5)
+        self.assertEqual(len(all_tasks), 3)
+
+    def test_index_follows_updates_and_deletes(self):
+        self.backend.save_conversation(self.session_id, "task", "agent", "alpha", "beta")
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE conversations SET prompt = 'gamma'")
+        conn.commit()
+        self.assertEqual(self.backend.find_similar("alpha", self.session_id, "task", 5), [])
+        self.assertEqual(len(self.backend.find_similar("gamma", self.session_id, "task", 5)), 1)
+        conn.execute("DELETE FROM conversations")
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.backend.find_similar("gamma", self.session_id, "task", 5), [])
+
+    def test_query_syntax_is_inert(self):
+        self.backend.save_conversation(self.session_id, "task", "agent", "near AND or", "x")
+        self.assertEqual(len(self.backend.find_similar('"NEAR( -*', self.session_id, "task", 5)), 1)
+        self.assertEqual(self.backend.find_similar("!!!", self.session_id, "task", 5), [])
+
+    def test_reciprocal_rank_fusion(self):
+        lexical = [{"agent_name": "a", "prompt": "p1", "response": "r"}, {"agent_name": "a", "prompt": "p2", "response": "r"}]
+        vector = [{"agent_name": "a", "prompt": "p2", "response": "r"}, {"agent_name": "a", "prompt": "p3", "response": "r"}]
+        fused = reciprocal_rank_fusion([lexical, vector], n_results=2)
+        self.assertEqual([r["prompt"] for r in fused], ["p2", "p1"])
+
+
+class TestSQLiteBatchOperations(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_sqlite_")
+        self.session_id = "test_session"
+        self.backends = []
+
+    def tearDown(self):
+        for backend in self.backends:
+            backend.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def make_backend(self, **kwargs):
+        backend = SQLiteBackend(os.path.join(self.base_dir, f"{uuid.uuid4()}.db"), **kwargs)
+        backend.initialize()
+        self.backends.append(backend)
+        return backend
+
+    def test_batch_writes_and_reads(self):
+        for write_behind in (False, True):
+            backend = self.make_backend(write_behind=write_behind)
+            backend.save_conversations_many(
+                self.session_id, [("task", "agent", f"prompt {i}", f"response {i}") for i in range(20)]
+            )
+            backend.save_tasks_many(self.session_id, [(f"task_{i}", {"n": i}) for i in range(1200)])
+            backend.save_tasks_many(self.session_id, [("task_0", {"n": "updated"})])
+            backend.cache_responses_many(self.session_id, [("h1", "r1"), ("h2", "r2")])
+            history = backend.load_conversation_history(self.session_id, "task", "agent")
+            self.assertEqual([h[0] for h in history], [f"prompt {i}" for i in range(20)])
+            # More ids than one IN clause takes
+            tasks = backend.load_tasks_many(self.session_id, [f"task_{i}" for i in range(1200)] + ["missing"])
+            self.assertEqual(len(tasks), 1200)
+            self.assertEqual(tasks["task_0"], {"n": "updated"})
+            self.assertEqual(backend.load_cached_response(self.session_id, "h2"), "r2")
+
+    def test_batch_is_one_transaction(self):
+        backend = self.make_backend()
+        with self.assertRaises(sqlite3.Error):
+            backend.save_conversations_many(
+                self.session_id, [("task", "agent", "prompt", "response"), ("task", "agent", {"bad": 1}, "response")]
+            )
+        self.assertEqual(backend.load_conversation_history(self.session_id, "task", "agent"), [])
+
+    def test_batch_cache_respects_budget(self):
+        backend = self.make_backend(cache_max_rows=3)
+        backend.cache_responses_many(self.session_id, [(f"h{i}", f"r{i}") for i in range(10)])
+        conn = sqlite3.connect(backend.db_path)
+        try:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0], 3)
+        finally:
+            conn.close()
+
+    def test_memory_saves_plan_subtasks_in_one_batch(self):
+        memory = Memory(self.session_id, [{"backend": SQLiteBackend, "config": {
+            "db_path": os.path.join(self.base_dir, "memory.db"), "preserve_db": False,
+        }}])
+        try:
+            subtasks = [Task(task_id=f"sub_{i}", description=f"subtask {i}", parameters={}) for i in range(3)]
+            with mock.patch.object(SQLiteBackend, "save_task") as save_task:
+                memory.save_tasks_many(subtasks)
+                save_task.assert_not_called()
+            loaded = memory.load_tasks_many(["sub_0", "sub_2", "missing"])
+            self.assertEqual(sorted(loaded), ["sub_0", "sub_2"])
+            self.assertEqual(loaded["sub_2"].description, "subtask 2")
+            memory.save_many([("prompt", "response", "sub_0", "agent")])
+            self.assertEqual(len(memory.load_history("sub_0", "agent")), 1)
+        finally:
+            memory.close()
+
+
+class TestSQLiteConnectionPools(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_sqlite_")
+        self.session_id = "test_session"
+        self.backend = SQLiteBackend(os.path.join(self.base_dir, "memory.db"), read_pool_size=2)
+        self.backend.initialize()
+
+    def tearDown(self):
+        self.backend.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_readers_are_read_only(self):
+        with self.backend._reader() as conn:
+            self.assertEqual(conn.execute("PRAGMA query_only").fetchone()[0], 1)
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM tasks")
+
+    def test_reads_proceed_while_writer_holds_a_transaction(self):
+        self.backend.save_task(self.session_id, "task", {"status": "planned"})
+        with self.backend._writer() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE tasks SET task_data = ? WHERE task_id = ?", ('{"status": "done"}', "task")
+            )
+            # Readers see the last committed snapshot instead of waiting for the writer
+            result = []
+            reader = threading.Thread(target=lambda: result.append(self.backend.load_task(self.session_id, "task")))
+            reader.start()
+            reader.join(timeout=2)
+            self.assertEqual(result, [{"status": "planned"}])
+            conn.commit()
+        self.assertEqual(self.backend.load_task(self.session_id, "task"), {"status": "done"})
+
+    def test_broken_reader_is_replaced(self):
+        with self.assertRaises(sqlite3.ProgrammingError):
+            with self.backend._reader() as conn:
+                conn.close()
+                conn.execute("SELECT 1")
+        self.backend.save_task(self.session_id, "task", {"status": "planned"})
+        # Both slots are usable again, including the one whose connection broke
+        for _ in range(2):
+            self.assertEqual(self.backend.load_task(self.session_id, "task"), {"status": "planned"})
+
+    def test_exhausted_read_pool_times_out(self):
+        self.backend.read_timeout = 0.2
+        with self.backend._reader(), self.backend._reader():
+            started = time.monotonic()
+            with self.assertRaises(LockTimeoutError):
+                self.backend.load_task(self.session_id, "task")
+            self.assertLess(time.monotonic() - started, 2)
+        # The borrowed slots went back to the pool
+        self.assertIsNone(self.backend.load_task(self.session_id, "task"))
+
+    def test_operation_counter_is_thread_safe(self):
+        def work():
+            for i in range(50):
+                self.backend.save_conversation(self.session_id, "task", "agent", f"prompt {i}", "response")
+                self.backend.load_conversation_window(self.session_id, "task", "agent", limit=5)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.backend._active_operations, 0)
+        self.assertEqual(len(self.backend.load_conversation_history(self.session_id, "task", "agent")), 400)
+
+
+class TestSharedSQLiteStore(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_sqlite_")
+        self.memories = []
+
+    def tearDown(self):
+        for memory in self.memories:
+            memory.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def make_memory(self, session_id, **config):
+        memory = Memory(
+            session_id=session_id,
+            backends=[{"backend": SharedSQLiteBackend, "config": config}],
+        )
+        self.memories.append(memory)
+        return memory
+
+    def test_sessions_share_one_backend_and_stay_partitioned(self):
+        db_path = os.path.join(self.base_dir, "memory.db")
+        first = self.make_memory("session_1", db_path=db_path)
+        second = self.make_memory("session_2", db_path=db_path)
+        self.assertIs(first.backends[0]._backend_for("session_1"), second.backends[0]._backend_for("session_2"))
+        first.save("prompt 1", "response 1", "task", "agent")
+        second.save("prompt 2", "response 2", "task", "agent")
+        self.assertEqual([h[0] for h in first.load_history("task", "agent")], ["prompt 1"])
+        self.assertEqual([h[0] for h in second.load_history("task", "agent")], ["prompt 2"])
+        self.assertEqual([f for f in os.listdir(self.base_dir) if f.endswith(".db")], ["memory.db"])
+
+    def test_sharding_routes_sessions_consistently(self):
+        db_path = os.path.join(self.base_dir, "memory_{shard}.db")
+        memories = [self.make_memory(f"session_{i}", db_path=db_path, shards=4) for i in range(20)]
+        for memory in memories:
+            memory.save(f"prompt {memory.session_id}", "response", "task", "agent")
+        db_files = {f for f in os.listdir(self.base_dir) if f.endswith(".db")}
+        self.assertEqual(db_files, {f"memory_{shard}.db" for shard in range(4)})
+        for memory in memories:
+            history = memory.load_history("task", "agent")
+            self.assertEqual([h[0] for h in history], [f"prompt {memory.session_id}"])
+
+    def test_last_close_releases_store(self):
+        db_path = os.path.join(self.base_dir, "memory.db")
+        first = self.make_memory("session_1", db_path=db_path)
+        second = self.make_memory("session_2", db_path=db_path)
+        shared = first.backends[0]._backend_for("session_1")
+        first.close()
+        self.assertFalse(shared._closed)
+        second.close()
+        self.assertTrue(shared._closed)
+        self.assertIsNone(shared._writer_conn)
+
+    def test_shards_require_placeholder(self):
+        with self.assertRaises(ValueError):
+            SharedSQLiteBackend(os.path.join(self.base_dir, "memory.db"), shards=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# tests/test_streaming.py
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from seclorum.agents.agent import socketio_chunk_emitter
+from seclorum.agents.memory.manager import MemoryManager
+from seclorum.agents.memory.sqlite import SQLiteBackend
+from seclorum.models import Task
+from seclorum.models.managers.llama_cpp import LlamaCppModelManager
+from seclorum.models.managers.mock import MockModelManager
+from tests.test_async_inference import StubAgent
+
+
+class StreamingModelManager(MockModelManager):
+    def __init__(self, chunks):
+        super().__init__("streaming")
+        self.chunks = chunks
+        self.streams = 0
+
+    def generate_stream(self, prompt: str, **kwargs):
+        self.streams += 1
+        yield from self.chunks
+
+
+class TestStreamingInference(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_streaming_")
+        self.manager = MemoryManager(
+            base_dir=self.base_dir,
+            backends=[{"backend": SQLiteBackend, "config": {"db_path": os.path.join(self.base_dir, "{session_id}.db")}}],
+        )
+        self.model = StreamingModelManager(["Hello", ", ", "world"])
+        self.agent = StubAgent(self.model, self.manager, session_id="stream_session")
+        self.task = Task(task_id="task_stream", description="describe", parameters={})
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_chunks_are_forwarded_and_result_is_cached(self):
+        chunks = []
+        self.assertEqual(self.agent.infer("prompt", self.task, on_chunk=chunks.append), "Hello, world")
+        self.assertEqual(chunks, ["Hello", ", ", "world"])
+        history = self.manager.load_history("task_stream", "stub_agent", "stream_session")
+        self.assertEqual(len(history), 1)
+        # A cache hit arrives as a single chunk without generating again
+        chunks.clear()
+        self.assertEqual(self.agent.infer("prompt", self.task, on_chunk=chunks.append), "Hello, world")
+        self.assertEqual(chunks, ["Hello, world"])
+        self.assertEqual(self.model.streams, 1)
+
+    def test_each_retry_streams_again(self):
+        chunks = []
+        validate = iter([False, True])
+        self.agent.infer("prompt", self.task, on_chunk=chunks.append, validate_fn=lambda result: next(validate))
+        self.assertEqual(self.model.streams, 2)
+        self.assertEqual(chunks, ["Hello", ", ", "world"] * 2)
+
+    def test_streamed_result_is_stripped_before_it_is_saved(self):
+        self.model.chunks = ["  Hello", ", world \n"]
+        self.assertEqual(self.agent.infer("prompt", self.task, on_chunk=lambda chunk: None), "Hello, world")
+        history = self.manager.load_history("task_stream", "stub_agent", "stream_session")
+        self.assertEqual(history[0][1], "Hello, world")
+
+    def test_llama_cpp_stream_finishes_like_generate(self):
+        raw = ' ```json\n{"answer":  42}\n``` '
+        model = LlamaCppModelManager.__new__(LlamaCppModelManager)
+        model.model_name = "stub"
+
+        def completion(prompt, stream=False, **kwargs):
+            if stream:
+                return iter([{"choices": [{"text": raw[i:i + 5]}]} for i in range(0, len(raw), 5)])
+            return {"choices": [{"text": raw}]}
+
+        with mock.patch.object(model, "_completion", side_effect=completion):
+            streamed = model.finish_stream("".join(model.generate_stream("prompt")))
+            self.assertEqual(streamed, model.generate("prompt"))
+        self.assertEqual(streamed, '{"answer": 42}')
+        # A failure before the first chunk produces generate's error payload instead of nothing
+        with mock.patch.object(model, "_completion", side_effect=RuntimeError("no model")):
+            self.assertEqual(list(model.generate_stream("prompt")), [model.generate("prompt")])
+
+    def test_default_generate_stream_yields_the_full_result(self):
+        self.assertEqual(list(MockModelManager().generate_stream("prompt")), ["Mock response"])
+
+    def test_socketio_emitter_tags_chunks_with_the_task(self):
+        socketio = mock.Mock()
+        self.agent.infer("prompt", self.task, on_chunk=socketio_chunk_emitter(socketio, "task_stream"))
+        socketio.emit.assert_any_call("inference_chunk", {"task_id": "task_stream", "chunk": ", "}, namespace='/')
+        self.assertEqual(socketio.emit.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+# tests/test_vector_backend.py
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+import numpy as np
+from seclorum.agents.memory.sqlite import SQLiteBackend
+from seclorum.agents.memory.vector import VectorBackend
+
+
+def fake_embed_many(texts):
+    return np.array([[float(len(t)), 1.0, 0.5] for t in texts], dtype=np.float32)
+
+
+class TestVectorIngestion(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_vector_")
+        self.session_id = "test_session"
+        self.backends = []
+        patcher = mock.patch.object(VectorBackend, "embed_many", side_effect=fake_embed_many)
+        self.embed_many = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for backend in self.backends:
+            backend.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def make_backend(self, **kwargs):
+        backend = VectorBackend(self.base_dir, **kwargs)
+        backend.initialize()
+        self.backends.append(backend)
+        return backend
+
+    def test_saves_are_embedded_in_batches(self):
+        backend = self.make_backend(ingest_batch_size=10, ingest_interval=1)
+        gate = threading.Event()
+        self.embed_many.side_effect = lambda texts: gate.wait(5) and fake_embed_many(texts)
+        for i in range(10):
+            backend.save_conversation(self.session_id, "task", "agent", f"prompt {i}", f"response {i}")
+        gate.set()
+        backend.flush(timeout=5)
+        self.assertEqual(backend.conversation_collection.count(), 10)
+        self.assertEqual(self.embed_many.call_count, 1)
+        stats = backend.ingest_stats()
+        self.assertEqual((stats["ingested"], stats["batches"], stats["pending"], stats["queue_depth"]), (10, 1, 0, 0))
+        self.assertGreaterEqual(stats["max_lag"], stats["last_lag"])
+
+    def test_reads_see_queued_documents(self):
+        backend = self.make_backend(ingest_interval=1)
+        backend.save_conversation(self.session_id, "task", "agent", "prompt", "response")
+        results = backend.find_similar("prompt", self.session_id, "task", n_results=1)
+        self.assertEqual(results[0]["prompt"], "prompt")
+
+    def test_flush_raises_ingestion_errors(self):
+        backend = self.make_backend()
+        self.embed_many.side_effect = RuntimeError("embedding failed")
+        backend.save_conversation(self.session_id, "task", "agent", "prompt", "response")
+        with self.assertRaises(RuntimeError):
+            backend.flush(timeout=5)
+        self.assertEqual(backend.ingest_stats()["errors"], 1)
+
+    def test_synchronous_ingestion(self):
+        backend = self.make_backend(async_ingest=False)
+        backend.save_conversation(self.session_id, "task", "agent", "prompt", "response")
+        self.assertEqual(backend.conversation_collection.count(), 1)
+        self.embed_many.side_effect = RuntimeError("embedding failed")
+        with self.assertRaises(RuntimeError):
+            backend.save_conversation(self.session_id, "task", "agent", "prompt", "response")
+
+
+class TestVectorTasks(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_vector_")
+        self.session_id = "test_session"
+        patcher = mock.patch.object(VectorBackend, "embed_many", side_effect=fake_embed_many)
+        self.embed_many = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backend = VectorBackend(self.base_dir)
+        self.backend.initialize()
+
+    def tearDown(self):
+        self.backend.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_repeated_saves_upsert(self):
+        for status in ("planned", "running", "done"):
+            self.backend.save_task(self.session_id, "task", {"task_id": "task", "status": status})
+            self.backend.flush(timeout=5)
+        self.backend.save_task(self.session_id, "other", {"task_id": "other", "status": "planned"})
+        self.assertEqual(self.backend.load_task(self.session_id, "task")["status"], "done")
+        self.assertEqual(self.backend.task_collection.count(), 2)
+
+    def test_load_task_does_not_embed(self):
+        self.backend.save_task(self.session_id, "task", {"task_id": "task"})
+        self.backend.flush(timeout=5)
+        self.embed_many.reset_mock()
+        self.assertEqual(self.backend.load_task(self.session_id, "task"), {"task_id": "task"})
+        self.assertIsNone(self.backend.load_task(self.session_id, "missing"))
+        self.embed_many.assert_not_called()
+
+    def test_batch_saves_are_bulk_upserts(self):
+        self.backend.save_tasks_many(self.session_id, [(f"task_{i}", {"n": i}) for i in range(5)])
+        self.backend.save_conversations_many(self.session_id, [("task", "agent", f"p{i}", f"r{i}") for i in range(5)])
+        self.backend.flush(timeout=5)
+        self.assertEqual(self.backend.conversation_collection.count(), 5)
+        self.assertLessEqual(self.embed_many.call_count, 2)
+        self.embed_many.reset_mock()
+        tasks = self.backend.load_tasks_many(self.session_id, ["task_1", "task_4", "missing"])
+        self.assertEqual(tasks, {"task_1": {"n": 1}, "task_4": {"n": 4}})
+        self.embed_many.assert_not_called()
+
+    def test_loads_legacy_timestamped_tasks(self):
+        for timestamp, status in (("2025-01-01T00:00:00Z", "old"), ("2025-01-02T00:00:00Z", "new")):
+            self.backend.task_collection.add(
+                ids=[f"{self.session_id}_task_{timestamp}"],
+                documents=[f'{{"status": "{status}"}}'],
+                metadatas=[{"session_id": self.session_id, "task_id": "task", "timestamp": timestamp}],
+                embeddings=[[1.0, 1.0, 1.0]],
+            )
+        self.assertEqual(self.backend.load_task(self.session_id, "task")["status"], "new")
+
+
+class TestVectorRetention(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp(prefix="test_vector_")
+        self.db_path = os.path.join(self.base_dir, "chroma")
+        self.session_id = "test_session"
+        patcher = mock.patch.object(VectorBackend, "embed_many", side_effect=fake_embed_many)
+        self.embed_many = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backends = []
+
+    def tearDown(self):
+        for backend in self.backends:
+            backend.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def open(self, **kwargs):
+        backend = VectorBackend(self.db_path, **kwargs)
+        backend.initialize()
+        self.backends.append(backend)
+        return backend
+
+    def reopen(self, backend, **kwargs):
+        backend.close()
+        self.backends.remove(backend)
+        return self.open(**kwargs)
+
+    def test_persistent_collections_are_reused(self):
+        backend = self.open()
+        backend.save_conversation(self.session_id, "task", "agent", "prompt", "response")
+        backend.save_task(self.session_id, "task", {"status": "done"})
+        backend.flush(timeout=5)
+        self.embed_many.reset_mock()
+        backend = self.reopen(backend)
+        self.assertEqual(backend.conversation_collection.count(), 1)
+        self.assertEqual(backend.load_task(self.session_id, "task"), {"status": "done"})
+        self.embed_many.assert_not_called()
+
+    def test_ephemeral_collections_are_deleted_on_close(self):
+        backend = self.open(retention="ephemeral")
+        backend.save_conversation(self.session_id, "task", "agent", "prompt", "response")
+        backend.flush(timeout=5)
+        backend = self.reopen(backend)
+        self.assertEqual(backend.conversation_collection.count(), 0)
+
+    def test_ttl_expires_old_documents(self):
+        with self.assertRaises(ValueError):
+            VectorBackend(self.db_path, retention="ttl")
+        backend = self.open(retention="ttl", ttl_seconds=60)
+        backend.save_conversation(self.session_id, "task", "agent", "fresh", "response")
+        backend.import_records([
+            {"type": "conversation", "session_id": self.session_id, "task_id": "task", "agent_name": "agent",
+             "prompt": "stale", "response": "response", "timestamp": "2020-01-01T00:00:00.%fZ"},
+        ])
+        backend.flush(timeout=5)
+        self.assertEqual(backend.conversation_collection.count(), 1)
+        with mock.patch("seclorum.agents.memory.vector.time.time", return_value=time.time() + 120):
+            backend = self.reopen(backend, retention="ttl", ttl_seconds=60)
+        self.assertEqual(backend.conversation_collection.count(), 0)
+
+    def test_model_change_recreates_collections(self):
+        backend = self.open(embedding_model="model-a")
+        backend.save_conversation(self.session_id, "task", "agent", "prompt", "response")
+        backend.flush(timeout=5)
+        self.assertEqual(self.reopen(backend, embedding_model="model-a").conversation_collection.count(), 1)
+        backend = self.reopen(self.backends[0], embedding_model="model-b")
+        self.assertEqual(backend.conversation_collection.count(), 0)
+        self.assertEqual(backend.conversation_collection.metadata["embedding_model"], "model-b")
+
+    def test_reconcile_embeds_only_missing_documents(self):
+        source = SQLiteBackend(os.path.join(self.base_dir, "memory.db"))
+        source.initialize()
+        self.addCleanup(source.close)
+        for i in range(5):
+            source.save_conversation(self.session_id, "task", "agent", f"prompt {i}", f"response {i}")
+        source.save_task(self.session_id, "task", {"status": "done"})
+        backend = self.open(async_ingest=False)
+        backend.import_records([record for _, record in source.export_records()][:3])
+        self.embed_many.reset_mock()
+        self.assertEqual(backend.reconcile(source, session_id=self.session_id), 3)
+        self.assertEqual([len(c.args[0]) for c in self.embed_many.call_args_list], [3])
+        self.assertEqual(backend.conversation_collection.count(), 5)
+        self.assertEqual(backend.reconcile(source, session_id=self.session_id), 0)
+
+    def test_reconcile_resumes_after_the_last_checked_conversation(self):
+        source = SQLiteBackend(os.path.join(self.base_dir, "memory.db"))
+        source.initialize()
+        self.addCleanup(source.close)
+        for i in range(5):
+            source.save_conversation(self.session_id, "task", "agent", f"prompt {i}", f"response {i}")
+        backend = self.open(async_ingest=False)
+        self.assertEqual(backend.reconcile(source, session_id=self.session_id), 5)
+        source.save_conversation(self.session_id, "task", "agent", "prompt 5", "response 5")
+        with mock.patch.object(source, "export_records", wraps=source.export_records) as export:
+            self.assertEqual(backend.reconcile(source, session_id=self.session_id), 1)
+        self.assertEqual(export.call_args.kwargs["cursor"], ["conversations", 5])
+        # The mark survives reopening the index
+        backend = self.reopen(backend, async_ingest=False)
+        self.assertEqual(backend.reconcile(source, session_id=self.session_id), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()